@@ -1,43 +1,6 @@
 from gprmaxui.commands import *
 from gprmaxui.utils import make_images_grid
-from gprmaxui import GprMaxModel
-import numpy as np
-
-def add_targets_cluster(
-    n: int,
-    cluster_domain: DomainBox,
-    cluster_spacing: float,
-    targets_material: str,
-    targets_radius: tuple,
-):
-    """
-    Add a cluster of targets to the model.
-    """
-    clusters_points = []
-    while True:
-        x = np.random.uniform(low=cluster_domain.x_min, high=cluster_domain.x_max)
-        y = np.random.uniform(low=cluster_domain.y_min, high=cluster_domain.y_max)
-        z = np.random.uniform(low=cluster_domain.z_min, high=cluster_domain.z_max)
-        target_radius = np.random.uniform(low=targets_radius[0], high=targets_radius[1])
-        point_candidate = DomainPoint(x=x, y=y, z=z)
-        if all(
-            point_candidate.distance(point) > cluster_spacing
-            for point in clusters_points
-        ):
-            clusters_points.append(point_candidate)
-        if len(clusters_points) == n:
-            break
-
-    for point in clusters_points:
-        sphere = DomainSphere(
-            cx=point.x,
-            cy=point.y,
-            cz=point.z,
-            radius=target_radius,
-            material=targets_material,
-        )
-        model.add_geometry(sphere)
-
+from gprmaxui import GprMaxModel, place_targets
 
 if __name__ == "__main__":
     # Create a GPRMax model
@@ -89,13 +52,15 @@ if __name__ == "__main__":
     )
 
     # model.add_geometry(cluster_box)
-    add_targets_cluster(
+    targets = place_targets(
         n=6,
-        cluster_domain=cluster_box,
-        cluster_spacing=0.03,
-        targets_material="object",
-        targets_radius=(0.005, 0.02),
+        domain=cluster_box,
+        min_spacing=0.03,
+        radius=(0.005, 0.02),
+        material="object",
+        seed=42,
     )
+    model.add_geometry(targets)
 
     print(model)
 
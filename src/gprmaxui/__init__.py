@@ -19,5 +19,13 @@ if not logger.handlers:
 
 # Export metadata
 __version__ = "0.1.0"
-__all__ = ["GprMaxModel"]  # Import your public API symbols
-from .gprmax_model import GprMaxModel
\ No newline at end of file
+__all__ = ["GprMaxModel", "ResultCache", "run_many", "place_targets", "ModelResult", "consolidate_runs", "RunCatalog", "RunMonitor", "consolidate_snapshots"]  # Import your public API symbols
+from .gprmax_model import GprMaxModel
+from .cache import ResultCache
+from .sweep import run_many
+from .placement import place_targets
+from .output import ModelResult
+from .consolidate import consolidate_runs
+from .catalog import RunCatalog
+from .monitor import RunMonitor
+from .snapshots import consolidate_snapshots
\ No newline at end of file
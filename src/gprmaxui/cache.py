@@ -0,0 +1,279 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from gprmaxui.utils import rmdir, virtual_merged_sources
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_SIZE = 10 * 1024**3
+
+
+def default_cache_root() -> Path:
+    """
+    Get the root folder used by gprmaxui to store local caches.
+
+    The location can be overridden with the GPRMAXUI_CACHE_DIR environment variable.
+
+    Returns:
+        Path: The cache root folder.
+    """
+    cache_root = os.environ.get("GPRMAXUI_CACHE_DIR")
+    if cache_root:
+        return Path(cache_root)
+    return Path.home().joinpath(".cache", "gprmaxui")
+
+
+def _gprmax_version() -> Optional[str]:
+    try:
+        from gprMax._version import __version__
+    except ImportError:
+        return None
+    return __version__
+
+
+def _is_cached_artifact(path: Path) -> bool:
+    if path.is_dir():
+        return path.name.startswith("sim_snaps")
+    if path.name == "output_merged.out":
+        return True
+    if path.name.startswith("sim_snaps") and path.suffix == ".h5":
+        return True
+    return path.name.startswith("geometry") and path.suffix == ".vti"
+
+
+def _folder_size(folder: Path) -> int:
+    total = 0
+    for root, _, files in os.walk(folder):
+        for filename in files:
+            try:
+                total += os.path.getsize(os.path.join(root, filename))
+            except OSError:
+                pass
+    return total
+
+
+class ResultCache:
+    """
+    Content-addressed cache of finished simulation outputs.
+
+    Each entry is keyed by a hash of the rendered input file, the number of traces and the
+    run options, and holds the merged output together with the geometry and snapshot
+    artifacts of the run. Entries are evicted in least recently used order once the cache
+    grows past max_size bytes.
+    """
+
+    def __init__(
+        self,
+        cache_dir: Union[str, Path, None] = None,
+        max_size: int = DEFAULT_CACHE_SIZE,
+    ):
+        """
+        Initialize the result cache.
+
+        Args:
+            cache_dir (str | Path | None): Folder holding the cache entries. Defaults to "results" under the gprmaxui cache root.
+            max_size (int): Maximum size of the cache in bytes.
+        """
+        if isinstance(max_size, bool) or not isinstance(max_size, int) or max_size < 0:
+            raise ValueError("max_size must be a non-negative integer")
+        if cache_dir is None:
+            cache_dir = default_cache_root().joinpath("results")
+        self.cache_dir = Path(cache_dir)
+        self.max_size = max_size
+
+    @staticmethod
+    def key(input_text: str, n_traces: int, options: Dict[str, Any] = None) -> str:
+        """
+        Compute the cache key of a simulation.
+
+        Args:
+            input_text (str): Rendered gprMax input file.
+            n_traces (int): Number of traces of the run.
+            options (Dict[str, Any]): Run options that change the generated outputs.
+
+        Returns:
+            str: Hex digest identifying the simulation.
+        """
+        payload = json.dumps(
+            {
+                "input": input_text,
+                "n": n_traces,
+                "options": options or {},
+                "gprMax": _gprmax_version(),
+            },
+            sort_keys=True,
+            default=str,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _entry_path(self, key: str) -> Path:
+        return self.cache_dir.joinpath(key)
+
+    def __contains__(self, key: str) -> bool:
+        return self._entry_path(key).is_dir()
+
+    def restore(self, key: str, output_folder: Path) -> bool:
+        """
+        Copy the artifacts of a cached simulation into an output folder.
+
+        Args:
+            key (str): Cache key of the simulation.
+            output_folder (Path): Destination folder.
+
+        Returns:
+            bool: True on a cache hit, False otherwise.
+        """
+        entry = self._entry_path(key)
+        if not entry.is_dir():
+            return False
+
+        output_folder.mkdir(parents=True, exist_ok=True)
+        for artifact in entry.iterdir():
+            target = output_folder.joinpath(artifact.name)
+            if artifact.is_dir():
+                shutil.copytree(artifact, target, dirs_exist_ok=True)
+            else:
+                shutil.copy2(artifact, target)
+
+        # mark the entry as recently used
+        os.utime(entry)
+        logger.info(f"Restored cached simulation {key[:12]} into {output_folder}")
+        return True
+
+    def store(self, key: str, output_folder: Path) -> bool:
+        """
+        Store the artifacts of a finished simulation.
+
+        Args:
+            key (str): Cache key of the simulation.
+            output_folder (Path): Folder holding the simulation outputs.
+
+        Returns:
+            bool: True if the entry was stored, False otherwise.
+        """
+        entry = self._entry_path(key)
+        if entry.is_dir():
+            os.utime(entry)
+            return True
+
+        artifacts = [
+            path for path in output_folder.iterdir() if _is_cached_artifact(path)
+        ]
+        if not artifacts:
+            return False
+        merged_file = output_folder.joinpath("output_merged.out")
+        if merged_file.exists():
+            # a virtual merged file is only readable together with the trace files it maps
+            artifacts.extend(
+                source
+                for source in virtual_merged_sources(merged_file)
+                if source.exists() and source.parent.resolve() == output_folder.resolve()
+            )
+
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        staging = Path(tempfile.mkdtemp(prefix=f".{key[:12]}-", dir=self.cache_dir))
+        try:
+            for artifact in artifacts:
+                target = staging.joinpath(artifact.name)
+                if artifact.is_dir():
+                    shutil.copytree(artifact, target)
+                else:
+                    shutil.copy2(artifact, target)
+
+            if _folder_size(staging) > self.max_size:
+                logger.warning(
+                    f"Simulation outputs in {output_folder} exceed the cache size limit and were not cached"
+                )
+                return False
+
+            try:
+                os.rename(staging, entry)
+            except OSError:
+                # another process stored the same simulation first
+                if not entry.is_dir():
+                    raise
+                return True
+        finally:
+            if staging.exists():
+                rmdir(staging)
+
+        self.evict()
+        return True
+
+    def entries(self) -> List[Tuple[Path, int, float]]:
+        """
+        List the cache entries.
+
+        Returns:
+            List[Tuple[Path, int, float]]: Entry folder, size in bytes and last access time, least recently used first.
+        """
+        if not self.cache_dir.exists():
+            return []
+        entries = []
+        for entry in self.cache_dir.iterdir():
+            if not entry.is_dir() or entry.name.startswith("."):
+                continue
+            entries.append((entry, _folder_size(entry), entry.stat().st_mtime))
+        entries.sort(key=lambda item: item[2])
+        return entries
+
+    def size(self) -> int:
+        """
+        Get the total size of the cache.
+
+        Returns:
+            int: Size of all the cache entries in bytes.
+        """
+        return sum(size for _, size, _ in self.entries())
+
+    def evict(self) -> None:
+        """
+        Remove least recently used entries until the cache fits in max_size bytes.
+        """
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        for entry, size, _ in entries:
+            if total <= self.max_size:
+                break
+            rmdir(entry)
+            total -= size
+            logger.debug(f"Evicted cached simulation {entry.name[:12]}")
+
+    def clear(self) -> None:
+        """
+        Remove every entry from the cache.
+        """
+        for entry, _, _ in self.entries():
+            rmdir(entry)
+
+
+def resolve_result_cache(
+    cache: Union[bool, str, Path, ResultCache, None],
+) -> Optional[ResultCache]:
+    """
+    Build the result cache selected by the cache option of GprMaxModel.run.
+
+    Args:
+        cache (bool | str | Path | ResultCache | None): True for the default cache, a folder for a cache stored there,
+            a ResultCache instance, or None/False to disable caching.
+
+    Returns:
+        Optional[ResultCache]: The selected cache, or None when caching is disabled.
+    """
+    if cache is None or cache is False:
+        return None
+    if cache is True:
+        return ResultCache()
+    if isinstance(cache, ResultCache):
+        return cache
+    if isinstance(cache, (str, Path)):
+        return ResultCache(cache)
+    raise TypeError("cache must be a bool, a folder path or a ResultCache instance")
@@ -0,0 +1,351 @@
+from __future__ import annotations
+
+import json
+import logging
+import os
+import sqlite3
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional, Tuple, Union
+
+import h5py
+
+from gprmaxui.output import ModelResult
+
+logger = logging.getLogger(__name__)
+
+MODEL_JSON = "model.json"
+RUN_JSON = "run.json"
+MERGED_OUTPUT = "output_merged.out"
+
+# run level fields that can be queried next to the model parameters
+RUN_COLUMNS = ("title", "nrx", "iterations", "n_traces", "dt", "started", "elapsed", "cached")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    folder TEXT UNIQUE NOT NULL,
+    signature TEXT NOT NULL,
+    title TEXT,
+    output_file TEXT,
+    nrx INTEGER,
+    iterations INTEGER,
+    n_traces INTEGER,
+    dt REAL,
+    shapes TEXT,
+    started REAL,
+    elapsed REAL,
+    cached INTEGER
+);
+CREATE TABLE IF NOT EXISTS params (
+    run_id INTEGER NOT NULL REFERENCES runs(id) ON DELETE CASCADE,
+    key TEXT NOT NULL,
+    item TEXT NOT NULL,
+    num REAL,
+    text TEXT
+);
+CREATE INDEX IF NOT EXISTS params_num ON params (key, num);
+CREATE INDEX IF NOT EXISTS params_text ON params (key, text);
+CREATE INDEX IF NOT EXISTS params_run ON params (run_id, item);
+"""
+
+
+def flatten_params(obj: Any, key: str = "", item: Tuple[int, ...] = ()) -> Iterator[Tuple[str, str, Any]]:
+    """
+    Flatten a model description into (key, item, value) rows.
+
+    Nested fields are joined with dots and list indices are moved out of the key into the item,
+    so that materials[1].permittivity becomes ("materials.permittivity", "1", 5.0).
+
+    Args:
+        obj (Any): The parsed model JSON, or a part of it.
+        key (str): Key of obj.
+        item (Tuple[int, ...]): List indices leading to obj.
+
+    Yields:
+        Tuple[str, str, Any]: The key, the item and the scalar value of every leaf.
+    """
+    if isinstance(obj, Mapping):
+        for name, value in obj.items():
+            yield from flatten_params(value, f"{key}.{name}" if key else name, item)
+    elif isinstance(obj, (list, tuple)):
+        for index, value in enumerate(obj):
+            yield from flatten_params(value, key, item + (index,))
+    elif obj is not None:
+        yield key, ".".join(map(str, item)), obj
+
+
+def _signature(folder: Path) -> Optional[str]:
+    parts = []
+    for name in (MODEL_JSON, MERGED_OUTPUT, RUN_JSON):
+        try:
+            stat = folder.joinpath(name).stat()
+        except FileNotFoundError:
+            if name == RUN_JSON:
+                continue
+            return None
+        parts.append(f"{name}:{stat.st_mtime_ns}:{stat.st_size}")
+    return ";".join(parts)
+
+
+def _output_shapes(output_file: Path) -> Dict[str, Any]:
+    with h5py.File(output_file, "r") as f:
+        nrx = int(f.attrs["nrx"])
+        shapes = {
+            f"rx{rx}/{output}": list(f[f"/rxs/rx{rx}/{output}"].shape)
+            for rx in range(1, nrx + 1)
+            for output in f[f"/rxs/rx{rx}"].keys()
+        }
+        iterations, n_traces = next(iter(shapes.values()), (int(f.attrs["Iterations"]), 0))
+        return {
+            "nrx": nrx,
+            "iterations": iterations,
+            "n_traces": n_traces,
+            "dt": float(f.attrs["dt"]),
+            "shapes": shapes,
+        }
+
+
+@dataclass(frozen=True)
+class CatalogRun:
+    """
+    A run found in the catalog. The model and the outputs are only opened on request.
+    """
+
+    folder: Path
+    title: str
+    nrx: int
+    iterations: int
+    n_traces: int
+    dt: float
+    shapes: Dict[str, List[int]]
+    started: Optional[float]
+    elapsed: Optional[float]
+    cached: Optional[bool]
+
+    @property
+    def output_file(self) -> Path:
+        return self.folder.joinpath(MERGED_OUTPUT)
+
+    def model(self):
+        """
+        Load the model of the run from its model.json.
+
+        Returns:
+            GprMaxModel: The model.
+        """
+        from gprmaxui.gprmax_model import GprMaxModel
+
+        return GprMaxModel.from_json(self.folder.joinpath(MODEL_JSON))
+
+    def result(self) -> ModelResult:
+        """
+        Open the merged output file of the run.
+
+        Returns:
+            ModelResult: Lazy accessor of the outputs.
+        """
+        return ModelResult(self.output_file)
+
+
+class RunCatalog:
+    """
+    SQLite index of finished runs, queryable by the parameters of their models.
+
+    A run is an output folder with a model.json (written by GprMaxModel.run) and an output_merged.out.
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        """
+        Open the catalog, creating it if it does not exist.
+
+        Args:
+            path (str | Path): The SQLite database file.
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._connection = sqlite3.connect(self.path)
+        self._connection.execute("PRAGMA foreign_keys = ON")
+        self._connection.executescript(SCHEMA)
+
+    def _indexed_signatures(self) -> Dict[str, str]:
+        return dict(self._connection.execute("SELECT folder, signature FROM runs"))
+
+    def _index_run(self, folder: Path, signature: str) -> None:
+        model = json.loads(folder.joinpath(MODEL_JSON).read_text())
+        outputs = _output_shapes(folder.joinpath(MERGED_OUTPUT))
+        run_file = folder.joinpath(RUN_JSON)
+        record = json.loads(run_file.read_text()) if run_file.exists() else {}
+
+        connection = self._connection
+        connection.execute("DELETE FROM runs WHERE folder = ?", (str(folder),))
+        run_id = connection.execute(
+            "INSERT INTO runs (folder, signature, title, output_file, nrx, iterations, n_traces, dt, "
+            "shapes, started, elapsed, cached) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                str(folder),
+                signature,
+                model.get("title"),
+                str(folder.joinpath(MERGED_OUTPUT)),
+                outputs["nrx"],
+                outputs["iterations"],
+                outputs["n_traces"],
+                outputs["dt"],
+                json.dumps(outputs["shapes"]),
+                record.get("started"),
+                record.get("elapsed"),
+                record.get("cached"),
+            ),
+        ).lastrowid
+        connection.executemany(
+            "INSERT INTO params (run_id, key, item, num, text) VALUES (?, ?, ?, ?, ?)",
+            (
+                (run_id, key, item, None, value)
+                if isinstance(value, str)
+                else (run_id, key, item, float(value), None)
+                for key, item, value in flatten_params(model)
+            ),
+        )
+
+    def scan(self, runs: Union[str, Path, Iterable[Union[str, Path]]]) -> int:
+        """
+        Index the finished runs that are new or changed since the last scan.
+
+        Runs are recognised by the modification times and sizes of their model.json, run.json and
+        output_merged.out, so re-scanning a folder only reads the runs that were added or re-run.
+
+        Args:
+            runs (str | Path | Iterable): Output folders of the runs, or a folder whose subfolders are the runs.
+
+        Returns:
+            int: Number of runs indexed.
+        """
+        if isinstance(runs, (str, Path)):
+            with os.scandir(runs) as entries:
+                folders = sorted(Path(entry.path) for entry in entries if entry.is_dir())
+        else:
+            folders = [Path(folder) for folder in runs]
+
+        indexed = self._indexed_signatures()
+        n_indexed = 0
+        with self._connection:
+            for folder in folders:
+                folder = folder.resolve()
+                signature = _signature(folder)
+                if signature is None or indexed.get(str(folder)) == signature:
+                    continue
+                try:
+                    self._index_run(folder, signature)
+                except (OSError, KeyError, ValueError) as e:
+                    logger.warning(f"Skipping {folder}, it could not be indexed: {e}")
+                    continue
+                n_indexed += 1
+        return n_indexed
+
+    def query(self, *groups: Mapping[str, Any], **conditions: Any) -> List[CatalogRun]:
+        """
+        Find the runs matching all the given conditions.
+
+        A condition maps a flattened key (e.g. "materials.permittivity" or "geometry.radius", see
+        flatten_params) or a run field (title, nrx, iterations, n_traces, dt, started, elapsed, cached)
+        to a value, or to a (low, high) range where None leaves a bound open. The conditions of a group
+        must hold for the same list element, e.g.
+        query({"materials.id": "sand", "materials.permittivity": (3, 5)}, {"geometry.name": "sphere", "geometry.y": (None, 0.9)}).
+        Keyword conditions are independent groups, with "__" standing for ".".
+
+        Args:
+            *groups (Mapping[str, Any]): Groups of conditions on the same list element.
+            **conditions (Any): Independent conditions.
+
+        Returns:
+            List[CatalogRun]: The matching runs, ordered by folder.
+        """
+        groups = list(groups) + [{key.replace("__", "."): value} for key, value in conditions.items()]
+        where = []
+        values: List[Any] = []
+        for group in groups:
+            run_conditions = {key: value for key, value in group.items() if key in RUN_COLUMNS}
+            param_conditions = [(key, value) for key, value in group.items() if key not in RUN_COLUMNS]
+            for column, value in run_conditions.items():
+                clause, clause_values = _value_clause(f"runs.{column}", column, value)
+                where.append(clause)
+                values.extend(clause_values)
+            if not param_conditions:
+                continue
+
+            joins = []
+            clauses = []
+            for index, (key, value) in enumerate(param_conditions):
+                alias = f"p{index}"
+                if index:
+                    joins.append(f"JOIN params {alias} ON {alias}.run_id = p0.run_id AND {alias}.item = p0.item")
+                clause, clause_values = _value_clause(alias, key, value)
+                clauses.append(f"{alias}.key = ?")
+                values.append(key)
+                clauses.append(clause)
+                values.extend(clause_values)
+            where.append(
+                f"runs.id IN (SELECT p0.run_id FROM params p0 {' '.join(joins)} WHERE {' AND '.join(clauses)})"
+            )
+
+        sql = (
+            "SELECT folder, title, nrx, iterations, n_traces, dt, shapes, started, elapsed, cached FROM runs"
+        )
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY folder"
+        return [
+            CatalogRun(
+                folder=Path(folder),
+                title=title,
+                nrx=nrx,
+                iterations=iterations,
+                n_traces=n_traces,
+                dt=dt,
+                shapes=json.loads(shapes),
+                started=started,
+                elapsed=elapsed,
+                cached=None if cached is None else bool(cached),
+            )
+            for folder, title, nrx, iterations, n_traces, dt, shapes, started, elapsed, cached in self._connection.execute(sql, values)
+        ]
+
+    def __len__(self) -> int:
+        return self._connection.execute("SELECT COUNT(*) FROM runs").fetchone()[0]
+
+    def close(self) -> None:
+        """
+        Close the database connection.
+        """
+        self._connection.close()
+
+    def __enter__(self) -> RunCatalog:
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+
+def _value_clause(target: str, key: str, value: Any) -> Tuple[str, List[Any]]:
+    # params rows keep strings in text and numbers in num, run columns are compared directly
+    is_run_column = target.startswith("runs.")
+    if isinstance(value, tuple):
+        if len(value) != 2:
+            raise ValueError(f"The range of {key} must be a (low, high) tuple")
+        column = target if is_run_column else f"{target}.num"
+        clauses, values = [], []
+        low, high = value
+        if low is not None:
+            clauses.append(f"{column} >= ?")
+            values.append(low)
+        if high is not None:
+            clauses.append(f"{column} <= ?")
+            values.append(high)
+        if not clauses:
+            clauses.append(f"{column} IS NOT NULL")
+        return " AND ".join(clauses), values
+    if is_run_column:
+        return f"{target} = ?", [value]
+    if isinstance(value, str):
+        return f"{target}.text = ?", [value]
+    return f"{target}.num = ?", [float(value)]
@@ -2,9 +2,10 @@ from __future__ import annotations
 
 import logging
 import re
+from functools import lru_cache
 from io import StringIO
 from pathlib import Path
-from typing import Callable, Dict, Any
+from typing import Callable, Dict, Any, Optional, TextIO, Tuple
 
 from pydantic import BaseModel, create_model, Field
 
@@ -32,14 +33,27 @@ class BaseCommand(BaseModel):
     Abstract class representing a command.
     """
 
-    def __call__(self, *args: Any, **kwargs: Any) -> None:
+    def __call__(self, out: Optional[TextIO] = None, *args: Any, **kwargs: Any) -> None:
         """
-        Execute the command and print it.
+        Execute the command and write it to a stream, or print it if no stream is given.
 
+        :param out: The text stream to write the command to.
         :param args: Positional arguments for command execution.
         :param kwargs: Keyword arguments for command execution.
         """
-        self.print()
+        if out is None:
+            self.print()
+        else:
+            self.write(out)
+
+    def write(self, out: TextIO) -> None:
+        """
+        Write the string representation of the command as a line of a text stream.
+
+        :param out: The text stream to write the command to.
+        """
+        out.write(str(self))
+        out.write("\n")
 
     def print(self) -> None:
         """
@@ -48,6 +62,21 @@ class BaseCommand(BaseModel):
         print(self)
 
 
+@lru_cache(maxsize=None)
+def _command_field_names(command_class: type) -> Tuple[str, ...]:
+    """
+    Get the names of the fields written in the command line of a command class.
+
+    :param command_class: The command class.
+    :return: The names of the fields, in declaration order.
+    """
+    return tuple(
+        field_name
+        for field_name, field in command_class.model_fields.items()
+        if field_name != "name" and not field.exclude
+    )
+
+
 class Command(BaseCommand):
     """
     Base class for individual commands.
@@ -71,9 +100,13 @@ class Command(BaseCommand):
 
         :return: A formatted string representing the command.
         """
-        fields = self.model_dump(exclude_none=True)
-        cmd_name = fields.pop("name")
-        return f"#{cmd_name}: {' '.join(map(Command._process_field_value, fields.values()))}"
+        fields = self.__dict__
+        values = [
+            Command._process_field_value(fields[field_name])
+            for field_name in _command_field_names(type(self))
+            if fields[field_name] is not None
+        ]
+        return f"#{self.name}: {' '.join(values)}"
 
 
 class StackCommand(BaseCommand):
@@ -87,7 +120,7 @@ class StackCommand(BaseCommand):
 
         :return: A formatted string representing the stack command.
         """
-        fields = self.model_fields
+        fields = type(self).model_fields
         with StringIO() as str_buffer:
             for field_name, field in fields.items():
                 field_value = getattr(self, field_name)
@@ -3,9 +3,17 @@ from __future__ import annotations
 import math
 import typing
 
-from pydantic import Field, BaseModel
-
-from gprmaxui.commands.commands_parser import CommandParser, Command
+import numpy as np
+from pydantic import (
+    BaseModel,
+    ConfigDict,
+    Field,
+    PlainSerializer,
+    PlainValidator,
+    model_validator,
+)
+
+from gprmaxui.commands.commands_parser import BaseCommand, CommandParser, Command
 from gprmaxui.commands.domain_commands import DomainSize
 
 
@@ -214,4 +222,209 @@ class GeometryObjectsRead(Command):
     y: float
     z: float
     filename: str
-    materials_filename: str
\ No newline at end of file
+    materials_filename: str
+
+def _float_column(value: typing.Any) -> np.ndarray:
+    column = np.asarray(value, dtype=np.float64)
+    if column.ndim != 1:
+        raise ValueError("Geometry array columns must be one-dimensional")
+    return column
+
+
+def _index_column(value: typing.Any) -> np.ndarray:
+    column = np.asarray(value, dtype=np.int64)
+    if column.ndim != 1:
+        raise ValueError("Geometry array columns must be one-dimensional")
+    return column
+
+
+FloatColumn = typing.Annotated[
+    np.ndarray,
+    PlainValidator(_float_column),
+    PlainSerializer(lambda column: column.tolist(), return_type=list),
+]
+IndexColumn = typing.Annotated[
+    np.ndarray,
+    PlainValidator(_index_column),
+    PlainSerializer(lambda column: column.tolist(), return_type=list),
+]
+
+
+class GeometryArray(BaseCommand):
+    """
+    Base class for collections of geometry objects of the same kind stored as NumPy columns.
+    Each object is rendered as its own command line, identical to the one of the single-object
+    command, but the whole collection is validated and formatted at once.
+    """
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    command_name: typing.ClassVar[str]
+    columns: typing.ClassVar[typing.Tuple[str, ...]]
+    row_class: typing.ClassVar[type]
+
+    materials: typing.List[str]
+    material_index: IndexColumn
+    dielectric_smoothing: typing.Literal["y", "n"] = "n"
+
+    @model_validator(mode="before")
+    @classmethod
+    def _expand_arguments(cls, data: typing.Any) -> typing.Any:
+        """
+        Broadcast scalar columns and build the materials table from material names.
+
+        :param data: The raw field values.
+        :return: The field values with one entry per object in every column.
+        """
+        if not isinstance(data, dict):
+            return data
+        data = dict(data)
+        lengths = [np.size(data[column]) for column in cls.columns if np.ndim(data.get(column)) > 0]
+        n_objects = max(lengths, default=1)
+        for column in cls.columns:
+            if column in data and np.ndim(data[column]) == 0:
+                data[column] = np.full(n_objects, data[column], dtype=np.float64)
+
+        if "material" in data:
+            material = data.pop("material")
+            if isinstance(material, str):
+                data["materials"] = [material]
+                data["material_index"] = np.zeros(n_objects, dtype=np.int64)
+            else:
+                material = list(material)
+                materials = list(dict.fromkeys(material))
+                lookup = {name: index for index, name in enumerate(materials)}
+                data["materials"] = materials
+                data["material_index"] = [lookup[name] for name in material]
+        return data
+
+    @model_validator(mode="after")
+    def _check_columns(self) -> GeometryArray:
+        """
+        Check that every column describes the same objects.
+
+        :return: The validated collection.
+        """
+        lengths = {len(getattr(self, column)) for column in self.columns}
+        lengths.add(len(self.material_index))
+        if len(lengths) > 1:
+            raise ValueError("All the columns of a geometry array must have the same length")
+        if len(self.material_index) and (
+            self.material_index.min() < 0 or self.material_index.max() >= len(self.materials)
+        ):
+            raise ValueError("Material index out of range of the materials table")
+        return self
+
+    @classmethod
+    def from_commands(cls, commands: typing.Sequence[Command]) -> GeometryArray:
+        """
+        Pack single-object commands into a geometry array.
+
+        :param commands: Commands of the row class of the array.
+        :return: The geometry array holding the same objects.
+        """
+        commands = list(commands)
+        assert all(
+            isinstance(command, cls.row_class) for command in commands
+        ), f"All commands must be instances of {cls.row_class.__name__}"
+        smoothing = {command.dielectric_smoothing for command in commands}
+        if len(smoothing) > 1:
+            raise ValueError("All the objects of a geometry array must share dielectric_smoothing")
+        return cls(
+            **{
+                column: [getattr(command, column) for command in commands]
+                for column in cls.columns
+            },
+            material=[command.material for command in commands],
+            dielectric_smoothing=smoothing.pop() if smoothing else "n",
+        )
+
+    @property
+    def material(self) -> np.ndarray:
+        """
+        The material name of each object.
+
+        :return: An array of material names.
+        """
+        return np.asarray(self.materials, dtype=object)[self.material_index]
+
+    def __len__(self) -> int:
+        return len(self.material_index)
+
+    def __iter__(self) -> typing.Iterator[Command]:
+        """
+        Iterate over the objects as single-object commands.
+
+        :return: An iterator of row commands.
+        """
+        columns = [getattr(self, column).tolist() for column in self.columns]
+        for *values, material in zip(*columns, self.material.tolist()):
+            yield self.row_class(
+                **dict(zip(self.columns, values)),
+                material=material,
+                dielectric_smoothing=self.dielectric_smoothing,
+            )
+
+    def __str__(self) -> str:
+        """
+        Generate the command lines of every object in one pass.
+
+        :return: The command lines, one per object.
+        """
+        columns = [getattr(self, column).astype(str).tolist() for column in self.columns]
+        prefix = f"#{self.command_name}:"
+        return "\n".join(
+            f"{prefix} {' '.join(values)} {material} {self.dielectric_smoothing}"
+            for *values, material in zip(*columns, self.material.tolist())
+        )
+
+    def write(self, out: typing.TextIO) -> None:
+        """
+        Write the command lines of every object to a text stream.
+
+        :param out: The text stream to write the commands to.
+        """
+        if len(self):
+            out.write(str(self))
+            out.write("\n")
+
+
+class SphereArray(GeometryArray):
+    """
+    A collection of spheres stored as NumPy columns, rendered as #sphere commands.
+    """
+
+    command_name: typing.ClassVar[str] = "sphere"
+    columns: typing.ClassVar[typing.Tuple[str, ...]] = ("cx", "cy", "cz", "radius")
+    row_class: typing.ClassVar[type] = DomainSphere
+
+    name: typing.Literal["sphere_array"] = "sphere_array"
+    cx: FloatColumn
+    cy: FloatColumn
+    cz: FloatColumn
+    radius: FloatColumn
+
+
+class BoxArray(GeometryArray):
+    """
+    A collection of boxes stored as NumPy columns, rendered as #box commands.
+    """
+
+    command_name: typing.ClassVar[str] = "box"
+    columns: typing.ClassVar[typing.Tuple[str, ...]] = (
+        "x_min",
+        "y_min",
+        "z_min",
+        "x_max",
+        "y_max",
+        "z_max",
+    )
+    row_class: typing.ClassVar[type] = DomainBox
+
+    name: typing.Literal["box_array"] = "box_array"
+    x_min: FloatColumn
+    y_min: FloatColumn
+    z_min: FloatColumn
+    x_max: FloatColumn
+    y_max: FloatColumn
+    z_max: FloatColumn
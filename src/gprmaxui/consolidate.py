@@ -0,0 +1,234 @@
+from __future__ import annotations
+
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+import h5py
+import numpy as np
+from tqdm import tqdm
+
+from gprmaxui.utils import merge_model_files
+
+logger = logging.getLogger(__name__)
+
+MERGED_OUTPUT = "output_merged.out"
+MODEL_JSON = "model.json"
+
+
+@dataclass(frozen=True)
+class ShardLayout:
+    datasets: Tuple[str, ...]
+    iterations: int
+    n_traces: int
+    dt: float
+    dtype: str
+
+
+@dataclass(frozen=True)
+class ShardTask:
+    shard_file: str
+    first_run: int
+    run_folders: Tuple[str, ...]
+    layout: ShardLayout
+    storage: Dict[str, Any]
+
+
+def _trace_file_version(output_folder: Path) -> Optional[str]:
+    for trace_file in output_folder.glob("*.out"):
+        with h5py.File(trace_file, "r") as f:
+            version = f.attrs.get("gprMax")
+        return None if version is None else str(version)
+    return None
+
+
+def _merged_output_file(output_folder: Path) -> Path:
+    output_file = output_folder.joinpath(MERGED_OUTPUT)
+    if not output_file.exists():
+        merge_model_files(output_folder, output_file, _trace_file_version(output_folder))
+    return output_file
+
+
+def _find_runs(runs: Union[str, Path, Sequence[Union[str, Path]]]) -> List[Path]:
+    if isinstance(runs, (str, Path)):
+        root = Path(runs)
+        return sorted(
+            folder
+            for folder in root.iterdir()
+            if folder.is_dir()
+            and (folder.joinpath(MERGED_OUTPUT).exists() or any(folder.glob("*.out")))
+        )
+    return [Path(folder) for folder in runs]
+
+
+def _read_layout(output_file: Path, components: Optional[Sequence[str]]) -> ShardLayout:
+    with h5py.File(output_file, "r") as f:
+        datasets = []
+        for rx in range(1, f.attrs["nrx"] + 1):
+            for output in f[f"/rxs/rx{rx}"].keys():
+                if components is None or output in components:
+                    datasets.append(f"/rxs/rx{rx}/{output}")
+        if not datasets:
+            raise ValueError(f"No receiver outputs to consolidate in {output_file}")
+        iterations, n_traces = f[datasets[0]].shape
+        return ShardLayout(
+            datasets=tuple(datasets),
+            iterations=iterations,
+            n_traces=n_traces,
+            dt=float(f.attrs["dt"]),
+            dtype=str(f[datasets[0]].dtype),
+        )
+
+
+def _merged_output_signature(output_file: Path) -> Tuple[int, int]:
+    # re-merged runs (e.g. a resumed run) change the modification time and size of the merged file
+    stat = output_file.stat()
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _shard_is_complete(shard_file: Path, run_folders: Sequence[str]) -> bool:
+    try:
+        with h5py.File(shard_file, "r") as f:
+            stored = [folder.decode() if isinstance(folder, bytes) else folder for folder in f["runs/folder"][()]]
+            signatures = [tuple(int(v) for v in row) for row in zip(f["runs/mtime_ns"][()], f["runs/size"][()])]
+    except (OSError, KeyError):
+        return False
+    if stored != list(run_folders):
+        return False
+    for folder, signature in zip(run_folders, signatures):
+        output_file = Path(folder).joinpath(MERGED_OUTPUT)
+        if not output_file.exists() or _merged_output_signature(output_file) != signature:
+            return False
+    return True
+
+
+def _write_shard(task: ShardTask) -> str:
+    layout = task.layout
+    shard_file = Path(task.shard_file)
+    n_runs = len(task.run_folders)
+    staging = shard_file.with_name(f".{shard_file.name}.tmp")
+    models = []
+    signatures = []
+    with h5py.File(staging, "w") as fout:
+        fout.attrs["dt"] = layout.dt
+        fout.attrs["Iterations"] = layout.iterations
+        fout.attrs["n_traces"] = layout.n_traces
+        fout.attrs["first_run"] = task.first_run
+        for path in layout.datasets:
+            fout.create_dataset(
+                path,
+                (n_runs, layout.iterations, layout.n_traces),
+                dtype=np.dtype(task.storage.get("dtype") or layout.dtype),
+                # one chunk per run, so a batch of consecutive runs is a contiguous read
+                chunks=(1, layout.iterations, layout.n_traces),
+                compression=task.storage.get("compression"),
+                compression_opts=task.storage.get("compression_opts"),
+                shuffle=task.storage.get("shuffle", False),
+            )
+
+        for index, folder in enumerate(task.run_folders):
+            folder = Path(folder)
+            output_file = _merged_output_file(folder)
+            signatures.append(_merged_output_signature(output_file))
+            with h5py.File(output_file, "r") as fin:
+                for path in layout.datasets:
+                    if path not in fin or fin[path].shape != (layout.iterations, layout.n_traces):
+                        raise ValueError(
+                            f"{folder} does not match the layout of the consolidated runs: "
+                            f"{path} must have shape {(layout.iterations, layout.n_traces)}"
+                        )
+                    fout[path][index] = fin[path][()]
+            model_json = folder.joinpath(MODEL_JSON)
+            models.append(model_json.read_text() if model_json.exists() else "")
+
+        runs = fout.create_group("runs")
+        runs.create_dataset("index", data=np.arange(task.first_run, task.first_run + n_runs))
+        runs.create_dataset("folder", data=list(task.run_folders), dtype=h5py.string_dtype())
+        runs.create_dataset("model", data=models, dtype=h5py.string_dtype())
+        runs.create_dataset("mtime_ns", data=np.array([mtime for mtime, _ in signatures], dtype=np.int64))
+        runs.create_dataset("size", data=np.array([size for _, size in signatures], dtype=np.int64))
+    os.replace(staging, shard_file)
+    return task.shard_file
+
+
+def consolidate_runs(
+    runs: Union[str, Path, Sequence[Union[str, Path]]],
+    output_folder: Union[str, Path],
+    runs_per_shard: int = 256,
+    components: Optional[Sequence[str]] = None,
+    workers: Optional[int] = None,
+    dtype: Optional[str] = None,
+    compression: Optional[str] = None,
+    compression_opts: Optional[int] = None,
+    shuffle: bool = False,
+) -> List[Path]:
+    """
+    Consolidate the B-scans of many runs into a few large HDF5 shards.
+
+    Each shard holds, for every receiver output, a dataset of shape (runs, iterations, traces) at
+    /rxs/rxN/<component>, chunked by run. The run index, output folder and model JSON (written by
+    GprMaxModel.run as model.json) of each run are stored in /runs/index, /runs/folder and /runs/model,
+    and the modification time and size of its merged output in /runs/mtime_ns and /runs/size.
+    Runs without a merged output are merged first. Shards are written under a temporary name and
+    renamed once complete, and shards that already hold the same runs, with unchanged merged outputs,
+    are skipped, so an interrupted consolidation resumes where it stopped.
+
+    Args:
+        runs (str | Path | Sequence): Output folders of the runs, or a folder whose subfolders are the runs
+            (e.g. the output_root of run_many).
+        output_folder (str | Path): Folder the shards are written to.
+        runs_per_shard (int): Number of runs stored in each shard.
+        components (Optional[Sequence[str]]): Receiver outputs to keep, e.g. ["Ez"]. Defaults to all.
+        workers (Optional[int]): Number of shards written in parallel. Defaults to the number of CPUs.
+        dtype (Optional[str]): Storage type of the shard datasets, e.g. "float16".
+        compression (Optional[str]): HDF5 compression filter, "gzip" or "lzf".
+        compression_opts (Optional[int]): Compression level of the gzip filter.
+        shuffle (bool): Whether to apply the HDF5 shuffle filter before compression.
+
+    Returns:
+        List[Path]: The shard files, in run order.
+    """
+    assert runs_per_shard > 0, "runs_per_shard must be positive"
+    run_folders = [str(folder) for folder in _find_runs(runs)]
+    if not run_folders:
+        raise ValueError("No runs to consolidate")
+    if dtype is not None and np.dtype(dtype).kind != "f":
+        raise ValueError(f"Consolidated outputs must be stored as floating point, got {dtype}")
+    output_folder = Path(output_folder)
+    output_folder.mkdir(parents=True, exist_ok=True)
+
+    layout = _read_layout(_merged_output_file(Path(run_folders[0])), components)
+    storage = {
+        "dtype": dtype,
+        "compression": compression,
+        "compression_opts": compression_opts,
+        "shuffle": shuffle,
+    }
+    n_shards = (len(run_folders) + runs_per_shard - 1) // runs_per_shard
+    width = max(5, len(str(n_shards - 1)))
+    shard_files = []
+    tasks = []
+    for shard in range(n_shards):
+        first_run = shard * runs_per_shard
+        shard_runs = tuple(run_folders[first_run:first_run + runs_per_shard])
+        shard_file = output_folder.joinpath(f"shard_{shard:0{width}d}.h5")
+        shard_files.append(shard_file)
+        if _shard_is_complete(shard_file, shard_runs):
+            continue
+        tasks.append(ShardTask(str(shard_file), first_run, shard_runs, layout, storage))
+
+    if len(tasks) < n_shards:
+        logger.info(f"Resuming consolidation: {n_shards - len(tasks)} of {n_shards} shards already written")
+    workers = max(1, min(workers or os.cpu_count() or 1, len(tasks) or 1))
+    if workers == 1:
+        for task in tqdm(tasks, desc="Consolidating runs"):
+            _write_shard(task)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(_write_shard, task) for task in tasks]
+            for future in tqdm(as_completed(futures), total=len(futures), desc="Consolidating runs"):
+                future.result()
+    return shard_files
@@ -0,0 +1,281 @@
+from __future__ import annotations
+
+import json
+import logging
+import shutil
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional, Tuple, Union
+
+from gprmaxui.cache import default_cache_root
+
+logger = logging.getLogger(__name__)
+
+# Cell updates per second assumed when no local benchmark has been recorded
+DEFAULT_THROUGHPUT = 50e6
+
+FIELD_COMPONENTS = 6
+FLOAT_BYTES = 4
+VTI_HEADER_BYTES = 1024
+HDF5_OVERHEAD_BYTES = 8 * 1024
+
+
+class BudgetExceededError(RuntimeError):
+    """
+    Raised when a simulation would exceed the configured memory or disk budget.
+    """
+
+
+def default_benchmark_file() -> Path:
+    """
+    Get the file storing the local runtime benchmark.
+
+    Returns:
+        Path: The benchmark file under the gprmaxui cache root.
+    """
+    return default_cache_root().joinpath("benchmark.json")
+
+
+def load_benchmark(path: Union[str, Path, None] = None) -> Optional[float]:
+    """
+    Load the locally recorded FDTD throughput.
+
+    Args:
+        path (str | Path | None): Benchmark file. Defaults to default_benchmark_file().
+
+    Returns:
+        Optional[float]: Cell updates per second, or None if no benchmark was recorded.
+    """
+    path = Path(path) if path is not None else default_benchmark_file()
+    if not path.exists():
+        return None
+    try:
+        return float(json.loads(path.read_text())["cells_per_second"])
+    except (ValueError, KeyError, TypeError):
+        logger.warning(f"Ignoring invalid benchmark file {path}")
+        return None
+
+
+def save_benchmark(cells_per_second: float, path: Union[str, Path, None] = None) -> None:
+    """
+    Record the local FDTD throughput used to estimate runtimes.
+
+    Args:
+        cells_per_second (float): Measured cell updates per second.
+        path (str | Path | None): Benchmark file. Defaults to default_benchmark_file().
+    """
+    if cells_per_second <= 0:
+        raise ValueError("cells_per_second must be positive")
+    path = Path(path) if path is not None else default_benchmark_file()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(
+        json.dumps({"cells_per_second": cells_per_second, "recorded": time.time()})
+    )
+
+
+def calibrate(model, n: int = 1, path: Union[str, Path, None] = None, **run_kwargs) -> float:
+    """
+    Measure the FDTD throughput of this machine by running a model and record it.
+
+    The model runs in its own output folder, which is cleared as in GprMaxModel.run.
+
+    Args:
+        model (GprMaxModel): A representative model.
+        n (int): Number of traces to simulate.
+        path (str | Path | None): Benchmark file. Defaults to default_benchmark_file().
+        **run_kwargs: Options forwarded to GprMaxModel.run, e.g. num_threads.
+
+    Returns:
+        float: Measured cell updates per second.
+    """
+    nx, ny, nz = model._compute_num_cells()
+    cell_updates = nx * ny * nz * model._compute_n_iterations() * n
+    start = time.perf_counter()
+    model.run(n=n, **run_kwargs)
+    cells_per_second = cell_updates / (time.perf_counter() - start)
+    save_benchmark(cells_per_second, path)
+    return cells_per_second
+
+
+def estimate_fdtd_memory(nx: int, ny: int, nz: int, pml_cells: int = 10) -> int:
+    """
+    Estimate the memory used by gprMax to simulate a grid, following gprMax's own basic estimate.
+
+    Args:
+        nx (int): Number of cells in x.
+        ny (int): Number of cells in y.
+        nz (int): Number of cells in z.
+        pml_cells (int): PML thickness in cells on each side of the domain.
+
+    Returns:
+        int: Estimated memory in bytes.
+    """
+    overhead = 50e6
+    # 6 field arrays and 6 material ID arrays on the node grid
+    field_arrays = 12 * (nx + 1) * (ny + 1) * (nz + 1) * FLOAT_BYTES
+    # solid array (uint32) and rigid arrays (12 + 6 int8)
+    solid_array = nx * ny * nz * 4
+    rigid_arrays = 18 * nx * ny * nz
+    # four update arrays per PML slab, two slabs per direction; two-dimensional models have no PML
+    # in the direction with a single cell
+    pml_arrays = 0
+    for n_cells, area in ((nx, ny * nz), (ny, nx * nz), (nz, nx * ny)):
+        if n_cells > 1:
+            pml_arrays += 2 * 4 * (pml_cells + 1) * area * FLOAT_BYTES
+    return int(overhead + field_arrays + solid_array + rigid_arrays + pml_arrays)
+
+
+def _format_bytes(n_bytes: float) -> str:
+    for unit in ("B", "KB", "MB", "GB"):
+        if abs(n_bytes) < 1024:
+            return f"{n_bytes:.1f} {unit}"
+        n_bytes /= 1024
+    return f"{n_bytes:.1f} TB"
+
+
+@dataclass(frozen=True)
+class RunEstimate:
+    n_traces: int
+    num_cells: Tuple[int, int, int]
+    iterations: int
+    concurrency: int
+    memory_bytes: int
+    geometry_count: int
+    geometry_bytes: int
+    snapshot_count: int
+    snapshot_bytes: int
+    output_bytes: int
+    disk_bytes: int
+    runtime_seconds: float
+    calibrated: bool
+
+    def __str__(self) -> str:
+        nx, ny, nz = self.num_cells
+        runtime = f"{self.runtime_seconds:.0f} s"
+        if not self.calibrated:
+            runtime += " (uncalibrated)"
+        return "\n".join(
+            [
+                f"Grid: {nx} x {ny} x {nz} cells, {self.iterations} iterations, {self.n_traces} traces",
+                f"Memory: {_format_bytes(self.memory_bytes)} ({self.concurrency} concurrent models)",
+                f"Geometry views: {self.geometry_count} files, {_format_bytes(self.geometry_bytes)}",
+                f"Snapshots: {self.snapshot_count} files, {_format_bytes(self.snapshot_bytes)}",
+                f"Merged output: {_format_bytes(self.output_bytes)}",
+                f"Disk: {_format_bytes(self.disk_bytes)}",
+                f"Runtime: {runtime}",
+            ]
+        )
+
+    def check_budget(
+        self,
+        max_memory: Union[int, str, None] = None,
+        max_disk: Union[int, str, None] = None,
+        output_folder: Union[str, Path, None] = None,
+    ) -> None:
+        """
+        Refuse the simulation if it exceeds a memory or disk budget.
+
+        Args:
+            max_memory (int | str | None): Memory budget in bytes, or "auto" for the available RAM.
+            max_disk (int | str | None): Disk budget in bytes, or "auto" for the free space of the output folder.
+            output_folder (str | Path | None): Output folder of the run, required when max_disk is "auto".
+
+        Raises:
+            BudgetExceededError: If the estimated memory or disk usage exceeds its budget.
+        """
+        if max_memory == "auto":
+            import psutil
+
+            max_memory = psutil.virtual_memory().available
+        if max_memory is not None and self.memory_bytes > max_memory:
+            raise BudgetExceededError(
+                f"The simulation needs about {_format_bytes(self.memory_bytes)} of memory, "
+                f"over the budget of {_format_bytes(max_memory)}"
+            )
+
+        if max_disk == "auto":
+            assert output_folder is not None, "output_folder is required for max_disk='auto'"
+            folder = Path(output_folder).absolute()
+            while not folder.exists():
+                folder = folder.parent
+            max_disk = shutil.disk_usage(folder).free
+        if max_disk is not None and self.disk_bytes > max_disk:
+            raise BudgetExceededError(
+                f"The simulation writes about {_format_bytes(self.disk_bytes)} to disk, "
+                f"over the budget of {_format_bytes(max_disk)}"
+            )
+
+
+def estimate_run(
+    model,
+    n: int,
+    geometry: bool = False,
+    snapshots: bool = False,
+    snapshot_stride: int = 1,
+    concurrency: int = 1,
+    benchmark_file: Union[str, Path, None] = None,
+) -> RunEstimate:
+    """
+    Estimate the resources needed to run a model.
+
+    Args:
+        model (GprMaxModel): The model to estimate.
+        n (int): Number of traces.
+        geometry (bool): Whether geometry views are written.
+        snapshots (bool): Whether snapshots are written.
+        snapshot_stride (int): Iteration interval between snapshots.
+        concurrency (int): Number of models held in memory at the same time, e.g. MPI workers.
+        benchmark_file (str | Path | None): Benchmark file used to calibrate the runtime.
+
+    Returns:
+        RunEstimate: The estimated memory, disk usage and runtime.
+    """
+    nx, ny, nz = model._compute_num_cells()
+    cells = nx * ny * nz
+    iterations = model._compute_n_iterations()
+
+    memory_bytes = estimate_fdtd_memory(nx, ny, nz) * concurrency
+
+    # Material (uint32), Sources_PML and Receivers (int8) arrays per cell, one view per trace
+    geometry_count = n if geometry else 0
+    geometry_bytes = geometry_count * (cells * 6 + VTI_HEADER_BYTES)
+
+    # snapshots are only written together with the geometry views
+    snapshot_count = 0
+    if geometry and snapshots:
+        snapshot_count = len(range(1, iterations, snapshot_stride)) * n
+    # E-field and H-field vectors per cell
+    snapshot_bytes = snapshot_count * (
+        cells * 2 * 3 * FLOAT_BYTES + VTI_HEADER_BYTES
+    )
+
+    nrx = 1 if model.source is not None else 0
+    trace_bytes = (
+        nrx * FIELD_COMPONENTS * iterations * FLOAT_BYTES + HDF5_OVERHEAD_BYTES
+    )
+    output_bytes = trace_bytes * n
+    # per-trace output files are kept next to the merged file
+    disk_bytes = 2 * output_bytes + geometry_bytes + snapshot_bytes
+
+    cells_per_second = load_benchmark(benchmark_file)
+    calibrated = cells_per_second is not None
+    if not calibrated:
+        cells_per_second = DEFAULT_THROUGHPUT
+    runtime_seconds = cells * iterations * n / cells_per_second
+
+    return RunEstimate(
+        n_traces=n,
+        num_cells=(nx, ny, nz),
+        iterations=iterations,
+        concurrency=concurrency,
+        memory_bytes=memory_bytes,
+        geometry_count=geometry_count,
+        geometry_bytes=geometry_bytes,
+        snapshot_count=snapshot_count,
+        snapshot_bytes=snapshot_bytes,
+        output_bytes=output_bytes,
+        disk_bytes=disk_bytes,
+        runtime_seconds=runtime_seconds,
+        calibrated=calibrated,
+    )
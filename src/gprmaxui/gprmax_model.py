@@ -1,40 +1,88 @@
 from __future__ import annotations
 
+import hashlib
+import inspect
 import math
 import json
 import logging
 import os
+import re
+import shutil
 import sys
 import tempfile
+import time
 import typing
-from concurrent.futures import ProcessPoolExecutor
-from dataclasses import dataclass
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, replace
 from io import StringIO
+from itertools import islice
+from multiprocessing import shared_memory
 from pathlib import Path
-from typing import Dict, List, Tuple, Union, Optional
+from typing import Dict, List, Mapping, Optional, TextIO, Tuple, Union
 
 import cv2
 import h5py
 import matplotlib.pyplot as plt
 import numpy as np
 import pyvista as pv
+from more_itertools import divide
 from PIL import Image
 from matplotlib.backends.backend_agg import FigureCanvasAgg as FigureCanvas
+from matplotlib.colors import Colormap, Normalize
 from tqdm import tqdm
 
+from gprmaxui.cache import resolve_result_cache
 from gprmaxui.commands import *
+from gprmaxui.estimate import RunEstimate, estimate_run
+from gprmaxui.monitor import RunMonitor
+from gprmaxui.output import (
+    ModelResult,
+    RX_COMPONENTS,
+    ReceiverArray,
+    SidecarCache,
+    read_receivers,
+)
 from gprmaxui.plotter import PlotterDialog
+from gprmaxui.raster import SnapshotRasterizer, VtiImage
+from gprmaxui.snapshots import SnapshotReader, consolidate_snapshots
 from gprmaxui.utils import (
-    get_output_data,
+    _resolve_merge_executor,
+    append_merged_traces,
     rmdir,
     merge_model_files,
+    is_complete_output_file,
     is_integer_num,
     figure2image,
     round_value,
 )
+from gprmaxui.voxelizer import voxelize
 
 logger = logging.getLogger(__name__)
 
+# "vtk" renders snapshots off-screen with PyVista, "numpy" rasterizes the cells of 2D models directly
+SNAPSHOT_RENDERERS = ("vtk", "numpy")
+
+
+def _snapshot_grid(image: VtiImage) -> pv.ImageData:
+    x0, x1, y0, y1, z0, z1 = image.extent
+    grid = pv.ImageData(
+        dimensions=(x1 - x0 + 1, y1 - y0 + 1, z1 - z0 + 1),
+        origin=image.origin,
+        spacing=image.spacing,
+    )
+    for name, values in image.cell_data.items():
+        grid.cell_data[name] = values
+    for name, values in image.point_data.items():
+        grid.point_data[name] = values
+    return grid
+
+
+def _validate_renderer(renderer: str) -> str:
+    if renderer not in SNAPSHOT_RENDERERS:
+        raise ValueError(f"Unknown renderer {renderer}, use one of {', '.join(SNAPSHOT_RENDERERS)}")
+    return renderer
+
 
 @dataclass(frozen=True)
 class VideoFrameTask:
@@ -57,17 +105,58 @@ class VideoFrameTask:
     rx_component: str
     cmap: str
     figsize: Tuple[float, float]
+    save_frame: bool = True
+    frame_buffer: Optional[Tuple[str, int, int]] = None
+    renderer: str = "vtk"
 
 
-def _capture_stdout(callback) -> str:
-    original_stdout = sys.stdout
-    string_out = StringIO()
-    try:
-        sys.stdout = string_out
-        callback()
-    finally:
-        sys.stdout = original_stdout
-    return string_out.getvalue()
+@dataclass(frozen=True)
+class TraceShardTask:
+    index: int
+    input_file: str
+    geometry_name: str
+    ranges: Tuple[Tuple[int, int], ...]
+    api_args: Tuple
+    api_kwargs: Dict
+
+
+def _collect_trace_outputs(
+    folder: Path, input_stem: str, geometry_name: str, start: int, count: int
+) -> None:
+    # gprMax only appends the model number to its outputs when more than one model is run,
+    # rename them to the sim<k>.out, geometry<k>.vti and sim_snaps<k> layout of a full run
+    for trace in range(start, start + count):
+        suffix = "" if count == 1 else str(trace)
+        for name, numbered_name in (
+            (f"{input_stem}{suffix}.out", f"sim{trace}.out"),
+            (f"{geometry_name}{suffix}.vti", f"geometry{trace}.vti"),
+            (f"{input_stem}_snaps{suffix}", f"sim_snaps{trace}"),
+        ):
+            source = folder.joinpath(name)
+            target = folder.joinpath(numbered_name)
+            if name == numbered_name or not source.exists():
+                continue
+            if target.is_dir():
+                rmdir(target)
+            source.replace(target)
+
+
+def _run_trace_shard(task: TraceShardTask) -> TraceShardTask:
+    from gprMax.gprMax import api
+
+    input_file = Path(task.input_file)
+    for start, count in task.ranges:
+        api(task.input_file, *task.api_args, n=count, restart=start, **task.api_kwargs)
+        _collect_trace_outputs(
+            input_file.parent, input_file.stem, task.geometry_name, start, count
+        )
+    return task
+
+
+def _render(callback) -> str:
+    out = StringIO()
+    callback(out)
+    return out.getvalue()
 
 
 def _physical_cpu_count() -> int:
@@ -98,12 +187,84 @@ def _resolve_mpi_tasks(mpi, gpu, n_traces: int):
     return mpi
 
 
+def _contiguous_ranges(indices: List[int]) -> List[Tuple[int, int]]:
+    ranges = []
+    for index in sorted(indices):
+        if ranges and ranges[-1][0] + ranges[-1][1] == index:
+            ranges[-1] = (ranges[-1][0], ranges[-1][1] + 1)
+        else:
+            ranges.append((index, 1))
+    return ranges
+
+
+def _split_traces(traces: List[int], shards: int) -> List[List[int]]:
+    shards = min(shards, len(traces))
+    return [list(shard) for shard in divide(shards, sorted(traces)) if shard]
+
+
 def _validate_positive_int(value, name: str) -> int:
     if isinstance(value, bool) or not isinstance(value, int) or value < 1:
         raise ValueError(f"{name} must be a positive integer")
     return value
 
 
+# merge_model_files options that run() does not set itself
+MERGE_OPTIONS = tuple(
+    name
+    for name in inspect.signature(merge_model_files).parameters
+    if name not in ("output_folder", "output_file", "gprMax_version")
+)
+
+
+def _validate_merge_options(merge_options: Optional[Mapping]) -> Dict:
+    # checked before the run, so a typo does not surface after hours of simulation
+    merge_options = dict(merge_options or {})
+    unknown = sorted(set(merge_options) - set(MERGE_OPTIONS))
+    if unknown:
+        raise ValueError(
+            f"Unknown merge_options {', '.join(unknown)}, use {', '.join(MERGE_OPTIONS)}"
+        )
+    dtype = merge_options.get("dtype")
+    if dtype is not None:
+        try:
+            kind = np.dtype(dtype).kind
+        except TypeError:
+            kind = None
+        if kind != "f":
+            raise ValueError(f"Merged outputs must be stored as floating point, got {dtype}")
+    compression = merge_options.get("compression")
+    if compression is not None and compression not in ("gzip", "lzf"):
+        raise ValueError(f"Unknown compression {compression}, use gzip or lzf")
+    if merge_options.get("virtual") and any(
+        merge_options.get(name) for name in ("dtype", "compression", "shuffle")
+    ):
+        raise ValueError("Storage options do not apply to virtual merges; set them when materializing")
+    _resolve_merge_executor(merge_options.get("executor", "thread"))
+    if merge_options.get("workers") is not None:
+        _validate_positive_int(merge_options["workers"], "workers")
+    return merge_options
+
+
+def _resolve_worker_layout(
+    n_jobs: int, max_workers: Optional[int], threads_per_job: Optional[int], cores: int
+) -> Tuple[int, int]:
+    # split the cores between concurrent jobs and the OpenMP threads of each job
+    if max_workers is None and threads_per_job is None:
+        max_workers = min(n_jobs, cores)
+    elif max_workers is None:
+        max_workers = min(n_jobs, max(1, cores // threads_per_job))
+    max_workers = max(1, min(n_jobs, max_workers))
+    if threads_per_job is None:
+        threads_per_job = max(1, cores // max_workers)
+    return max_workers, threads_per_job
+
+
+def _resolve_shard_workers(shard_workers, shard_count: int) -> int:
+    if shard_workers is None:
+        return max(1, shard_count)
+    return min(shard_count, _validate_positive_int(shard_workers, "shard_workers"))
+
+
 def _resolve_frame_workers(workers, task_count: int) -> int:
     if task_count < 1:
         return 1
@@ -126,101 +287,312 @@ def _video_frame_indices(
     return frame_indices
 
 
-def _render_video_frame(task: VideoFrameTask) -> Tuple[int, str]:
-    outputdata = np.load(task.data_file, mmap_mode="r")
+class _BScanReveal:
+    """
+    RGBA image of a B-scan that is revealed trace by trace and iteration by iteration.
 
-    fig, axes = plt.subplots(2, 1, figsize=task.figsize)
-    plotter = pv.Plotter(off_screen=True)
-    try:
-        plotter.set_background("white")
-        plotter.camera_position = "xy"
-        plotter.add_axes()
+    The B-scan is normalized over its full range and turned into colormap indices once. Revealing
+    a frame only colors the samples revealed since the previous frame, so the cost of a frame does
+    not grow with the size of the B-scan. Hidden samples are drawn in the bad color of the colormap.
+    """
 
-        snapshot_grid = pv.read(task.snapshot_file)
-        plotter.add_mesh(
-            snapshot_grid,
-            cmap=task.cmap,
-            scalars="H-field",
-            show_edges=False,
-            show_scalar_bar=False,
+    def __init__(self, outputdata: np.ndarray, cmap: Colormap):
+        outputdata = np.asarray(outputdata)
+        finite = np.isfinite(outputdata)
+        if finite.any():
+            norm = Normalize(outputdata[finite].min(), outputdata[finite].max())
+        else:
+            norm = Normalize(0.0, 1.0)
+        # same binning as Colormap.__call__, with one extra entry for the bad color
+        scaled = np.nan_to_num(norm(outputdata).filled(np.nan) * cmap.N, nan=-1.0)
+        self.indices = np.clip(scaled, 0, cmap.N - 1).astype(np.uint16)
+        self.indices[~finite] = cmap.N
+        self.lut = np.vstack(
+            [cmap(np.arange(cmap.N), bytes=True), cmap(np.ma.masked_invalid([np.nan]), bytes=True)]
         )
+        self.rgba = np.empty(outputdata.shape + (4,), dtype=np.uint8)
+        self.reset()
 
-        geometry_grid = pv.read(task.geometry_file)
-        plotter.add_mesh(
-            geometry_grid, show_edges=False, show_scalar_bar=False, opacity=0.5
-        )
+    def reset(self) -> None:
+        self.rgba[:] = self.lut[-1]
+        self.trace_idx = 0
+        self.iteration_idx = 0
 
-        plotter.add_mesh(
-            pv.Cube(
-                center=(
-                    task.tx_x + (task.trace_idx * task.dx),
-                    task.tx_y,
-                    task.tx_z,
-                ),
-                x_length=task.dx * 2,
-                y_length=task.dx * 2,
-                z_length=task.dx * 2,
-            ),
-            color="red",
-        )
+    def _show(self, rows: slice, columns: Union[slice, int]) -> None:
+        self.rgba[rows, columns] = self.lut[self.indices[rows, columns]]
 
-        plotter.add_mesh(
-            pv.Cube(
-                center=(
-                    task.rx_x + (task.trace_idx * task.dx),
-                    task.tx_y,
-                    task.tx_z,
-                ),
-                x_length=task.dx * 2,
-                y_length=task.dx * 2,
-                z_length=task.dx * 2,
-            ),
-            color="blue",
+    def reveal(self, trace_idx: int, iteration_idx: int) -> np.ndarray:
+        """
+        Reveal the traces before trace_idx and the first iteration_idx samples of trace trace_idx.
+
+        Args:
+            trace_idx (int): Index of the trace being recorded.
+            iteration_idx (int): Number of samples recorded of that trace.
+
+        Returns:
+            np.ndarray: The (iterations, traces, 4) RGBA image, updated in place.
+        """
+        if (trace_idx, iteration_idx) < (self.trace_idx, self.iteration_idx):
+            self.reset()
+        if trace_idx > self.trace_idx:
+            # complete the trace revealed so far, then the whole traces up to trace_idx
+            self._show(slice(self.iteration_idx, None), self.trace_idx)
+            self._show(slice(None), slice(self.trace_idx + 1, trace_idx))
+            self.trace_idx = trace_idx
+            self.iteration_idx = 0
+        if trace_idx < self.rgba.shape[1]:
+            self._show(slice(self.iteration_idx, iteration_idx), trace_idx)
+        self.iteration_idx = max(self.iteration_idx, iteration_idx)
+        return self.rgba
+
+
+class _VideoRenderContext:
+    """
+    Plotter, figure and inputs reused by every frame a worker renders.
+
+    Building a plotter and a figure and re-reading the inputs dominates the cost of a frame, so they
+    are created once per worker and each frame only swaps the snapshot scalars, the tx/rx positions
+    and the image data. With the "numpy" renderer the snapshot is rasterized instead, and no plotter
+    is created.
+    """
+
+    def __init__(self, figsize: Tuple[float, float], cmap: str, renderer: str = "vtk"):
+        self.figsize = tuple(figsize)
+        self.cmap = cmap
+        self.renderer = _validate_renderer(renderer)
+        self.frame_cmap = plt.get_cmap(cmap).copy()
+        self.frame_cmap.set_bad(color="white")
+
+        self.plotter = None
+        self.rasterizer = None
+        if renderer == "vtk":
+            self.plotter = pv.Plotter(off_screen=True)
+            self.plotter.set_background("white")
+            self.plotter.camera_position = "xy"
+            self.plotter.add_axes()
+        else:
+            self.rasterizer = SnapshotRasterizer(cmap)
+        self.snapshot_mesh = None
+        self.snapshot_actor = None
+        self.geometry_file = None
+        self.geometry_actor = None
+        self.tx_actor = None
+        self.rx_actor = None
+
+        self.fig, self.axes = plt.subplots(2, 1, figsize=figsize)
+        self.canvas = FigureCanvas(self.fig)
+        self.snapshot_image = None
+        self.bscan_image = None
+
+        self.snapshots = SnapshotReader()
+        self.data_file = None
+        self.bscan = None
+        self.frame_buffers: Dict[str, shared_memory.SharedMemory] = {}
+
+    def close(self) -> None:
+        plt.close(self.fig)
+        if self.plotter is not None:
+            self.plotter.close()
+        self.snapshots.close()
+        for frame_buffer in self.frame_buffers.values():
+            frame_buffer.close()
+        self.frame_buffers = {}
+
+    def set_bscan(self, data_file: str, outputdata: np.ndarray) -> None:
+        self.data_file = data_file
+        self.bscan = _BScanReveal(outputdata, self.frame_cmap)
+
+    def _load_bscan(self, data_file: str) -> _BScanReveal:
+        if data_file != self.data_file:
+            self.set_bscan(data_file, np.load(data_file, mmap_mode="r"))
+        return self.bscan
+
+    def _update_snapshot(self, snapshot_file: str) -> None:
+        snapshot_grid = _snapshot_grid(self.snapshots.read(snapshot_file))
+        values = snapshot_grid["H-field"]
+        if values.ndim > 1:
+            # the plotter shows the magnitude of vector fields
+            values = np.linalg.norm(values, axis=1)
+        association = "cell" if "H-field" in snapshot_grid.cell_data else "point"
+        same_grid = self.snapshot_mesh is not None and (
+            self.snapshot_mesh.dimensions == snapshot_grid.dimensions
+            and self.snapshot_mesh.origin == snapshot_grid.origin
+            and self.snapshot_mesh.spacing == snapshot_grid.spacing
         )
-        plotter.camera.tight()
-        snapshot_capture = Image.fromarray(plotter.screenshot(return_img=True))
+        if not same_grid:
+            if self.snapshot_actor is not None:
+                self.plotter.remove_actor(self.snapshot_actor)
+            self.snapshot_mesh = pv.ImageData(
+                dimensions=snapshot_grid.dimensions,
+                origin=snapshot_grid.origin,
+                spacing=snapshot_grid.spacing,
+            )
+            getattr(self.snapshot_mesh, f"{association}_data")["H-field"] = values
+            self.snapshot_actor = self.plotter.add_mesh(
+                self.snapshot_mesh,
+                cmap=self.cmap,
+                scalars="H-field",
+                show_edges=False,
+                show_scalar_bar=False,
+            )
+        else:
+            # writing into the array marks it modified, so the mapper picks up the new scalars
+            getattr(self.snapshot_mesh, f"{association}_data")["H-field"][:] = values
+        self.snapshot_actor.mapper.scalar_range = (float(values.min()), float(values.max()))
 
-        ax = axes[0]
-        ax.imshow(snapshot_capture, aspect="auto")
-        ax.set_xlabel("Trace")
-        ax.set_ylabel("Time")
-        ax.set_title(
+    def _update_geometry(self, geometry_file: str) -> None:
+        if geometry_file == self.geometry_file:
+            return
+        if self.geometry_actor is not None:
+            self.plotter.remove_actor(self.geometry_actor)
+        self.geometry_actor = self.plotter.add_mesh(
+            pv.read(geometry_file), show_edges=False, show_scalar_bar=False, opacity=0.5
+        )
+        self.geometry_file = geometry_file
+
+    def _update_antennas(self, task: VideoFrameTask) -> None:
+        if self.tx_actor is None:
+            size = task.dx * 2
+            self.tx_actor = self.plotter.add_mesh(
+                pv.Cube(center=(task.tx_x, task.tx_y, task.tx_z), x_length=size, y_length=size, z_length=size),
+                color="red",
+            )
+            self.rx_actor = self.plotter.add_mesh(
+                pv.Cube(center=(task.rx_x, task.tx_y, task.tx_z), x_length=size, y_length=size, z_length=size),
+                color="blue",
+            )
+        # the antennas move by one cell per trace
+        offset = (task.trace_idx * task.dx, 0.0, 0.0)
+        self.tx_actor.position = offset
+        self.rx_actor.position = offset
+
+    def _capture_snapshot(self, task: VideoFrameTask) -> np.ndarray:
+        if self.rasterizer is not None:
+            offset = task.trace_idx * task.dx
+            return self.rasterizer.render(
+                self.snapshots.read(task.snapshot_file),
+                task.geometry_file,
+                tx=(task.tx_x + offset, task.tx_y),
+                rx=(task.rx_x + offset, task.tx_y),
+                size=task.dx * 2,
+            )
+        self._update_snapshot(task.snapshot_file)
+        self._update_geometry(task.geometry_file)
+        self._update_antennas(task)
+        self.plotter.camera.tight()
+        # screenshot reuses the last rendered image, so render the updated scene first
+        self.plotter.render()
+        return self.plotter.screenshot(return_img=True)
+
+    def render(self, task: VideoFrameTask) -> np.ndarray:
+        bscan = self._load_bscan(task.data_file)
+        snapshot_capture = self._capture_snapshot(task)
+
+        bscan_rgba = bscan.reveal(task.trace_idx, task.iteration_idx)
+
+        snapshot_ax, bscan_ax = self.axes
+        snapshot_ax.set_title(
             f"{task.rx_component} Snapshot at trace {task.trace_idx + 1} "
             f"and iteration {task.iteration_idx + 1}"
         )
+        if self.snapshot_image is None:
+            self.snapshot_image = snapshot_ax.imshow(snapshot_capture, aspect="auto")
+            snapshot_ax.set_xlabel("Trace")
+            snapshot_ax.set_ylabel("Time")
+            self.bscan_image = bscan_ax.imshow(
+                bscan_rgba,
+                extent=[0, bscan_rgba.shape[1], bscan_rgba.shape[0] * task.dt, 0],
+                interpolation="nearest",
+                aspect="auto",
+            )
+            bscan_ax.set_xlabel("Trace")
+            bscan_ax.set_ylabel("Time")
+            bscan_ax.set_title(f"{task.rx_component} B-scan")
+            self.fig.tight_layout()
+        else:
+            self.snapshot_image.set_data(snapshot_capture)
+            self.bscan_image.set_data(bscan_rgba)
 
-        new_arr = np.full_like(outputdata, fill_value=np.nan)
-        new_arr[:, : task.trace_idx] = outputdata[:, : task.trace_idx]
-        new_arr[: task.iteration_idx, task.trace_idx] = outputdata[
-            : task.iteration_idx, task.trace_idx
-        ]
-        new_arr_shape = new_arr.shape
+        self.canvas.draw()
+        return np.asarray(self.canvas.buffer_rgba())[..., :3]
 
-        masked_array = np.ma.array(new_arr, mask=np.isnan(new_arr))
-        frame_cmap = plt.cm.get_cmap(task.cmap).copy()
-        frame_cmap.set_bad(color="white")
+    def write_frame_buffer(self, frame_buffer: Tuple[str, int, int], image: np.ndarray) -> None:
+        name, offset, size = frame_buffer
+        if image.nbytes != size:
+            raise ValueError(f"Rendered frame of {image.nbytes} bytes does not fit a {size} bytes frame slot")
+        if name not in self.frame_buffers:
+            self.frame_buffers[name] = shared_memory.SharedMemory(name=name)
+        np.ndarray(image.shape, dtype=np.uint8, buffer=self.frame_buffers[name].buf, offset=offset)[:] = image
 
-        ax = axes[1]
-        ax.imshow(
-            masked_array,
-            extent=[0, new_arr_shape[1], new_arr_shape[0] * task.dt, 0],
-            interpolation="nearest",
-            aspect="auto",
-            cmap=frame_cmap,
-        )
-        ax.set_xlabel("Trace")
-        ax.set_ylabel("Time")
-        ax.set_title(f"{task.rx_component} B-scan")
-        plt.tight_layout()
-        canvas = FigureCanvas(fig)
-        canvas.draw()
-        image_array = np.asarray(canvas.buffer_rgba())[..., :3]
-        Image.fromarray(image_array).save(task.frame_path)
-    finally:
-        plt.close(fig)
-        plotter.close()
 
-    return task.frame_index, task.frame_path
+# render context of the current process, built by _init_video_worker or on the first serial frame
+_VIDEO_CONTEXT: Optional[_VideoRenderContext] = None
+
+
+def _init_video_worker(figsize: Tuple[float, float], cmap: str, renderer: str = "vtk") -> None:
+    global _VIDEO_CONTEXT
+    _VIDEO_CONTEXT = _VideoRenderContext(figsize, cmap, renderer)
+
+
+def _close_video_context() -> None:
+    global _VIDEO_CONTEXT
+    if _VIDEO_CONTEXT is not None:
+        _VIDEO_CONTEXT.close()
+        _VIDEO_CONTEXT = None
+
+
+def _render_video_frame(task: VideoFrameTask) -> Tuple[int, str]:
+    if _VIDEO_CONTEXT is None or (
+        _VIDEO_CONTEXT.figsize,
+        _VIDEO_CONTEXT.cmap,
+        _VIDEO_CONTEXT.renderer,
+    ) != (tuple(task.figsize), task.cmap, task.renderer):
+        _close_video_context()
+        _init_video_worker(task.figsize, task.cmap, task.renderer)
+    image = _VIDEO_CONTEXT.render(task)
+    if task.frame_buffer is not None:
+        # the parent reads the frame from its slot of the shared ring
+        _VIDEO_CONTEXT.write_frame_buffer(task.frame_buffer, image)
+        return task.frame_index, image.shape
+    if task.save_frame:
+        Image.fromarray(image).save(task.frame_path)
+        return task.frame_index, task.frame_path
+    return task.frame_index, image.copy()
+
+
+class _FrameRing:
+    """
+    Shared memory slots the render workers write frames into, reused in frame order.
+    """
+
+    def __init__(self, n_slots: int, frame_shape: Tuple[int, int, int]):
+        self.n_slots = n_slots
+        self.frame_size = int(np.prod(frame_shape))
+        self.memory = shared_memory.SharedMemory(create=True, size=n_slots * self.frame_size)
+
+    def slot(self, frame_index: int) -> Tuple[str, int, int]:
+        return self.memory.name, (frame_index % self.n_slots) * self.frame_size, self.frame_size
+
+    def frame(self, frame_index: int, shape: Tuple[int, ...]) -> np.ndarray:
+        _, offset, _ = self.slot(frame_index)
+        return np.ndarray(shape, dtype=np.uint8, buffer=self.memory.buf, offset=offset)
+
+    def close(self) -> None:
+        self.memory.close()
+        self.memory.unlink()
+
+
+def _submit_in_order(executor, function, tasks: List, window: int, prepare=None):
+    # at most `window` tasks are in flight, and task k + window is submitted only once the
+    # result of task k was consumed, so a ring of `window` slots is never overwritten early
+    futures = deque()
+    pending = iter(tasks)
+    for task in islice(pending, window):
+        futures.append(executor.submit(function, prepare(task) if prepare else task))
+    while futures:
+        yield futures.popleft().result()
+        for task in islice(pending, 1):
+            futures.append(executor.submit(function, prepare(task) if prepare else task))
 
 
 def in_notebook() -> bool:
@@ -244,7 +616,11 @@ class GprMaxModelSchema(BaseModel):
     time_window: TimeWindow
     source: Optional[TxRxPair]
     materials: List[Material]
-    geometry: List[Union[DomainBox, DomainCylinder, DomainSphere]]
+    geometry: List[
+        Union[
+            DomainBox, DomainCylinder, DomainSphere, GeometryObjectsRead, SphereArray, BoxArray
+        ]
+    ]
 
     class Config:
         arbitrary_types_allowed = True
@@ -288,33 +664,89 @@ class GprMaxModel:
 
         self.source = None
         self.materials: List[Material] = []
-        self.geometry: List[Union[DomainSphere, DomainCylinder, DomainBox]] = []
+        self.geometry: List[
+            Union[DomainSphere, DomainCylinder, DomainBox, GeometryObjectsRead, GeometryArray]
+        ] = []
         self.output_views = []
 
-    def data(self, rx: int = 1) -> Dict[str, Tuple[np.ndarray, float]]:
+    def result(self) -> ModelResult:
+        """
+        Open the merged output of the simulation for lazy reading.
+
+        Components are only read when accessed, and slicing reads only the requested part, e.g.
+        model.result().rx(1)["Ez"][t0:t1, trace0:trace1].
+
+        Returns:
+            ModelResult: Lazy accessor holding a single handle to output_merged.out.
+        """
+        return ModelResult(self.output_folder / "output_merged.out")
+
+    def monitor(
+        self, n: Union[int, str], rx: int = 1, component: str = "Ez"
+    ) -> RunMonitor:
+        """
+        Watch the output folder of a running simulation, e.g. from a notebook while run executes in a thread.
+
+        Args:
+            n (int | str): Number of traces of the run, or "auto".
+            rx (int): Receiver number.
+            component (str): Receiver component.
+
+        Returns:
+            RunMonitor: Growing B-scan, updated by RunMonitor.poll.
+        """
+        n_traces = self._compute_n_traces() if n == "auto" else n
+        return RunMonitor(
+            self.output_folder, n_traces, rx, component, self._compute_n_iterations()
+        )
+
+    def data_array(
+        self, components: Optional[List[str]] = None, dtype: Optional[str] = None
+    ) -> ReceiverArray:
+        """
+        Read the outputs of all the receivers at once.
+
+        Args:
+            components (Optional[List[str]]): Components to read. Defaults to all the outputs.
+            dtype (Optional[str]): Type of the array. Defaults to the type stored in the output file.
+
+        Returns:
+            ReceiverArray: Array of shape (nrx, ncomponents, iterations, traces), with dt and the file attributes.
+        """
+        return read_receivers(self.output_folder / "output_merged.out", components, dtype)
+
+    def data(
+        self, rx: int = 1, sidecar: bool = False
+    ) -> Dict[str, Tuple[np.ndarray, float]]:
         """
         Get the data from the simulation.
 
+        With sidecar=True, each component is also saved once as an uncompressed .npy file next to the
+        merged file and later reads memory-map it; the copies are refreshed when the merged file changes.
+        The merged output file is closed when this returns.
+
         Args:
             rx (int): Receiver number.
+            sidecar (bool): Whether to serve the components from memory-mapped .npy sidecar copies.
 
         Returns:
             Dict[str, Tuple[np.ndarray, float]]: A dictionary with the data for each component (Ex, Ey, Ez, Hx, Hy, Hz).
         """
-        output_file = self.output_folder / "output_merged.out"
-        f = h5py.File(output_file, "r")
-        nrx = f.attrs["nrx"]
-        f.close()
-        # Check there are any receivers
-        if nrx == 0:
-            raise Exception(f"No receivers found in {output_file}")
-        assert rx <= nrx, f"Receiver {rx} does not exist in {output_file}"
-
-        rx_components = ["Ex", "Ey", "Ez", "Hx", "Hy", "Hz"]
-        data = {}
-        for i, rx_component in enumerate(rx_components):
-            outputdata, dt = get_output_data(str(output_file), rx, rx_component)
-            data[rx_component] = outputdata, dt
+        with self.result() as result:
+            # Check there are any receivers
+            if result.nrx == 0:
+                raise Exception(f"No receivers found in {result.output_file}")
+            assert rx <= result.nrx, f"Receiver {rx} does not exist in {result.output_file}"
+            receiver = result.rx(rx)
+            cache = SidecarCache(result.output_file) if sidecar else None
+            data = {}
+            for rx_component in [c for c in RX_COMPONENTS if c in receiver]:
+                view = receiver[rx_component]
+                if cache is not None:
+                    outputdata = cache.get(rx, rx_component, lambda: np.asarray(view))
+                else:
+                    outputdata = np.asarray(view)
+                data[rx_component] = outputdata, receiver.dt
         return data
 
     def _compute_n_traces(self) -> int:
@@ -406,10 +838,60 @@ class GprMaxModel:
         nz = round_value(self.domain_size.z / dz)
         return nx, ny, nz
 
+    def estimate(
+        self,
+        n: Union[int, str],
+        geometry: bool = False,
+        snapshots: bool = False,
+        snapshot_stride: int = 1,
+        concurrency: int = 1,
+    ) -> RunEstimate:
+        """
+        Estimate the memory, disk usage and runtime of a simulation before running it.
+
+        The runtime is calibrated from the benchmark recorded with gprmaxui.estimate.calibrate.
+
+        Args:
+            n (int | str): Number of traces, or "auto".
+            geometry (bool): Whether geometry views are written.
+            snapshots (bool): Whether snapshots are written.
+            snapshot_stride (int): Iteration interval between snapshots.
+            concurrency (int): Number of models held in memory at the same time, e.g. MPI workers.
+
+        Returns:
+            RunEstimate: The estimated resources of the simulation.
+        """
+        if isinstance(n, str) and n == "auto":
+            n = self._compute_n_traces()
+        return estimate_run(
+            self,
+            n=_validate_positive_int(n, "n"),
+            geometry=geometry,
+            snapshots=snapshots,
+            snapshot_stride=_validate_positive_int(snapshot_stride, "snapshot_stride"),
+            concurrency=_validate_positive_int(concurrency, "concurrency"),
+        )
+
     def run(self, *args, **kwargs) -> "GprMaxModel":
         """
         Run the simulation.
 
+        Pass cache=True, a cache folder or a ResultCache instance to restore the outputs of an
+        identical previous simulation instead of running gprMax again; files read by the model, such as
+        those of geometry_objects_read, are identified by their contents. Pass resume=True to keep
+        the output folder and only simulate the traces without a complete output file. Pass shards=k
+        to split the traces into k concurrently simulated shards (shard_workers limits how many run
+        at once); each finished shard is written into output_merged.out as soon as it completes. Like
+        run_many, sharded runs split the physical cores between the concurrent shards and the threads
+        of each shard, unless shard_workers and num_threads are both given.
+        Pass max_memory and/or max_disk (bytes, or "auto" for the available RAM and free disk space)
+        to refuse simulations whose estimate exceeds the budget. Pass merge_options, e.g.
+        {"compression": "gzip", "shuffle": True, "dtype": "float16"}, to set the storage of
+        output_merged.out, or {"virtual": True} to map the trace files instead of copying them
+        (see merge_model_files). Pass consolidate_snapshots=True, or a dict of options such as
+        {"delete": True}, to stack the snapshots of each trace into one HDF5 store once the run is done
+        (see consolidate_snapshots).
+
         Returns:
             GprMaxModel: The current instance of the GprMaxModel.
         """
@@ -420,6 +902,7 @@ class GprMaxModel:
                 "gprMax installation not found. Please install gprMax following the instructions at https://docs.gprmax.com/en/latest/include_readme.html"
             )
 
+        started = time.time()
         nx, ny, nz = self._compute_num_cells()
         if nx == 0 or ny == 0 or nz == 0:
             raise Exception(" requires at least one cell in every dimension")
@@ -444,14 +927,59 @@ class GprMaxModel:
         num_threads = kwargs.pop("num_threads", None)
         if num_threads is not None:
             num_threads = _validate_positive_int(num_threads, "num_threads")
-        mpi = _resolve_mpi_tasks(kwargs.pop("mpi", False), kwargs.get("gpu"), n_traces)
+        mpi_option = kwargs.pop("mpi", False)
+        mpi = _resolve_mpi_tasks(mpi_option, kwargs.get("gpu"), n_traces)
         mpi_no_spawn = kwargs.pop("mpi_no_spawn", False)
         gpu = kwargs.pop("gpu", None)
         geometry_fixed = kwargs.pop("geometry_fixed", False)
         geometry_only = kwargs.get("geometry_only", False)
+        cache = resolve_result_cache(kwargs.pop("cache", None))
+        resume = kwargs.pop("resume", False)
+        shards = kwargs.pop("shards", None)
+        if shards is not None:
+            shards = _validate_positive_int(shards, "shards")
+        shard_workers = kwargs.pop("shard_workers", None)
+        if shards and not geometry_only:
+            # every shard is a gprMax process, share the cores between them as run_many does
+            if shard_workers is not None:
+                shard_workers = _validate_positive_int(shard_workers, "shard_workers")
+            cores = _physical_cpu_count()
+            shard_workers, shard_threads = _resolve_worker_layout(
+                min(shards, n_traces), shard_workers, num_threads, cores
+            )
+            if num_threads is None:
+                num_threads = shard_threads
+            elif shard_workers * num_threads > cores:
+                logger.warning(
+                    f"{shard_workers} concurrent shards with {num_threads} threads each "
+                    f"oversubscribe the {cores} physical cores of this machine"
+                )
+        merge_options = _validate_merge_options(kwargs.pop("merge_options", None))
+        snapshot_options = kwargs.pop("consolidate_snapshots", False)
+        if snapshot_options is True:
+            snapshot_options = {}
+        elif not snapshot_options:
+            snapshot_options = None
+
+        # refuse jobs over the memory or disk budget before touching the output folder
+        max_memory = kwargs.pop("max_memory", None)
+        max_disk = kwargs.pop("max_disk", None)
+        if max_memory is not None or max_disk is not None:
+            concurrency = max(1, mpi - 1) if mpi else 1
+            if shards and not geometry_only:
+                concurrency *= _resolve_shard_workers(
+                    shard_workers, min(shards, n_traces)
+                )
+            self.estimate(
+                n=1 if geometry_only else n_traces,
+                geometry=out_geometry or geometry_only,
+                snapshots=out_snapshots,
+                snapshot_stride=snapshot_stride,
+                concurrency=concurrency,
+            ).check_budget(max_memory, max_disk, self.output_folder)
 
         # create output folder
-        clear_output_folder = kwargs.pop("clear_output_folder", True)
+        clear_output_folder = kwargs.pop("clear_output_folder", True) and not resume
         self._mkdir_output_folder(clear_output_folder)
 
         input_prefix = ""
@@ -461,18 +989,40 @@ class GprMaxModel:
         out_geometry = out_geometry or geometry_only
         output_commands = ""
         if any([out_geometry, out_snapshots]):
-            output_commands = _capture_stdout(
-                lambda: self._print_outputs(
+            output_commands = _render(
+                lambda out: self._print_outputs(
                     geometry=out_geometry,
                     snapshots=out_snapshots,
                     snapshot_stride=snapshot_stride,
+                    out=out,
                 )
             )
 
-        # Write the input file
+        # Write the input file, and the model description used to consolidate runs
+        input_text = str(self) + output_commands
         model_file = self.output_folder / "sim.in"
         with open(model_file, "w") as f:
-            f.write(input_prefix + str(self) + output_commands)
+            f.write(input_prefix + input_text)
+        self.to_json(self.output_folder / "model.json")
+
+        # Restore the outputs of an identical simulation if it was cached
+        cache_key = None
+        if cache is not None:
+            cache_options = {"geometry_fixed": geometry_fixed, **kwargs}
+            if merge_options:
+                cache_options["merge_options"] = merge_options
+            # the input only names the files it reads, so their contents are part of the key
+            external_inputs = self._external_input_digests()
+            if external_inputs:
+                cache_options["external_inputs"] = external_inputs
+            cache_key = cache.key(
+                self._canonical_input_text(input_text), n_traces, cache_options
+            )
+            if cache.restore(cache_key, self.output_folder):
+                if snapshot_options is not None:
+                    self.consolidate_snapshots(**snapshot_options)
+                self._write_run_record(started, n_traces, cached=True)
+                return self
 
         # Run the simulation
         api_kwargs = {
@@ -482,20 +1032,256 @@ class GprMaxModel:
             "geometry_fixed": geometry_fixed,
             **kwargs,
         }
-        api(str(model_file), *args, n=n_traces, **api_kwargs)
+        output_file = self.output_folder / "output_merged.out"
+        if (resume or shards) and not geometry_only:
+            stale = False
+            if resume:
+                stale = self._remove_stale_traces(n_traces)
+                traces = self._missing_traces(n_traces)
+            else:
+                traces = list(range(1, n_traces + 1))
+            if traces or stale or not output_file.exists():
+                output_file.unlink(missing_ok=True)
+
+            if shards:
+                self._run_sharded(
+                    args,
+                    n_traces,
+                    traces,
+                    shards,
+                    shard_workers,
+                    api_kwargs,
+                    mpi_option,
+                    input_prefix,
+                    {
+                        "geometry": out_geometry,
+                        "snapshots": out_snapshots,
+                        "snapshot_stride": snapshot_stride,
+                    },
+                    merge_options,
+                )
+            else:
+                for start, count in _contiguous_ranges(traces):
+                    api_kwargs["mpi"] = _resolve_mpi_tasks(mpi_option, gpu, count)
+                    api(str(model_file), *args, n=count, restart=start, **api_kwargs)
+                    _collect_trace_outputs(
+                        self.output_folder, "sim", "geometry", start, count
+                    )
+        else:
+            api(str(model_file), *args, n=n_traces, **api_kwargs)
 
         # generated output file
-        output_file = self.output_folder / "output_merged.out"
         if not output_file.exists() and not geometry_only:
-            merge_model_files(output_file.parent, output_file)
+            merge_model_files(output_file.parent, output_file, **merge_options)
+
+        if snapshot_options is not None:
+            self.consolidate_snapshots(**snapshot_options)
 
+        if cache is not None:
+            cache.store(cache_key, self.output_folder)
+
+        self._write_run_record(started, n_traces, cached=False)
         return self
 
+    def consolidate_snapshots(self, **options) -> List[Path]:
+        """
+        Stack the snapshots of each trace into one HDF5 store, which plot_snapshot and save_video
+        read from instead of the snapshot files.
+
+        Args:
+            **options: Options of consolidate_snapshots, e.g. delete=True to remove the snapshot files.
+
+        Returns:
+            List[Path]: The store files, in trace order.
+        """
+        return consolidate_snapshots(self.output_folder, **options)
+
+    def _write_run_record(self, started: float, n_traces: int, cached: bool) -> None:
+        """
+        Write the timings of a finished run to run.json, next to model.json.
+
+        Args:
+            started (float): Start time of the run, in seconds since the epoch.
+            n_traces (int): Number of traces of the run.
+            cached (bool): Whether the outputs were restored from the result cache.
+        """
+        record = {
+            "started": started,
+            "elapsed": time.time() - started,
+            "n_traces": n_traces,
+            "cached": cached,
+        }
+        self.output_folder.joinpath("run.json").write_text(json.dumps(record, indent=2))
+
+    def _remove_stale_traces(self, n_traces: int) -> bool:
+        """
+        Remove the outputs of traces beyond n_traces, left in the output folder by an earlier, larger run.
+
+        Args:
+            n_traces (int): Number of traces of the B-scan.
+
+        Returns:
+            bool: True if trace outputs were removed, so the merged output must be rebuilt.
+        """
+        removed = False
+        for path in self.output_folder.iterdir():
+            match = re.fullmatch(r"(?:sim(\d+)\.out|geometry(\d+)\.vti|sim_snaps(\d+)(?:\.h5)?)", path.name)
+            if match is None or int(next(filter(None, match.groups()))) <= n_traces:
+                continue
+            logger.info(f"Removing {path.name}, the B-scan only has {n_traces} traces")
+            if path.is_dir():
+                rmdir(path)
+            else:
+                path.unlink()
+            removed = True
+        return removed
+
+    def _missing_traces(self, n_traces: int) -> List[int]:
+        """
+        Find the traces without a complete output file in the output folder.
+
+        Args:
+            n_traces (int): Number of traces of the B-scan.
+
+        Returns:
+            List[int]: One-based indices of the traces that still have to be simulated.
+        """
+        iterations = self._compute_n_iterations()
+        missing = []
+        for trace in range(1, n_traces + 1):
+            trace_file = self.output_folder.joinpath(f"sim{trace}.out")
+            if not is_complete_output_file(trace_file, iterations):
+                missing.append(trace)
+        if len(missing) < n_traces:
+            logger.info(
+                f"Resuming simulation: {n_traces - len(missing)} of {n_traces} traces already completed"
+            )
+        return missing
+
+    def _run_sharded(
+        self,
+        api_args: Tuple,
+        n_traces: int,
+        traces: List[int],
+        shards: int,
+        shard_workers: Union[int, None],
+        api_kwargs: Dict,
+        mpi_option,
+        input_prefix: str,
+        output_options: Dict,
+        merge_options: Optional[Dict] = None,
+    ) -> None:
+        """
+        Simulate traces in concurrent shards and stream each finished shard into the merged output.
+
+        Every shard runs from its own copy of the input file in the output folder, so relative paths
+        in the input keep working and the outputs of concurrent shards do not collide.
+
+        Args:
+            api_args (Tuple): Positional arguments forwarded to the gprMax api.
+            n_traces (int): Number of traces of the B-scan.
+            traces (List[int]): One-based indices of the traces to simulate.
+            shards (int): Number of shards to split the traces into.
+            shard_workers (int | None): Number of shards simulated at the same time. Defaults to one worker per shard.
+                run() resolves it from the physical cores before calling.
+            api_kwargs (Dict): Keyword arguments forwarded to the gprMax api.
+            mpi_option: The mpi option of run, resolved for the traces of each shard.
+            input_prefix (str): Commands written before the model in every shard input file.
+            output_options (Dict): Geometry and snapshot options of the run.
+            merge_options (Dict, optional): Storage options of the merged output file, see merge_model_files.
+        """
+        merge_options = dict(merge_options or {})
+        # a virtual merge maps the trace files once they all exist, so nothing is streamed
+        stream_merge = not merge_options.pop("virtual", False)
+        output_file = self.output_folder / "output_merged.out"
+        pending = set(traces)
+        if stream_merge:
+            append_merged_traces(
+                output_file,
+                {
+                    trace - 1: self.output_folder.joinpath(f"sim{trace}.out")
+                    for trace in range(1, n_traces + 1)
+                    if trace not in pending
+                },
+                n_traces,
+                **merge_options,
+            )
+
+        model_text = str(self)
+        tasks = []
+        for index, shard_traces in enumerate(_split_traces(traces, shards), start=1):
+            geometry_name = f"shard{index}_geometry"
+            output_commands = ""
+            if any(output_options.values()):
+                output_commands = _render(
+                    lambda out: self._print_outputs(
+                        **output_options, geometry_filename=geometry_name, out=out
+                    )
+                )
+            input_file = self.output_folder.joinpath(f"shard{index}.in")
+            input_file.write_text(input_prefix + model_text + output_commands)
+            tasks.append(
+                TraceShardTask(
+                    index=index,
+                    input_file=str(input_file),
+                    geometry_name=geometry_name,
+                    ranges=tuple(_contiguous_ranges(shard_traces)),
+                    api_args=tuple(api_args),
+                    api_kwargs={
+                        **api_kwargs,
+                        "mpi": _resolve_mpi_tasks(
+                            mpi_option, api_kwargs.get("gpu"), len(shard_traces)
+                        ),
+                    },
+                )
+            )
+
+        worker_count = _resolve_shard_workers(shard_workers, len(tasks))
+        if worker_count == 1:
+            finished_shards = map(_run_trace_shard, tasks)
+        else:
+            executor = ProcessPoolExecutor(max_workers=worker_count)
+            futures = [executor.submit(_run_trace_shard, task) for task in tasks]
+            finished_shards = (future.result() for future in as_completed(futures))
+
+        try:
+            for task in tqdm(finished_shards, total=len(tasks)):
+                if stream_merge:
+                    shard_files = {
+                        trace - 1: self.output_folder.joinpath(f"sim{trace}.out")
+                        for start, count in task.ranges
+                        for trace in range(start, start + count)
+                    }
+                    append_merged_traces(
+                        output_file, shard_files, n_traces, **merge_options
+                    )
+                Path(task.input_file).unlink(missing_ok=True)
+        finally:
+            if worker_count != 1:
+                executor.shutdown(wait=True, cancel_futures=True)
+
+    def _canonical_input_text(self, input_text: str) -> str:
+        """
+        Normalize the parts of the rendered input that differ between identical models.
+
+        Args:
+            input_text (str): Rendered input file.
+
+        Returns:
+            str: Input text with the generated waveform id replaced by a stable name.
+        """
+        if isinstance(self.source, TxRxPair):
+            waveform = self.source.tx.waveform
+            input_text = input_text.replace(waveform.id, waveform.wave_family)
+        return input_text
+
     def _print_outputs(
         self,
         geometry: bool = True,
         snapshots: bool = True,
         snapshot_stride: int = 1,
+        geometry_filename: str = "geometry",
+        out: Optional[TextIO] = None,
     ) -> None:
         """
         Print the outputs.
@@ -504,6 +1290,8 @@ class GprMaxModel:
             geometry (bool): Whether to print geometry outputs.
             snapshots (bool): Whether to print snapshot outputs.
             snapshot_stride (int): Iteration interval between snapshot outputs.
+            geometry_filename (str): Base name of the geometry view files.
+            out (TextIO, optional): Stream the commands are written to. Printed to stdout if None.
         """
         snapshot_stride = _validate_positive_int(snapshot_stride, "snapshot_stride")
         if geometry:
@@ -517,9 +1305,9 @@ class GprMaxModel:
                 dx=self.domain_resolution.dx,
                 dy=self.domain_resolution.dy,
                 dz=self.domain_resolution.dz,
-                filename="geometry",
+                filename=geometry_filename,
                 resolution="n",
-            )()
+            )(out)
 
             if snapshots:
                 iterations = self._compute_n_iterations()
@@ -536,59 +1324,70 @@ class GprMaxModel:
                         dz=self.domain_resolution.dz,
                         filename="snapshot" + str(i),
                         t=i,
-                    )()
+                    )(out)
 
-    def _print_model_header(self) -> None:
+    def _print_model_header(self, out: Optional[TextIO] = None) -> None:
         """
         Print the model header.
+
+        Args:
+            out (TextIO, optional): Stream the commands are written to. Printed to stdout if None.
         """
-        self.title()
-        self.domain_size()
-        self.domain_resolution()
-        self.time_window()
+        self.title(out)
+        self.domain_size(out)
+        self.domain_resolution(out)
+        self.time_window(out)
 
-    def _print_model_materials(self) -> None:
+    def _print_model_materials(self, out: Optional[TextIO] = None) -> None:
         """
         Print the model materials.
+
+        Args:
+            out (TextIO, optional): Stream the commands are written to. Printed to stdout if None.
         """
         # we need to set the id of the material to the key of the dictionary
         for material in self.materials:
-            material()
+            material(out)
 
-    def _print_geometry(self) -> None:
+    def _print_geometry(self, out: Optional[TextIO] = None) -> None:
         """
         Print the geometries.
+
+        Args:
+            out (TextIO, optional): Stream the commands are written to. Printed to stdout if None.
         """
         for geometry in self.geometry:
-            geometry()
+            geometry(out)
 
-    def _print_source(self) -> None:
+    def _print_source(self, out: Optional[TextIO] = None) -> None:
         """
         Print the model sources.
+
+        Args:
+            out (TextIO, optional): Stream the commands are written to. Printed to stdout if None.
         """
-        self.source()
+        self.source(out)
 
     def __str__(self) -> str:
         """
         Return the string representation of the GprMax model.
 
+        The commands are written to a private buffer, so models can be rendered concurrently.
+
         Returns:
             str: String representation of the model.
         """
-        string_out = StringIO()
-        sys.stdout = string_out
+        out = StringIO()
 
-        self._print_model_header()
+        self._print_model_header(out)
 
-        self._print_model_materials()
+        self._print_model_materials(out)
 
-        self._print_source()
+        self._print_source(out)
 
-        self._print_geometry()
+        self._print_geometry(out)
 
-        # Restore the standard output
-        sys.stdout = sys.__stdout__
-        return string_out.getvalue()
+        return out.getvalue()
 
     def register_materials(self, *args: Material) -> None:
         """
@@ -604,17 +1403,23 @@ class GprMaxModel:
             self.materials.append(material)
 
     def add_geometry(
-        self, *args: Union[DomainSphere, DomainCylinder, DomainBox, GeometryObjectsRead]
+        self,
+        *args: Union[
+            DomainSphere, DomainCylinder, DomainBox, GeometryObjectsRead, GeometryArray
+        ],
     ) -> None:
         """
         Register geometries to the GprMax model.
 
+        Large collections of spheres or boxes are best added as a single SphereArray or BoxArray.
+
         Args:
-            *args (Union[DomainSphere, DomainCylinder, DomainBox]): Geometries to register.
+            *args (Union[DomainSphere, DomainCylinder, DomainBox, GeometryObjectsRead, GeometryArray]): Geometries to register.
         """
         assert all(
             isinstance(
-                geometry, (DomainSphere, DomainCylinder, DomainBox, GeometryObjectsRead)
+                geometry,
+                (DomainSphere, DomainCylinder, DomainBox, GeometryObjectsRead, GeometryArray),
             )
             for geometry in args
         ), "All geometries must be instances of the Geometry class."
@@ -651,11 +1456,12 @@ class GprMaxModel:
 
         Args:
             rx (int): Receiver number.
+            sidecar (bool, optional): Whether to read the data through the .npy sidecar cache, see data.
 
         Returns:
             Union[None, Image.Image]: Image of the plot if return_image is True, otherwise None.
         """
-        data = self.data(rx=rx)
+        data = self.data(rx=rx, sidecar=kwargs.pop("sidecar", False))
         rx_components = data.keys()
         n_cols = kwargs.pop("n_cols", 2)
         n_rows = math.ceil(len(rx_components) / n_cols)
@@ -680,22 +1486,113 @@ class GprMaxModel:
             return figure2image(fig)
         plt.show()
 
-    def plot_geometry(self, **kwargs) -> Union[None, Image.Image]:
+    def _geometry_preview_key(self) -> str:
         """
-        Plot the model geometry using PyVista.
+        Hash the commands that define the model geometry.
 
-        Args:
-            return_image (bool, optional): If True, returns a PIL image instead of showing an interactive window.
+        Returns:
+            str: Hex digest of the header, materials and geometry commands, including the
+                modification time of the files read by geometry_objects_read commands.
+        """
+        geometry_text = _render(
+            lambda out: (
+                self._print_model_header(out),
+                self._print_model_materials(out),
+                self._print_geometry(out),
+            )
+        )
+        digest = hashlib.sha256(geometry_text.encode("utf-8"))
+        for path in self._external_input_files().values():
+            if path.exists():
+                stat = path.stat()
+                digest.update(f"{stat.st_mtime_ns}:{stat.st_size}".encode())
+        return digest.hexdigest()
+
+    def _external_input_files(self) -> Dict[str, Path]:
+        """
+        Find the files read by the commands of the model, e.g. by geometry_objects_read.
 
         Returns:
-            Union[None, Image.Image]: PIL Image if return_image is True, otherwise None.
+            Dict[str, Path]: The files as named in the input, resolved against the output folder like gprMax does.
+        """
+        files = {}
+        for geometry in self.geometry:
+            if isinstance(geometry, GeometryObjectsRead):
+                for filename in (geometry.filename, geometry.materials_filename):
+                    path = Path(filename)
+                    if not path.is_absolute():
+                        path = self.output_folder.joinpath(path)
+                    files[filename] = path
+        return files
+
+    def _external_input_digests(self) -> Dict[str, Optional[str]]:
+        """
+        Hash the contents of the files read by the commands of the model.
+
+        Returns:
+            Dict[str, Optional[str]]: SHA-256 of each file as named in the input, None if it does not exist.
+        """
+        digests = {}
+        for filename, path in self._external_input_files().items():
+            if not path.exists():
+                digests[filename] = None
+                continue
+            digest = hashlib.sha256()
+            with open(path, "rb") as f:
+                for block in iter(lambda: f.read(1 << 20), b""):
+                    digest.update(block)
+            digests[filename] = digest.hexdigest()
+        return digests
+
+    def _geometry_preview_file(self) -> Path:
         """
+        Get the geometry view of the model, running gprMax only when the geometry changed.
+
+        Returns:
+            Path: The cached geometry VTI file of the current geometry.
+        """
+        preview_folder = self.output_folder.joinpath(".geometry_preview")
+        preview_file = preview_folder.joinpath(
+            f"geometry_{self._geometry_preview_key()[:16]}.vti"
+        )
+        if preview_file.exists():
+            return preview_file
+
         self.run(clear_output_folder=False, geometry_only=True, n=1)
         geometry_file = self.output_folder / "geometry.vti"
 
         if not geometry_file.exists():
             raise FileNotFoundError(f"Geometry file not found: {geometry_file}")
 
+        # keep only the preview of the current geometry
+        preview_folder.mkdir(parents=True, exist_ok=True)
+        for stale_file in preview_folder.glob("geometry_*.vti"):
+            stale_file.unlink()
+        shutil.copy2(geometry_file, preview_file)
+        return preview_file
+
+    def plot_geometry(self, **kwargs) -> Union[None, Image.Image]:
+        """
+        Plot the model geometry using PyVista.
+
+        The geometry view is cached in the output folder and gprMax only runs again when the
+        header, materials or geometry commands of the model change. The numpy backend rasterizes
+        the geometry directly and does not need gprMax at all.
+
+        Args:
+            return_image (bool, optional): If True, returns a PIL image instead of showing an interactive window.
+            backend (str, optional): "gprmax" to build the geometry view with gprMax, or "numpy" to use the voxelizer.
+
+        Returns:
+            Union[None, Image.Image]: PIL Image if return_image is True, otherwise None.
+        """
+        backend = kwargs.pop("backend", "gprmax")
+        assert backend in ("gprmax", "numpy"), f"Unknown geometry backend {backend}"
+        if backend == "numpy":
+            geometry_grid = voxelize(self).to_image_data()
+        else:
+            geometry_grid = pv.read(self._geometry_preview_file())
+
         return_image = kwargs.pop("return_image", False)
         notebook_mode = in_notebook()
 
@@ -712,8 +1609,7 @@ class GprMaxModel:
             plotter_dialog = PlotterDialog()
             plotter = plotter_dialog.plotter
 
-        # Load and add geometry
-        geometry_grid = pv.read(geometry_file)
+        # Add geometry
         plotter.set_background("white")
         plotter.add_mesh(
             geometry_grid, show_edges=False, opacity=0.3, show_scalar_bar=False
@@ -756,14 +1652,17 @@ class GprMaxModel:
         rx_component: str = "Ez",
         cmap="jet",
         return_image=False,
+        renderer: str = "vtk",
     ):
         """
         Plot a snapshot of the model.
         :param trace_idx:
         :param iteration_idx:
         :param rx_component:
+        :param renderer: "vtk" to render the snapshot with PyVista, or "numpy" to rasterize it without VTK (2D models only)
         :return:
         """
+        _validate_renderer(renderer)
         data = self.data(rx=rx)
         assert rx_component in data.keys(), f"Invalid rx component {rx_component}"
 
@@ -776,42 +1675,82 @@ class GprMaxModel:
         if trace_idx is None:
             trace_idx = n_traces - 1
 
-        trace_idx -= 1
-        iteration_idx -= 1
+        # negative indices count from the end, as when slicing
+        trace_idx = (trace_idx - 1) % n_traces
+        iteration_idx = (iteration_idx - 1) % n_iterations
 
-        new_arr = np.full_like(outputdata, fill_value=np.nan)
-        new_arr[:, :trace_idx] = outputdata[:, :trace_idx]
-        new_arr[:iteration_idx, trace_idx] = outputdata[:iteration_idx, trace_idx]
-        new_arr_shape = new_arr.shape
-
-        # Creat a mask
-        masked_array = np.ma.array(new_arr, mask=np.isnan(new_arr))
-        cmap = plt.cm.get_cmap(cmap).copy()
+        cmap = plt.get_cmap(cmap).copy()
         cmap.set_bad(color="white")
+        bscan_rgba = _BScanReveal(outputdata, cmap).reveal(trace_idx, iteration_idx)
 
         fig, axes = plt.subplots(2, 1, figsize=(5, 10))
 
         # make B-scan plot
         ax = axes[1]
         ax.imshow(
-            masked_array,
-            extent=[0, new_arr_shape[1], new_arr_shape[0] * dt, 0],
+            bscan_rgba,
+            extent=[0, n_traces, n_iterations * dt, 0],
             interpolation="nearest",
             aspect="auto",
-            cmap=cmap,
         )
         ax.set_xlabel("Trace")
         ax.set_ylabel("Time")
         ax.set_title(f"{rx_component} B-scan")
 
         # make H-FIELD plot
+        snapshot_folder = self.output_folder.joinpath(f"sim_snaps{trace_idx + 1}")
+        snapshot_file = snapshot_folder.joinpath(f"snapshot{iteration_idx + 1}.vti")
+        geometry_file = self.output_folder.joinpath(f"geometry{trace_idx + 1}.vti")
+
+        source = self.source
+        tx = source.tx.source
+        rx = source.rx
+
+        tx_x, tx_y, tx_z = tx.x, tx.y, tx.z
+        rx_x, rx_y, rx_z = rx.x, rx.y, rx.z
+
+        # read from the consolidated snapshot store of the trace when there is one
+        snapshots = SnapshotReader()
+        try:
+            snapshot = snapshots.read(snapshot_file)
+        finally:
+            snapshots.close()
+        if renderer == "numpy":
+            offset = trace_idx * self.domain_resolution.dx
+            snapshot_capture = SnapshotRasterizer(cmap).render(
+                snapshot,
+                geometry_file,
+                tx=(tx_x + offset, tx_y),
+                rx=(rx_x + offset, tx_y),
+                size=self.domain_resolution.dx * 2,
+            )
+        else:
+            snapshot_capture = self._render_snapshot_vtk(
+                snapshot, geometry_file, cmap, trace_idx
+            )
+        snapshot_capture = Image.fromarray(snapshot_capture)
+        ax = axes[0]
+        ax.imshow(snapshot_capture, aspect="auto")
+        ax.set_xlabel("Trace")
+        ax.set_ylabel("Time")
+        ax.set_title(
+            f"{rx_component} Snapshot at trace {trace_idx + 1} and iteration {iteration_idx + 1}"
+        )
+
+        if return_image:
+            return figure2image(fig)
+
+        plt.tight_layout()
+        plt.show()
+
+    def _render_snapshot_vtk(
+        self, snapshot: VtiImage, geometry_file: Path, cmap: Colormap, trace_idx: int
+    ) -> np.ndarray:
         plotter = pv.Plotter(off_screen=True)
         plotter.set_background("white")
         plotter.camera_position = "xy"
         plotter.add_axes()
-        snapshot_folder = self.output_folder.joinpath(f"sim_snaps{trace_idx + 1}")
-        snapshot_file = snapshot_folder.joinpath(f"snapshot{iteration_idx + 1}.vti")
-        snapshot_grid = pv.read(snapshot_file)
+        snapshot_grid = _snapshot_grid(snapshot)
         plotter.add_mesh(
             snapshot_grid,
             cmap=cmap,
@@ -820,18 +1759,15 @@ class GprMaxModel:
             show_scalar_bar=False,
         )
 
-        geometry_file = self.output_folder.joinpath(f"geometry{trace_idx + 1}.vti")
         geometry_grid = pv.read(geometry_file)
         plotter.add_mesh(
             geometry_grid, show_edges=False, show_scalar_bar=False, opacity=0.5
         )
 
-        source = self.source
-        tx = source.tx.source
-        rx = source.rx
-
+        tx = self.source.tx.source
+        rx = self.source.rx
         tx_x, tx_y, tx_z = tx.x, tx.y, tx.z
-        rx_x, rx_y, rx_z = rx.x, rx.y, rx.z
+        rx_x = rx.x
 
         plotter.add_mesh(
             pv.Cube(
@@ -854,20 +1790,8 @@ class GprMaxModel:
         )
         plotter.camera.tight()
         snapshot_capture = plotter.screenshot(return_img=True)
-        snapshot_capture = Image.fromarray(snapshot_capture)
-        ax = axes[0]
-        ax.imshow(snapshot_capture, aspect="auto")
-        ax.set_xlabel("Trace")
-        ax.set_ylabel("Time")
-        ax.set_title(
-            f"{rx_component} Snapshot at trace {trace_idx + 1} and iteration {iteration_idx + 1}"
-        )
-
-        if return_image:
-            return figure2image(fig)
-
-        plt.tight_layout()
-        plt.show()
+        plotter.close()
+        return snapshot_capture
 
     def _resolve_geometry_file_for_trace(self, trace_idx: int) -> Path:
         geometry_file = self.output_folder.joinpath(f"geometry{trace_idx + 1}.vti")
@@ -894,6 +1818,8 @@ class GprMaxModel:
         frame_step: int,
         temp_path: Path,
         data_file: Path,
+        save_frame: bool = True,
+        renderer: str = "vtk",
     ) -> List[VideoFrameTask]:
         n_iterations, n_traces = outputdata.shape
         source = self.source
@@ -930,6 +1856,8 @@ class GprMaxModel:
                     rx_component=rx_component,
                     cmap=cmap,
                     figsize=figsize,
+                    save_frame=save_frame,
+                    renderer=renderer,
                 )
             )
 
@@ -938,13 +1866,12 @@ class GprMaxModel:
     def _validate_video_frame_inputs(
         self, tasks: List[VideoFrameTask], frame_step: int
     ) -> None:
-        missing = []
-        required_files = {
-            path for task in tasks for path in (task.snapshot_file, task.geometry_file)
-        }
-        for filename in sorted(required_files):
-            if not Path(filename).exists():
-                missing.append(filename)
+        # snapshots may also be read from the consolidated store of their trace
+        snapshots = SnapshotReader()
+        missing = sorted(
+            {task.snapshot_file for task in tasks if not snapshots.exists(task.snapshot_file)}
+            | {task.geometry_file for task in tasks if not Path(task.geometry_file).exists()}
+        )
 
         if not missing:
             return
@@ -979,125 +1906,26 @@ class GprMaxModel:
         assert rx_component in data.keys(), f"Invalid rx component {rx_component}"
         outputdata, dt = data[rx_component]
 
-        plotter = pv.Plotter(off_screen=True)
-        plotter.set_background("white")
-        plotter.camera_position = "xy"
-        plotter.add_axes()
-
-        n_traces = self._compute_n_traces()
-        n_iterations = self._compute_n_iterations()
-        for trace_idx in tqdm(range(n_traces)):
-            for iteration_idx in range(0, n_iterations, 10):
-                fig, axes = plt.subplots(2, 1, figsize=figsize)
-
-                snapshot_folder = self.output_folder.joinpath(
-                    f"sim_snaps{trace_idx + 1}"
-                )
-                snapshot_file = snapshot_folder.joinpath(
-                    f"snapshot{iteration_idx + 1}.vti"
-                )
-                snapshot_grid = pv.read(snapshot_file)
-                plotter.add_mesh(
-                    snapshot_grid,
-                    cmap=cmap,
-                    scalars="H-field",
-                    show_edges=False,
-                    show_scalar_bar=False,
-                )
-
-                geometry_file = self.output_folder.joinpath(
-                    f"geometry{trace_idx + 1}.vti"
-                )
-                geometry_grid = pv.read(geometry_file)
-                plotter.add_mesh(
-                    geometry_grid, show_edges=False, show_scalar_bar=False, opacity=0.5
-                )
-                source = self.source
-                tx = source.tx.source
-                rx = source.rx
-
-                tx_x, tx_y, tx_z = tx.x, tx.y, tx.z
-                rx_x, rx_y, rx_z = rx.x, rx.y, rx.z
-
-                plotter.add_mesh(
-                    pv.Cube(
-                        center=(
-                            tx_x + (trace_idx * self.domain_resolution.dx),
-                            tx_y,
-                            tx_z,
-                        ),
-                        x_length=self.domain_resolution.dx * 2,
-                        y_length=self.domain_resolution.dx * 2,
-                        z_length=self.domain_resolution.dx * 2,
-                    ),
-                    color="red",
-                )
-
-                plotter.add_mesh(
-                    pv.Cube(
-                        center=(
-                            rx_x + (trace_idx * self.domain_resolution.dx),
-                            tx_y,
-                            tx_z,
-                        ),
-                        x_length=self.domain_resolution.dx * 2,
-                        y_length=self.domain_resolution.dx * 2,
-                        z_length=self.domain_resolution.dx * 2,
-                    ),
-                    color="blue",
-                )
-                plotter.camera.tight()
-                snapshot_capture = plotter.screenshot(return_img=True)
-                snapshot_capture = Image.fromarray(snapshot_capture)
-                ax = axes[0]
-                ax.imshow(snapshot_capture, aspect="auto")
-                ax.set_xlabel("Trace")
-                ax.set_ylabel("Time")
-                ax.set_title(
-                    f"{rx_component} Snapshot at trace {trace_idx + 1} and iteration {iteration_idx + 1}"
-                )
-
-                # make B-scan plot
-                new_arr = np.full_like(outputdata, fill_value=np.nan)
-                new_arr[:, :trace_idx] = outputdata[:, :trace_idx]
-                new_arr[:iteration_idx, trace_idx] = outputdata[
-                    :iteration_idx, trace_idx
-                ]
-                new_arr_shape = new_arr.shape
-
-                # Create a mask
-                masked_array = np.ma.array(new_arr, mask=np.isnan(new_arr))
-                cmap = plt.cm.get_cmap(cmap).copy()
-                cmap.set_bad(color="white")
-
-                ax = axes[1]
-                ax.imshow(
-                    masked_array,
-                    extent=[0, new_arr_shape[1], new_arr_shape[0] * dt, 0],
-                    interpolation="nearest",
-                    aspect="auto",
-                    cmap=cmap,
-                )
-                ax.set_xlabel("Trace")
-                ax.set_ylabel("Time")
-                ax.set_title(f"{rx_component} B-scan")
-                plt.tight_layout()
-                canvas = FigureCanvas(fig)
-                canvas.draw()
-                # Get the image data as a string buffer and save it to a file
-                image_array = np.asarray(canvas.buffer_rgba())[..., :3]
-
-                data_capture = Image.fromarray(image_array)
-                yield data_capture
-
-                # in each iteration, clear the plotters
-                plt.close(fig)
-                plotter.clear()
-
-                del snapshot_capture
-                del data_capture
-
-        plotter.close()
+        data_file = self.output_folder / "output_merged.out"
+        tasks = self._build_video_frame_tasks(
+            outputdata=outputdata,
+            dt=dt,
+            rx_component=rx_component,
+            cmap=cmap,
+            figsize=figsize,
+            frame_step=10,
+            temp_path=self.output_folder,
+            data_file=data_file,
+            save_frame=False,
+        )
+        # one plotter and figure for all the frames, with the B-scan revealed incrementally
+        context = _VideoRenderContext(figsize, cmap)
+        context.set_bscan(str(data_file), outputdata)
+        try:
+            for task in tqdm(tasks):
+                yield Image.fromarray(context.render(task))
+        finally:
+            context.close()
 
     def save_video(
         self,
@@ -1110,6 +1938,8 @@ class GprMaxModel:
         frame_step: int = 10,
         workers: typing.Union[int, str, None] = "auto",
         temp_dir: typing.Union[str, Path, None] = None,
+        frame_transport: str = "memory",
+        renderer: str = "vtk",
     ):
         """
         Save the model simulation as a video.
@@ -1124,8 +1954,16 @@ class GprMaxModel:
             frame_step (int): Iteration interval between rendered frames.
             workers (int | str | None): Number of parallel render workers. Use "auto" to choose a conservative default.
             temp_dir (str | Path | None): Parent directory for temporary rendered frame files.
+            frame_transport (str): How rendered frames reach the encoder. "memory" passes raw RGB frames, through a
+                ring of shared memory slots when rendering in parallel. "files" writes every frame as a PNG in
+                temp_dir, for when memory is tight.
+            renderer (str): How snapshots are drawn. "vtk" renders them off-screen with PyVista, "numpy" rasterizes
+                the cells of 2D models without VTK, which is much cheaper per frame on headless nodes.
         """
         frame_step = _validate_positive_int(frame_step, "frame_step")
+        _validate_renderer(renderer)
+        if frame_transport not in ("memory", "files"):
+            raise ValueError(f"Unknown frame_transport {frame_transport}, use 'memory' or 'files'")
         data = self.data(rx=rx)
         assert rx_component in data.keys(), f"Invalid rx component {rx_component}"
         outputdata, dt = data[rx_component]
@@ -1147,6 +1985,8 @@ class GprMaxModel:
                 frame_step=frame_step,
                 temp_path=working_path,
                 data_file=data_file,
+                save_frame=frame_transport == "files",
+                renderer=renderer,
             )
             if not tasks:
                 raise ValueError("No frames were generated for the requested video")
@@ -1155,45 +1995,97 @@ class GprMaxModel:
             worker_count = _resolve_frame_workers(workers, len(tasks))
             output_file = str(output_file)
             vout = None
+            ring = None
 
             try:
                 if worker_count == 1:
                     rendered_frames = map(_render_video_frame, tasks)
                     iterator = tqdm(rendered_frames, total=len(tasks))
                 else:
-                    executor = ProcessPoolExecutor(max_workers=worker_count)
-                    rendered_frames = executor.map(_render_video_frame, tasks)
+                    window = worker_count * 2
+                    prepare = None
+                    if frame_transport == "memory":
+                        canvas_width, canvas_height = FigureCanvas(
+                            plt.Figure(figsize=figsize)
+                        ).get_width_height(physical=True)
+                        try:
+                            ring = _FrameRing(window, (canvas_height, canvas_width, 3))
+                            prepare = lambda task: replace(
+                                task, frame_buffer=ring.slot(task.frame_index)
+                            )
+                        except OSError as e:
+                            logger.warning(
+                                f"Could not allocate shared memory for the frames ({e}), writing them to files instead"
+                            )
+                            tasks = [replace(task, save_frame=True) for task in tasks]
+                    # every worker builds its plotter and figure once, then reuses them for all its frames
+                    executor = ProcessPoolExecutor(
+                        max_workers=worker_count,
+                        initializer=_init_video_worker,
+                        initargs=(tuple(figsize), cmap, renderer),
+                    )
+                    rendered_frames = _submit_in_order(
+                        executor, _render_video_frame, tasks, window, prepare
+                    )
                     iterator = tqdm(rendered_frames, total=len(tasks))
 
                 try:
-                    for expected_index, (frame_index, frame_path) in enumerate(
-                        iterator
-                    ):
+                    for expected_index, (frame_index, frame) in enumerate(iterator):
                         if frame_index != expected_index:
                             raise RuntimeError(
                                 f"Rendered frame order mismatch: expected {expected_index}, got {frame_index}"
                             )
-                        with Image.open(frame_path) as curr_frame:
-                            curr_frame = curr_frame.convert("RGB")
-                            if vout is None:
-                                cap_size = curr_frame.size
-                                fourcc = cv2.VideoWriter_fourcc("m", "p", "4", "v")
-                                vout = cv2.VideoWriter()
-                                success = vout.open(
-                                    output_file, fourcc, fps, cap_size, True
-                                )
-                                if not success:
-                                    raise Exception(
-                                        "Could not open video file for writing"
-                                    )
-                            vout.write(np.asarray(curr_frame))
+                        vout = self._write_video_frame(
+                            vout, output_file, fps, frame_index, frame, ring
+                        )
                 finally:
                     if worker_count != 1:
                         executor.shutdown(wait=True, cancel_futures=True)
             finally:
+                if worker_count == 1:
+                    _close_video_context()
+                if ring is not None:
+                    ring.close()
                 if vout is not None:
                     vout.release()
 
+    @staticmethod
+    def _write_video_frame(
+        vout, output_file: str, fps: int, frame_index: int, frame, ring: Optional[_FrameRing]
+    ):
+        """
+        Write a rendered frame to the video, opening the video writer on the first frame.
+
+        Args:
+            vout (cv2.VideoWriter | None): The video writer, None before the first frame.
+            output_file (str): Path to the output video file.
+            fps (int): Frames per second for the video.
+            frame_index (int): Index of the frame.
+            frame: The frame returned by the renderer: a PNG path, an RGB array, or the shape of the
+                RGB frame written to its slot of the shared ring.
+            ring (_FrameRing | None): The shared ring of the parallel memory transport.
+
+        Returns:
+            cv2.VideoWriter: The video writer.
+        """
+        if isinstance(frame, str):
+            with Image.open(frame) as curr_frame:
+                image = np.asarray(curr_frame.convert("RGB"))
+        elif isinstance(frame, np.ndarray):
+            image = frame
+        else:
+            image = ring.frame(frame_index, frame)
+
+        if vout is None:
+            cap_size = (image.shape[1], image.shape[0])
+            fourcc = cv2.VideoWriter_fourcc("m", "p", "4", "v")
+            vout = cv2.VideoWriter()
+            success = vout.open(output_file, fourcc, fps, cap_size, True)
+            if not success:
+                raise Exception("Could not open video file for writing")
+        vout.write(image)
+        return vout
+
     def to_json(
         self, path: Union[str, Path] = None, indent: int = 2
     ) -> Union[str, None]:
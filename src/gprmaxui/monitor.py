@@ -0,0 +1,133 @@
+from __future__ import annotations
+
+import logging
+import os
+import time
+from pathlib import Path
+from typing import Iterator, List, Optional, Union
+
+import h5py
+import numpy as np
+
+from gprmaxui.utils import is_complete_output_file
+
+logger = logging.getLogger(__name__)
+
+
+class RunMonitor:
+    """
+    Growing B-scan of a running simulation, filled from the per-trace output files as they complete.
+
+    Traces that are not done yet are NaN. Each poll only lists the output folder once and reads the
+    files that completed since the previous poll, so it is cheap enough to call from a notebook loop
+    or a Qt timer. Sharded runs expose a shard's traces once the shard has finished.
+    """
+
+    def __init__(
+        self,
+        output_folder: Union[str, Path],
+        n_traces: int,
+        rx: int = 1,
+        component: str = "Ez",
+        iterations: Optional[int] = None,
+    ):
+        """
+        Initialize the monitor.
+
+        Args:
+            output_folder (str | Path): Output folder of the run.
+            n_traces (int): Number of traces of the B-scan.
+            rx (int): Receiver number.
+            component (str): Receiver component.
+            iterations (Optional[int]): Number of iterations of the model. Read from the first completed
+                trace if None.
+        """
+        assert n_traces > 0, "n_traces must be positive"
+        self.output_folder = Path(output_folder)
+        self.n_traces = n_traces
+        self.rx = rx
+        self.component = component
+        self.iterations = iterations
+        self.dt: Optional[float] = None
+        self._bscan: Optional[np.ndarray] = None
+        self._pending = set(range(1, n_traces + 1))
+
+    @property
+    def bscan(self) -> np.ndarray:
+        """
+        The B-scan read so far, of shape (iterations, n_traces), with NaN for the missing traces.
+        """
+        if self._bscan is None:
+            return np.full((self.iterations or 0, self.n_traces), np.nan, dtype=np.float32)
+        return self._bscan
+
+    @property
+    def completed(self) -> List[int]:
+        return sorted(set(range(1, self.n_traces + 1)) - self._pending)
+
+    @property
+    def progress(self) -> float:
+        return 1 - len(self._pending) / self.n_traces
+
+    @property
+    def done(self) -> bool:
+        return not self._pending
+
+    def _read_trace(self, trace_file: Path, trace: int) -> None:
+        with h5py.File(trace_file, "r") as f:
+            if self._bscan is None:
+                self.iterations = int(f.attrs["Iterations"])
+                self.dt = float(f.attrs["dt"])
+                self._bscan = np.full((self.iterations, self.n_traces), np.nan, dtype=np.float32)
+            self._bscan[:, trace - 1] = f[f"/rxs/rx{self.rx}/{self.component}"][()]
+
+    def poll(self) -> List[int]:
+        """
+        Read the traces that completed since the last poll.
+
+        Returns:
+            List[int]: One-based indices of the traces read.
+        """
+        if self.done or not self.output_folder.exists():
+            return []
+        with os.scandir(self.output_folder) as entries:
+            names = {entry.name for entry in entries}
+
+        new_traces = []
+        for trace in sorted(self._pending):
+            name = f"sim{trace}.out"
+            if name not in names:
+                continue
+            trace_file = self.output_folder.joinpath(name)
+            # gprMax writes the file at the end of the trace, skip it until it is complete
+            if not is_complete_output_file(trace_file, self.iterations):
+                continue
+            try:
+                self._read_trace(trace_file, trace)
+            except (OSError, KeyError):
+                logger.debug(f"Could not read {trace_file} yet")
+                continue
+            self._pending.discard(trace)
+            new_traces.append(trace)
+        return new_traces
+
+    def follow(self, interval: float = 1.0, timeout: Optional[float] = None) -> Iterator[List[int]]:
+        """
+        Poll until every trace is read, yielding the traces read by each poll that found new ones.
+
+        Args:
+            interval (float): Seconds between polls.
+            timeout (Optional[float]): Seconds after which to stop. Waits until the run is done if None.
+
+        Yields:
+            List[int]: One-based indices of the newly read traces.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not self.done:
+            new_traces = self.poll()
+            if new_traces:
+                yield new_traces
+                continue
+            if deadline is not None and time.monotonic() >= deadline:
+                return
+            time.sleep(interval)
@@ -0,0 +1,328 @@
+from __future__ import annotations
+
+import json
+import logging
+import os
+import tempfile
+from collections.abc import Mapping
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, BinaryIO, Callable, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+import h5py
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+RX_COMPONENTS = ["Ex", "Ey", "Ez", "Hx", "Hy", "Hz", "Ix", "Iy", "Iz"]
+
+
+@dataclass
+class ReceiverArray:
+    """
+    The outputs of all the receivers of a model, stacked in one array.
+
+    Attributes:
+        data (np.ndarray): Array of shape (nrx, ncomponents, iterations, traces).
+        components (List[str]): The components along the second axis.
+        dt (float): Temporal resolution of the model.
+        attrs (Dict[str, Any]): Attributes of the merged output file.
+    """
+
+    data: np.ndarray
+    components: List[str]
+    dt: float
+    attrs: Dict[str, Any]
+
+    def __getitem__(self, key: Tuple[int, str]) -> np.ndarray:
+        rxnumber, component = key
+        return self.data[rxnumber - 1, self.components.index(component)]
+
+
+class ComponentView:
+    """
+    Lazy view of one receiver component of a merged output file.
+
+    Indexing reads only the requested hyperslab, e.g. view[t0:t1, trace0:trace1].
+    """
+
+    def __init__(self, dataset: h5py.Dataset, dt: float):
+        """
+        Initialize the component view.
+
+        Args:
+            dataset (h5py.Dataset): The (iterations, traces) dataset of the component.
+            dt (float): Temporal resolution of the model.
+        """
+        self._dataset = dataset
+        self.dt = dt
+
+    @property
+    def name(self) -> str:
+        return self._dataset.name.rsplit("/", 1)[-1]
+
+    @property
+    def shape(self) -> Tuple[int, ...]:
+        return self._dataset.shape
+
+    @property
+    def dtype(self) -> np.dtype:
+        return self._dataset.dtype
+
+    @property
+    def ndim(self) -> int:
+        return self._dataset.ndim
+
+    def __len__(self) -> int:
+        return self.shape[0]
+
+    def __getitem__(self, key) -> np.ndarray:
+        return self._dataset[key]
+
+    def __array__(self, dtype=None, copy=None) -> np.ndarray:
+        data = self._dataset[()]
+        return data if dtype is None else data.astype(dtype, copy=False)
+
+    def __repr__(self) -> str:
+        return f"ComponentView({self.name}, shape={self.shape}, dtype={self.dtype})"
+
+
+class SidecarCache:
+    """
+    Uncompressed .npy copies of the components of a merged output file, read back memory-mapped.
+
+    The copies are stored in a folder next to the merged file and are refreshed as soon as the
+    modification time or the size of the merged file changes. Copies are never deleted or written in
+    place: a refreshed copy replaces the old one atomically, so readers that already mapped it keep
+    the old data, and source.json records the signature of each copy once the copy is in place.
+    """
+
+    def __init__(self, output_file: Union[str, Path]):
+        """
+        Initialize the sidecar cache of a merged output file.
+
+        Args:
+            output_file (str | Path): The merged output file.
+        """
+        self.output_file = Path(output_file)
+        self.folder = self.output_file.with_name(f"{self.output_file.stem}_npy")
+
+    def _signature(self) -> Dict[str, int]:
+        stat = self.output_file.stat()
+        return {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size}
+
+    def _copy_signatures(self) -> Dict[str, Dict[str, int]]:
+        try:
+            record = json.loads(self.folder.joinpath("source.json").read_text())
+        except (OSError, ValueError):
+            return {}
+        files = record.get("files") if isinstance(record, dict) else None
+        return files if isinstance(files, dict) else {}
+
+    def _replace(self, target: Path, write: Callable[[BinaryIO], None]) -> None:
+        # write next to the final name and rename, so concurrent readers never see partial files
+        fd, staging = tempfile.mkstemp(suffix=target.suffix, dir=self.folder)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                write(f)
+            os.replace(staging, target)
+        except BaseException:
+            Path(staging).unlink(missing_ok=True)
+            raise
+
+    def get(self, rxnumber: int, component: str, read: Callable[[], np.ndarray]) -> np.ndarray:
+        """
+        Get a component, writing its sidecar copy first if it is missing or stale.
+
+        Args:
+            rxnumber (int): Receiver number.
+            component (str): Receiver component.
+            read (Callable[[], np.ndarray]): Reads the component from the merged output file.
+
+        Returns:
+            np.ndarray: Read-only memory map of the component.
+        """
+        name = f"rx{rxnumber}_{component}.npy"
+        cached = self.folder.joinpath(name)
+        signature = self._signature()
+        if self._copy_signatures().get(name) != signature or not cached.exists():
+            logger.debug(f"Refreshing sidecar copy {cached}")
+            self.folder.mkdir(parents=True, exist_ok=True)
+            self._replace(cached, lambda f: np.save(f, read()))
+            # record the copy last, so a listed signature always describes the file in place
+            signatures = self._copy_signatures()
+            signatures[name] = signature
+            self._replace(
+                self.folder.joinpath("source.json"),
+                lambda f: f.write(json.dumps({"files": signatures}).encode()),
+            )
+        return np.load(cached, mmap_mode="r")
+
+    def clear(self) -> None:
+        """
+        Remove the sidecar copies.
+        """
+        if self.folder.exists():
+            for cached in self.folder.iterdir():
+                cached.unlink()
+            self.folder.rmdir()
+
+
+class ReceiverView(Mapping):
+    """
+    Lazy mapping from component names (Ex, Ey, Ez, Hx, Hy, Hz) to ComponentView.
+    """
+
+    def __init__(self, group: h5py.Group, dt: float):
+        """
+        Initialize the receiver view.
+
+        Args:
+            group (h5py.Group): The /rxs/rxN group of the receiver.
+            dt (float): Temporal resolution of the model.
+        """
+        self._group = group
+        self.dt = dt
+
+    @property
+    def number(self) -> int:
+        return int(self._group.name.rsplit("rx", 1)[-1])
+
+    def __getitem__(self, component: str) -> ComponentView:
+        if component not in self._group:
+            raise KeyError(
+                f"{component} is not available for this receiver, the available outputs are {', '.join(self)}"
+            )
+        return ComponentView(self._group[component], self.dt)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._group.keys())
+
+    def __len__(self) -> int:
+        return len(self._group)
+
+
+class ModelResult:
+    """
+    Lazy accessor of a merged output file that keeps a single HDF5 handle open.
+    """
+
+    def __init__(self, output_file: Union[str, Path]):
+        """
+        Open a merged output file.
+
+        Args:
+            output_file (str | Path): The merged output file.
+        """
+        self.output_file = Path(output_file)
+        self._file = h5py.File(self.output_file, "r")
+        self.nrx = int(self._file.attrs["nrx"])
+        self.dt = float(self._file.attrs["dt"])
+        self.iterations = int(self._file.attrs["Iterations"])
+        self.title = self._file.attrs.get("Title")
+
+    @property
+    def n_traces(self) -> int:
+        if self.nrx == 0:
+            return 0
+        return next(iter(self.rx(1).values())).shape[1]
+
+    def rx(self, rxnumber: int = 1) -> ReceiverView:
+        """
+        Get a receiver of the model.
+
+        Args:
+            rxnumber (int): Receiver number, starting at 1.
+
+        Returns:
+            ReceiverView: Lazy view of the components of the receiver.
+        """
+        if self.nrx == 0:
+            raise Exception(f"No receivers found in {self.output_file}")
+        if not 1 <= rxnumber <= self.nrx:
+            raise KeyError(f"Receiver {rxnumber} does not exist in {self.output_file}")
+        return ReceiverView(self._file[f"/rxs/rx{rxnumber}"], self.dt)
+
+    @property
+    def receivers(self) -> List[ReceiverView]:
+        return [self.rx(rxnumber) for rxnumber in range(1, self.nrx + 1)]
+
+    def read_all(
+        self,
+        components: Optional[Sequence[str]] = None,
+        dtype: Optional[Union[str, np.dtype]] = None,
+        out: Optional[np.ndarray] = None,
+    ) -> ReceiverArray:
+        """
+        Read the outputs of all the receivers into one preallocated array.
+
+        Args:
+            components (Optional[Sequence[str]]): Components to read. Defaults to the outputs of the first receiver.
+            dtype (Optional[str | np.dtype]): Type of the array. Defaults to the type stored in the file.
+            out (Optional[np.ndarray]): C-contiguous array of shape (nrx, ncomponents, iterations, traces) to read into.
+
+        Returns:
+            ReceiverArray: The stacked outputs, dt and the attributes of the file.
+        """
+        if self.nrx == 0:
+            raise Exception(f"No receivers found in {self.output_file}")
+        receivers = self.receivers
+        if components is None:
+            available = list(receivers[0])
+            components = [c for c in RX_COMPONENTS if c in available] + [
+                c for c in available if c not in RX_COMPONENTS
+            ]
+        components = list(components)
+        datasets = []
+        for receiver in receivers:
+            for component in components:
+                datasets.append(receiver[component]._dataset)
+        shape = (self.nrx, len(components)) + datasets[0].shape
+        if out is None:
+            out = np.empty(shape, dtype=dtype or datasets[0].dtype)
+        elif out.shape != shape:
+            raise ValueError(f"out must have the shape {shape}, got {out.shape}")
+        for index, dataset in enumerate(datasets):
+            if dataset.shape != shape[2:]:
+                raise ValueError(f"{dataset.name} has shape {dataset.shape}, expected {shape[2:]}")
+            if dataset.size:
+                dataset.read_direct(out[divmod(index, len(components))])
+        return ReceiverArray(out, components, self.dt, dict(self._file.attrs))
+
+    def close(self) -> None:
+        """
+        Close the HDF5 handle.
+        """
+        if self._file.id.valid:
+            self._file.close()
+
+    def __enter__(self) -> ModelResult:
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+    def __repr__(self) -> str:
+        return f"ModelResult({self.output_file}, nrx={self.nrx}, iterations={self.iterations})"
+
+
+def read_receivers(
+    output_file: Union[str, Path],
+    components: Optional[Sequence[str]] = None,
+    dtype: Optional[Union[str, np.dtype]] = None,
+    out: Optional[np.ndarray] = None,
+) -> ReceiverArray:
+    """
+    Read the outputs of all the receivers of a merged output file, opening it once.
+
+    Args:
+        output_file (str | Path): The merged output file.
+        components (Optional[Sequence[str]]): Components to read. Defaults to the outputs of the first receiver.
+        dtype (Optional[str | np.dtype]): Type of the array. Defaults to the type stored in the file.
+        out (Optional[np.ndarray]): C-contiguous array of shape (nrx, ncomponents, iterations, traces) to read into.
+
+    Returns:
+        ReceiverArray: The stacked outputs, dt and the attributes of the file.
+    """
+    with ModelResult(output_file) as result:
+        return result.read_all(components, dtype, out)
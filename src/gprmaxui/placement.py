@@ -0,0 +1,157 @@
+from __future__ import annotations
+
+import logging
+import math
+from typing import Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
+from gprmaxui.commands import DomainBox, SphereArray
+
+logger = logging.getLogger(__name__)
+
+# densest packing of equal balls in one, two and three dimensions
+PACKING_DENSITY = {1: 1.0, 2: math.pi / (2 * math.sqrt(3)), 3: math.pi / (3 * math.sqrt(2))}
+
+CANDIDATE_BATCH = 1024
+MAX_ATTEMPTS = 100_000
+MAX_REJECTIONS = 10_000
+
+
+def max_targets(domain: DomainBox, min_spacing: float) -> int:
+    """
+    Upper bound on the number of points that fit in a box with a minimum spacing between them.
+
+    Each point owns a ball of diameter min_spacing that lies within the box grown by half the
+    spacing on each side, and the balls can not be packed more densely than the densest packing.
+    Axes along which the box is flat do not count as dimensions.
+
+    Args:
+        domain (DomainBox): The box the points are placed in.
+        min_spacing (float): The minimum distance between two points.
+
+    Returns:
+        int: The maximum number of points, which may not be reachable in practice.
+    """
+    extents = [
+        domain.x_max - domain.x_min,
+        domain.y_max - domain.y_min,
+        domain.z_max - domain.z_min,
+    ]
+    extents = [extent for extent in extents if extent > 0]
+    if not extents:
+        return 1
+    dim = len(extents)
+    radius = min_spacing / 2
+    ball = math.pi ** (dim / 2) / math.gamma(dim / 2 + 1) * radius**dim
+    volume = math.prod(extent + min_spacing for extent in extents)
+    return int(PACKING_DENSITY[dim] * volume / ball)
+
+
+def place_targets(
+    n: int,
+    domain: DomainBox,
+    min_spacing: float,
+    radius: Union[float, Tuple[float, float]],
+    material: Optional[str] = None,
+    seed: Union[int, np.random.Generator, None] = None,
+    max_attempts: Optional[int] = None,
+    max_rejections: int = MAX_REJECTIONS,
+) -> SphereArray:
+    """
+    Place non-overlapping spherical targets at random inside a box.
+
+    Candidate centres are drawn uniformly in the box, each with its radius, and kept when every
+    accepted target is at least min_spacing away and does not overlap it, i.e. the centres are at
+    least the sum of the two radii apart. Accepted centres are hashed on a grid of cells as wide as
+    the largest required distance, so each candidate is only compared against the targets of the
+    27 surrounding cells.
+
+    Args:
+        n (int): Number of targets.
+        domain (DomainBox): The box the target centres are placed in. Its material is used if material is None.
+        min_spacing (float): The minimum distance between two target centres.
+        radius (float | Tuple[float, float]): Radius of the targets, or a (low, high) range to draw each radius from.
+        material (str, optional): Material of the targets.
+        seed (int | np.random.Generator, optional): Seed or generator, for reproducible scenes.
+        max_attempts (int, optional): Number of candidates drawn before giving up. Defaults to 100000.
+        max_rejections (int): Number of consecutive rejected candidates before giving up, so crowded
+            boxes fail fast.
+
+    Returns:
+        SphereArray: The targets, ready for GprMaxModel.add_geometry.
+
+    Raises:
+        ValueError: If n targets can never fit in the box with the requested spacing.
+        RuntimeError: If the targets could not be placed within max_attempts candidates, or
+            max_rejections candidates in a row were rejected.
+    """
+    assert n >= 0, "The number of targets must not be negative"
+    assert min_spacing > 0, "min_spacing must be positive"
+    assert max_rejections > 0, "max_rejections must be positive"
+    material = material or domain.material
+    assert material is not None, "A target material must be specified"
+
+    if isinstance(radius, (tuple, list)):
+        radius_low, radius_high = float(radius[0]), float(radius[1])
+    else:
+        radius_low = radius_high = float(radius)
+    # no two centres can be closer than the spacing or the sum of the two smallest radii
+    bound = max_targets(domain, max(min_spacing, 2 * radius_low))
+    if n > bound:
+        raise ValueError(
+            f"{n} targets with a spacing of {min_spacing} and a radius of at least {radius_low} "
+            f"can not fit in the box, at most {bound} can"
+        )
+
+    rng = np.random.default_rng(seed)
+    max_attempts = max_attempts or MAX_ATTEMPTS
+    low = np.array([domain.x_min, domain.y_min, domain.z_min])
+    high = np.array([domain.x_max, domain.y_max, domain.z_max])
+    cell_size = max(min_spacing, 2 * radius_high)
+
+    grid: Dict[Tuple[int, int, int], List[Tuple[float, float, float, float]]] = {}
+    targets: List[Tuple[float, float, float, float]] = []
+    attempts = 0
+    rejections = 0
+    while len(targets) < n and attempts < max_attempts and rejections < max_rejections:
+        batch = min(CANDIDATE_BATCH, max_attempts - attempts)
+        candidates = rng.uniform(low, high, size=(batch, 3))
+        radii = rng.uniform(radius_low, radius_high, size=batch)
+        cells = np.floor((candidates - low) / cell_size).astype(np.int64)
+        for candidate, r, cell in zip(candidates.tolist(), radii.tolist(), cells.tolist()):
+            attempts += 1
+            ci, cj, ck = cell
+            x, y, z = candidate
+            if all(
+                (x - px) ** 2 + (y - py) ** 2 + (z - pz) ** 2 >= max(min_spacing, r + pr) ** 2
+                for i in (ci - 1, ci, ci + 1)
+                for j in (cj - 1, cj, cj + 1)
+                for k in (ck - 1, ck, ck + 1)
+                for px, py, pz, pr in grid.get((i, j, k), ())
+            ):
+                grid.setdefault((ci, cj, ck), []).append((x, y, z, r))
+                targets.append((x, y, z, r))
+                rejections = 0
+                if len(targets) == n:
+                    break
+            else:
+                rejections += 1
+                if rejections == max_rejections:
+                    break
+
+    if len(targets) < n:
+        raise RuntimeError(
+            f"Only {len(targets)} of {n} targets could be placed after {attempts} attempts; "
+            f"reduce n, min_spacing or radius, or increase max_attempts and max_rejections"
+        )
+    logger.debug(f"Placed {n} targets in {attempts} attempts")
+
+    targets = np.array(targets, dtype=np.float64).reshape(-1, 4)
+    return SphereArray(
+        cx=targets[:, 0],
+        cy=targets[:, 1],
+        cz=targets[:, 2],
+        radius=targets[:, 3],
+        material=material,
+    )
@@ -0,0 +1,280 @@
+from __future__ import annotations
+
+import base64
+import logging
+import xml.etree.ElementTree as ET
+import zlib
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Optional, Tuple, Union
+
+import matplotlib.pyplot as plt
+import numpy as np
+from matplotlib.colors import Colormap
+
+logger = logging.getLogger(__name__)
+
+VTK_TYPES = {
+    "Int8": "i1",
+    "UInt8": "u1",
+    "Int16": "i2",
+    "UInt16": "u2",
+    "Int32": "i4",
+    "UInt32": "u4",
+    "Int64": "i8",
+    "UInt64": "u8",
+    "Float32": "f4",
+    "Float64": "f8",
+}
+
+# colormap PyVista uses for the material scalars of geometry views
+GEOMETRY_CMAP = "viridis"
+TX_COLOR = (255, 0, 0)
+RX_COLOR = (0, 0, 255)
+
+
+@dataclass
+class VtiImage:
+    extent: Tuple[int, int, int, int, int, int]
+    origin: Tuple[float, float, float]
+    spacing: Tuple[float, float, float]
+    cell_data: Dict[str, np.ndarray]
+    point_data: Dict[str, np.ndarray]
+
+    @property
+    def cells(self) -> Tuple[int, int, int]:
+        x0, x1, y0, y1, z0, z1 = self.extent
+        return x1 - x0, y1 - y0, z1 - z0
+
+    def cell_array(self, name: str) -> np.ndarray:
+        """
+        Get a cell array laid out on the grid.
+
+        Args:
+            name (str): Name of the cell array.
+
+        Returns:
+            np.ndarray: Array of shape (nz, ny, nx) or (nz, ny, nx, components).
+        """
+        nx, ny, nz = self.cells
+        values = self.cell_data[name]
+        return values.reshape((nz, ny, nx) + values.shape[1:])
+
+
+class _VtiDecoder:
+    def __init__(self, root: ET.Element, appended: Optional[bytes], appended_encoding: str):
+        self.byte_order = "<" if root.get("byte_order", "LittleEndian") == "LittleEndian" else ">"
+        self.header_type = np.dtype(self.byte_order + VTK_TYPES[root.get("header_type", "UInt32")])
+        self.compressor = root.get("compressor")
+        if self.compressor not in (None, "vtkZLibDataCompressor"):
+            raise ValueError(f"Unsupported VTK compressor {self.compressor}")
+        self.appended = appended
+        self.appended_encoding = appended_encoding
+
+    def _header_size(self, n_blocks: int) -> int:
+        return (3 + n_blocks if self.compressor else 1) * self.header_type.itemsize
+
+    def _read_raw(self, data: bytes, offset: int = 0) -> bytes:
+        size = self.header_type.itemsize
+        if not self.compressor:
+            n_bytes = int(np.frombuffer(data, self.header_type, 1, offset)[0])
+            return data[offset + size:offset + size + n_bytes]
+        n_blocks = int(np.frombuffer(data, self.header_type, 1, offset)[0])
+        header = np.frombuffer(data, self.header_type, 3 + n_blocks, offset)
+        position = offset + self._header_size(n_blocks)
+        blocks = []
+        for compressed_size in header[3:]:
+            blocks.append(zlib.decompress(data[position:position + int(compressed_size)]))
+            position += int(compressed_size)
+        return b"".join(blocks)
+
+    def _read_base64(self, text: bytes) -> bytes:
+        size = self.header_type.itemsize
+        first = int(np.frombuffer(base64.b64decode(text[:_base64_length(size)]), self.header_type, 1)[0])
+        if not self.compressor:
+            # the header and the data are encoded together
+            return base64.b64decode(text[:_base64_length(size + first)])[size:size + first]
+        # compressed arrays encode the header and the blocks separately
+        header_length = _base64_length(self._header_size(first))
+        header = base64.b64decode(text[:header_length])
+        compressed_size = int(np.frombuffer(header, self.header_type)[3:].sum())
+        compressed = base64.b64decode(
+            text[header_length:header_length + _base64_length(compressed_size)]
+        )
+        return self._read_raw(header + compressed)
+
+    def decode(self, array: ET.Element) -> np.ndarray:
+        dtype = np.dtype(self.byte_order + VTK_TYPES[array.get("type")])
+        data_format = array.get("format", "ascii")
+        if data_format == "ascii":
+            values = np.array((array.text or "").split(), dtype=dtype)
+        elif data_format == "binary":
+            values = np.frombuffer(self._read_base64("".join((array.text or "").split()).encode()), dtype)
+        elif data_format == "appended":
+            offset = int(array.get("offset", 0))
+            if self.appended_encoding == "raw":
+                values = np.frombuffer(self._read_raw(self.appended, offset), dtype)
+            else:
+                values = np.frombuffer(self._read_base64(self.appended[offset:]), dtype)
+        else:
+            raise ValueError(f"Unsupported VTK data format {data_format}")
+        components = int(array.get("NumberOfComponents", 1))
+        return values.reshape(-1, components) if components > 1 else values
+
+
+def _base64_length(n_bytes: int) -> int:
+    return -(-n_bytes // 3) * 4
+
+
+def read_vti(filename: Union[str, Path]) -> VtiImage:
+    """
+    Read a VTK XML image file (.vti) with NumPy, as written by gprMax or VTK.
+
+    Raw and base64 appended data, inline binary and ascii arrays are supported, uncompressed or
+    compressed with zlib.
+
+    Args:
+        filename (str | Path): The .vti file.
+
+    Returns:
+        VtiImage: The grid and its cell and point arrays.
+    """
+    content = Path(filename).read_bytes()
+    appended = None
+    appended_encoding = "raw"
+    start = content.find(b"<AppendedData")
+    if start != -1:
+        # appended data is not valid XML, parse the header up to it and slice the data out
+        tag_end = content.index(b">", start)
+        tag = ET.fromstring(content[start:tag_end] + b"/>")
+        appended_encoding = tag.get("encoding", "raw")
+        data_start = content.index(b"_", tag_end) + 1
+        appended = content[data_start:]
+        if appended_encoding != "raw":
+            appended = b"".join(appended[:appended.rindex(b"</AppendedData>")].split())
+        content = content[:start] + b"</VTKFile>"
+    root = ET.fromstring(content)
+    image = root.find("ImageData")
+    piece = image.find("Piece")
+    decoder = _VtiDecoder(root, appended, appended_encoding)
+
+    def arrays(tag: str) -> Dict[str, np.ndarray]:
+        element = piece.find(tag)
+        if element is None:
+            return {}
+        return {array.get("Name"): decoder.decode(array) for array in element.findall("DataArray")}
+
+    return VtiImage(
+        extent=tuple(int(v) for v in piece.get("Extent", image.get("WholeExtent")).split()),
+        origin=tuple(float(v) for v in image.get("Origin", "0 0 0").split()),
+        spacing=tuple(float(v) for v in image.get("Spacing", "1 1 1").split()),
+        cell_data=arrays("CellData"),
+        point_data=arrays("PointData"),
+    )
+
+
+def _plane(image: VtiImage, name: str, filename: Union[str, Path]) -> np.ndarray:
+    if image.cells[2] != 1:
+        raise ValueError(
+            f"{filename} has {image.cells[2]} cells along z, the NumPy renderer only draws 2D models"
+        )
+    return image.cell_array(name)[0]
+
+
+class SnapshotRasterizer:
+    """
+    Draw the snapshots of 2D models with NumPy, as an alternative to off-screen VTK rendering.
+
+    The magnitude of the H-field is mapped through the colormap, the geometry view is blended over it
+    and the Tx/Rx are stamped as squares, with y pointing up like the VTK "xy" view.
+    """
+
+    def __init__(self, cmap: Union[str, Colormap] = "jet", geometry_opacity: float = 0.5):
+        """
+        Initialize the rasterizer.
+
+        Args:
+            cmap (str | Colormap): Colormap of the field.
+            geometry_opacity (float): Opacity of the geometry layer.
+        """
+        cmap = plt.get_cmap(cmap)
+        self.lut = cmap(np.arange(cmap.N), bytes=True)[:, :3]
+        self.geometry_opacity = geometry_opacity
+        self._geometry_file = None
+        self._geometry_layer = None
+
+    def _map(self, values: np.ndarray, lut: np.ndarray) -> np.ndarray:
+        low, high = float(values.min()), float(values.max())
+        scale = len(lut) / (high - low) if high > low else 0.0
+        indices = ((values - low) * scale).astype(np.intp)
+        np.clip(indices, 0, len(lut) - 1, out=indices)
+        return lut[indices]
+
+    def geometry_layer(self, geometry_file: Union[str, Path]) -> np.ndarray:
+        """
+        Get the geometry layer of a geometry view, colored by material, rasterized once per file.
+
+        Args:
+            geometry_file (str | Path): The geometry view .vti file.
+
+        Returns:
+            np.ndarray: RGB layer of shape (ny, nx, 3), premultiplied by the geometry opacity.
+        """
+        if geometry_file != self._geometry_file:
+            materials = _plane(read_vti(geometry_file), "Material", geometry_file)
+            cmap = plt.get_cmap(GEOMETRY_CMAP)
+            colors = self._map(materials, cmap(np.arange(cmap.N), bytes=True)[:, :3])
+            self._geometry_layer = (colors * self.geometry_opacity).astype(np.uint16)
+            self._geometry_file = geometry_file
+        return self._geometry_layer
+
+    def render(
+        self,
+        snapshot_file: Union[str, Path, VtiImage],
+        geometry_file: Optional[Union[str, Path]],
+        tx: Tuple[float, float],
+        rx: Tuple[float, float],
+        size: float,
+    ) -> np.ndarray:
+        """
+        Draw a snapshot.
+
+        Args:
+            snapshot_file (str | Path | VtiImage): The snapshot .vti file, or the snapshot already read.
+            geometry_file (str | Path, optional): The geometry view .vti file blended over the field.
+            tx (Tuple[float, float]): (x, y) centre of the Tx marker.
+            rx (Tuple[float, float]): (x, y) centre of the Rx marker.
+            size (float): Side length of the markers.
+
+        Returns:
+            np.ndarray: RGB image of shape (ny, nx, 3), one pixel per cell.
+        """
+        snapshot = snapshot_file if isinstance(snapshot_file, VtiImage) else read_vti(snapshot_file)
+        field = _plane(snapshot, "H-field", snapshot_file)
+        if field.ndim == 3:
+            field = np.linalg.norm(field, axis=-1)
+        rgb = self._map(field, self.lut)
+
+        if geometry_file is not None:
+            layer = self.geometry_layer(geometry_file)
+            if layer.shape != rgb.shape:
+                raise ValueError(f"{geometry_file} and {snapshot_file} are not on the same grid")
+            rgb = (rgb * (1 - self.geometry_opacity)).astype(np.uint16)
+            rgb += layer
+            rgb = rgb.astype(np.uint8)
+
+        for (x, y), color in ((tx, TX_COLOR), (rx, RX_COLOR)):
+            (x0, x1), (y0, y1) = (
+                _cell_span(centre, size, origin, spacing, cells)
+                for centre, origin, spacing, cells in zip(
+                    (x, y), snapshot.origin[:2], snapshot.spacing[:2], rgb.shape[1::-1]
+                )
+            )
+            rgb[y0:y1, x0:x1] = color
+        return rgb[::-1]
+
+
+def _cell_span(centre: float, size: float, origin: float, spacing: float, cells: int) -> Tuple[int, int]:
+    start = int(np.floor((centre - size / 2 - origin) / spacing + 0.5))
+    stop = int(np.floor((centre + size / 2 - origin) / spacing + 0.5))
+    return max(0, start), min(cells, max(stop, start + 1))
@@ -0,0 +1,300 @@
+from __future__ import annotations
+
+import json
+import logging
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+import h5py
+import numpy as np
+from tqdm import tqdm
+
+from gprmaxui.raster import VtiImage, read_vti
+from gprmaxui.utils import rmdir
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_PATTERN = re.compile(r"snapshot(\d+)\.vti")
+
+
+@dataclass(frozen=True)
+class SnapshotStoreTask:
+    snapshot_folder: str
+    fields: Optional[Tuple[str, ...]]
+    delete: bool
+    storage: Dict[str, Any]
+
+
+def snapshot_store_file(snapshot_folder: Union[str, Path]) -> Path:
+    """
+    Get the consolidated store of a snapshot folder, sim_snapsN.h5 next to sim_snapsN.
+
+    Args:
+        snapshot_folder (str | Path): The sim_snapsN folder of a trace.
+
+    Returns:
+        Path: The HDF5 store file.
+    """
+    snapshot_folder = Path(snapshot_folder)
+    return snapshot_folder.with_name(f"{snapshot_folder.name}.h5")
+
+
+def _snapshot_files(snapshot_folder: Path) -> List[Tuple[int, Path]]:
+    snapshots = []
+    with os.scandir(snapshot_folder) as entries:
+        for entry in entries:
+            match = SNAPSHOT_PATTERN.fullmatch(entry.name)
+            if match:
+                snapshots.append((int(match.group(1)), Path(entry.path)))
+    return sorted(snapshots)
+
+
+def _store_iterations(store_file: Path) -> Optional[List[int]]:
+    try:
+        with h5py.File(store_file, "r") as f:
+            return [int(iteration) for iteration in f["iterations"][()]]
+    except (OSError, KeyError):
+        return None
+
+
+def _source_signature(snapshots: List[Tuple[int, Path]]) -> str:
+    # regenerated snapshots (e.g. a resumed trace) change the modification times and sizes
+    parts = []
+    for _, snapshot_file in snapshots:
+        stat = snapshot_file.stat()
+        parts.append([snapshot_file.name, stat.st_mtime_ns, stat.st_size])
+    return json.dumps(parts)
+
+
+def _store_record(store_file: Path) -> Optional[Dict[str, Any]]:
+    try:
+        with h5py.File(store_file, "r") as f:
+            return {
+                "sources": f.attrs["sources"],
+                "fields": json.loads(f.attrs["fields"]),
+                "source_fields": json.loads(f.attrs["source_fields"]),
+                "storage": json.loads(f.attrs["storage"]),
+            }
+    except (OSError, KeyError, ValueError):
+        return None
+
+
+def _store_is_current(record: Optional[Dict[str, Any]], sources: str, task: SnapshotStoreTask) -> bool:
+    if record is None or record["sources"] != sources or record["storage"] != task.storage:
+        return False
+    fields = record["source_fields"] if task.fields is None else list(task.fields)
+    return sorted(record["fields"]) == sorted(fields)
+
+
+def _write_snapshot_store(task: SnapshotStoreTask) -> str:
+    snapshot_folder = Path(task.snapshot_folder)
+    store_file = snapshot_store_file(snapshot_folder)
+    snapshots = _snapshot_files(snapshot_folder)
+    sources = _source_signature(snapshots)
+    record = _store_record(store_file)
+    if not _store_is_current(record, sources, task):
+        staging = store_file.with_name(f".{store_file.name}.tmp")
+        source_fields = []
+        fields = []
+        with h5py.File(staging, "w") as f:
+            f.create_dataset("iterations", data=np.array([iteration for iteration, _ in snapshots], dtype=np.int64))
+            for index, (_, snapshot_file) in enumerate(snapshots):
+                image = read_vti(snapshot_file)
+                if index == 0:
+                    f.attrs["origin"] = image.origin
+                    f.attrs["spacing"] = image.spacing
+                    source_fields = list(image.cell_data)
+                    fields = list(task.fields or source_fields)
+                    nx, ny, nz = image.cells
+                    for field in fields:
+                        components = image.cell_data[field].shape[1:]
+                        f.create_dataset(
+                            field,
+                            (len(snapshots), nx, ny, nz) + components,
+                            dtype=np.dtype(task.storage.get("dtype") or image.cell_data[field].dtype),
+                            # one chunk per snapshot, so reading a frame only decompresses that frame
+                            chunks=(1, nx, ny, nz) + components,
+                            compression=task.storage.get("compression"),
+                            compression_opts=task.storage.get("compression_opts"),
+                            shuffle=task.storage.get("shuffle", False),
+                        )
+                elif image.cells != (nx, ny, nz):
+                    raise ValueError(f"{snapshot_file} is not on the grid of the other snapshots of {snapshot_folder}")
+                for field in fields:
+                    # VTK orders cells with x varying fastest, the store is indexed (x, y, z)
+                    f[field][index] = np.moveaxis(image.cell_array(field), (0, 1, 2), (2, 1, 0))
+            f.attrs["sources"] = sources
+            f.attrs["fields"] = json.dumps(fields)
+            f.attrs["source_fields"] = json.dumps(source_fields)
+            f.attrs["storage"] = json.dumps(task.storage)
+        os.replace(staging, store_file)
+        record = _store_record(store_file)
+    if task.delete:
+        missing = sorted(set(record["source_fields"]) - set(record["fields"]))
+        if missing:
+            # the snapshot files are the only copy of the fields left out of the store
+            logger.warning(f"Keeping {snapshot_folder}, its store does not hold {', '.join(missing)}")
+        else:
+            rmdir(snapshot_folder)
+    return str(store_file)
+
+
+def consolidate_snapshots(
+    output_folder: Union[str, Path],
+    fields: Optional[Sequence[str]] = None,
+    delete: bool = False,
+    workers: Optional[int] = None,
+    dtype: Optional[str] = None,
+    compression: Optional[str] = "gzip",
+    compression_opts: Optional[int] = 4,
+    shuffle: bool = True,
+) -> List[Path]:
+    """
+    Convert the snapshot files of a run into one HDF5 store per trace.
+
+    The snapshots of sim_snapsN/snapshotK.vti are stacked into sim_snapsN.h5, with one dataset per field
+    (e.g. /H-field) of shape (snapshots, nx, ny, nz, components), chunked by snapshot, and the snapshot
+    numbers K in /iterations. The grid origin and spacing are stored as attributes. Stores are written
+    under a temporary name and renamed once complete. A store is kept when it was built from the same
+    snapshot files (by modification time and size) with the same fields and storage options, so an
+    interrupted consolidation resumes where it stopped, and is rebuilt otherwise. Snapshot folders are
+    only deleted when their store holds every field of the snapshot files.
+
+    Args:
+        output_folder (str | Path): Output folder of the run.
+        fields (Optional[Sequence[str]]): Fields to keep, e.g. ["H-field"]. Defaults to all.
+        delete (bool): Whether to delete the snapshot folders once their store is written.
+        workers (Optional[int]): Number of stores written in parallel. Defaults to the number of CPUs.
+        dtype (Optional[str]): Storage type of the fields, e.g. "float16".
+        compression (Optional[str]): HDF5 compression filter, "gzip", "lzf" or None.
+        compression_opts (Optional[int]): Compression level of the gzip filter.
+        shuffle (bool): Whether to apply the HDF5 shuffle filter before compression.
+
+    Returns:
+        List[Path]: The store files, in trace order.
+    """
+    output_folder = Path(output_folder)
+    if dtype is not None and np.dtype(dtype).kind != "f":
+        raise ValueError(f"Snapshots must be stored as floating point, got {dtype}")
+    storage = {
+        "dtype": None if dtype is None else np.dtype(dtype).name,
+        "compression": compression,
+        "compression_opts": compression_opts if compression == "gzip" else None,
+        "shuffle": shuffle,
+    }
+    snapshot_folders = sorted(
+        (folder for folder in output_folder.glob("sim_snaps*") if folder.is_dir()),
+        key=lambda folder: int(folder.name[len("sim_snaps"):] or 0),
+    )
+    tasks = [
+        SnapshotStoreTask(str(folder), None if fields is None else tuple(fields), delete, storage)
+        for folder in snapshot_folders
+    ]
+    workers = max(1, min(workers or os.cpu_count() or 1, len(tasks) or 1))
+    if workers == 1:
+        for task in tqdm(tasks, desc="Consolidating snapshots"):
+            _write_snapshot_store(task)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(_write_snapshot_store, task) for task in tasks]
+            for future in tqdm(as_completed(futures), total=len(futures), desc="Consolidating snapshots"):
+                future.result()
+    return [snapshot_store_file(folder) for folder in snapshot_folders]
+
+
+class SnapshotReader:
+    """
+    Read snapshots by their sim_snapsN/snapshotK.vti path, from the consolidated store when there is one.
+
+    The store of the last trace read is kept open, so reading the frames of a trace in order only opens it once.
+    """
+
+    def __init__(self):
+        self._store_file: Optional[Path] = None
+        self._store: Optional[h5py.File] = None
+        # snapshot number -> index in the store, per store file
+        self._stored: Dict[Path, Dict[int, int]] = {}
+
+    def _open(self, store_file: Path) -> h5py.File:
+        if store_file != self._store_file:
+            self._close_store()
+            self._store = h5py.File(store_file, "r")
+            self._store_file = store_file
+        return self._store
+
+    def _close_store(self) -> None:
+        if self._store is not None:
+            self._store.close()
+        self._store = None
+        self._store_file = None
+
+    def _locate(self, snapshot_file: Path) -> Tuple[Optional[Path], Optional[int]]:
+        match = SNAPSHOT_PATTERN.fullmatch(snapshot_file.name)
+        if match is None:
+            return None, None
+        store_file = snapshot_store_file(snapshot_file.parent)
+        if store_file not in self._stored:
+            iterations = _store_iterations(store_file) if store_file.exists() else None
+            if iterations is not None and snapshot_file.parent.is_dir():
+                # prefer snapshot files that were written after the store was built
+                record = _store_record(store_file)
+                if record is None or record["sources"] != _source_signature(_snapshot_files(snapshot_file.parent)):
+                    logger.debug(f"{store_file} is older than the snapshots of {snapshot_file.parent}, ignoring it")
+                    iterations = None
+            self._stored[store_file] = {iteration: index for index, iteration in enumerate(iterations or [])}
+        index = self._stored[store_file].get(int(match.group(1)))
+        return (store_file, index) if index is not None else (None, None)
+
+    def exists(self, snapshot_file: Union[str, Path]) -> bool:
+        """
+        Check whether a snapshot can be read.
+
+        Args:
+            snapshot_file (str | Path): The sim_snapsN/snapshotK.vti path of the snapshot.
+
+        Returns:
+            bool: Whether the snapshot is in the store of its trace or the .vti file exists.
+        """
+        snapshot_file = Path(snapshot_file)
+        return self._locate(snapshot_file)[0] is not None or snapshot_file.exists()
+
+    def read(self, snapshot_file: Union[str, Path]) -> VtiImage:
+        """
+        Read a snapshot.
+
+        Args:
+            snapshot_file (str | Path): The sim_snapsN/snapshotK.vti path of the snapshot.
+
+        Returns:
+            VtiImage: The snapshot grid and its cell arrays.
+        """
+        snapshot_file = Path(snapshot_file)
+        store_file, index = self._locate(snapshot_file)
+        if store_file is None:
+            return read_vti(snapshot_file)
+        store = self._open(store_file)
+        cell_data = {}
+        for field, dataset in store.items():
+            if field == "iterations":
+                continue
+            nx, ny, nz = dataset.shape[1:4]
+            values = np.moveaxis(dataset[index], (0, 1, 2), (2, 1, 0))
+            cell_data[field] = values.reshape((-1,) + dataset.shape[4:])
+        return VtiImage(
+            extent=(0, nx, 0, ny, 0, nz),
+            origin=tuple(float(v) for v in store.attrs["origin"]),
+            spacing=tuple(float(v) for v in store.attrs["spacing"]),
+            cell_data=cell_data,
+            point_data={},
+        )
+
+    def close(self) -> None:
+        """
+        Close the open store and forget which snapshots are stored.
+        """
+        self._close_store()
+        self._stored = {}
@@ -0,0 +1,220 @@
+from __future__ import annotations
+
+import json
+import logging
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+from tqdm import tqdm
+
+from gprmaxui.gprmax_model import (
+    GprMaxModel,
+    _physical_cpu_count,
+    _resolve_mpi_tasks,
+    _resolve_worker_layout,
+    _validate_positive_int,
+)
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class SweepTask:
+    index: int
+    output_folder: Path
+    model_json: Dict[str, Any]
+    run_kwargs: Dict[str, Any]
+
+
+@dataclass(frozen=True)
+class SweepResult:
+    index: int
+    output_folder: Path
+    status: str
+    started: float
+    elapsed: float
+    error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.status == "completed"
+
+
+def _failed_result(
+    index: int,
+    output_folder: Path,
+    error: Exception,
+    started: float = float("nan"),
+    elapsed: float = float("nan"),
+) -> SweepResult:
+    return SweepResult(
+        index=index,
+        output_folder=output_folder,
+        status="failed",
+        started=started,
+        elapsed=elapsed,
+        error=f"{type(error).__name__}: {error}",
+    )
+
+
+def _resolve_sweep_layout(
+    n_models: int,
+    max_workers: Optional[int],
+    threads_per_model: Optional[int],
+) -> Tuple[int, int]:
+    cores = _physical_cpu_count()
+    if max_workers is not None:
+        max_workers = _validate_positive_int(max_workers, "max_workers")
+    if threads_per_model is not None:
+        threads_per_model = _validate_positive_int(
+            threads_per_model, "threads_per_model"
+        )
+
+    max_workers, threads_per_model = _resolve_worker_layout(
+        n_models, max_workers, threads_per_model, cores
+    )
+    if max_workers * threads_per_model > cores:
+        raise ValueError(
+            f"{max_workers} concurrent models with {threads_per_model} threads each "
+            f"would oversubscribe the {cores} physical cores of this machine"
+        )
+    return max_workers, threads_per_model
+
+
+def _resolve_sweep_mpi(
+    mpi,
+    gpu,
+    n_traces: Union[int, str],
+    model: GprMaxModel,
+    model_cores: int,
+    threads: int,
+):
+    if not mpi:
+        return False
+    if n_traces == "auto":
+        n_traces = model._compute_n_traces()
+    tasks = _resolve_mpi_tasks(mpi, gpu, n_traces)
+    # one MPI task coordinates the others, the remaining ones simulate traces
+    return max(1, min(tasks, model_cores // threads + 1))
+
+
+def _run_sweep_model(task: SweepTask) -> SweepResult:
+    started = time.time()
+    start = time.perf_counter()
+    try:
+        model = GprMaxModel.from_json(task.model_json)
+        model.run(**task.run_kwargs)
+    except Exception as e:
+        logger.error(f"Model {task.index} in {task.output_folder} failed: {e}")
+        return _failed_result(
+            task.index, task.output_folder, e, started, time.perf_counter() - start
+        )
+    return SweepResult(
+        index=task.index,
+        output_folder=model.output_folder,
+        status="completed",
+        started=started,
+        elapsed=time.perf_counter() - start,
+    )
+
+
+def run_many(
+    models: Sequence[GprMaxModel],
+    max_workers: Optional[int] = None,
+    threads_per_model: Optional[int] = None,
+    output_root: Union[str, Path, None] = None,
+    **run_kwargs,
+) -> List[SweepResult]:
+    """
+    Run many models concurrently, one model per worker process.
+
+    The physical cores of the machine are split between the concurrent models and the
+    OpenMP threads of each model so the machine is never oversubscribed. MPI tasks requested
+    through the mpi option are limited to the cores assigned to each model.
+
+    Args:
+        models (Sequence[GprMaxModel]): Models to run.
+        max_workers (int | None): Number of models simulated at the same time. Derived from the core count if None.
+        threads_per_model (int | None): OpenMP threads of each model. Derived from the core count if None.
+        output_root (str | Path | None): If provided, each model is moved to its own numbered subfolder of output_root.
+        **run_kwargs: Options forwarded to GprMaxModel.run, e.g. n, geometry or cache.
+
+    Returns:
+        List[SweepResult]: Status and timings of each model, in the order of the input models.
+    """
+    models = list(models)
+    if not models:
+        return []
+    assert "n" in run_kwargs, "The n argument must be specified"
+    assert (
+        "num_threads" not in run_kwargs
+    ), "Use threads_per_model to set the threads of each model"
+
+    if output_root is not None:
+        output_root = Path(output_root)
+        width = max(5, len(str(len(models) - 1)))
+        for index, model in enumerate(models):
+            model.output_folder = output_root.joinpath(f"model_{index:0{width}d}")
+
+    output_folders = [Path(model.output_folder).resolve() for model in models]
+    if len(set(output_folders)) != len(output_folders):
+        raise ValueError(
+            "Every model of a sweep needs its own output folder; set distinct output folders or pass output_root"
+        )
+
+    mpi = run_kwargs.pop("mpi", False)
+    if mpi and threads_per_model is None:
+        # let the MPI tasks of each model share its cores
+        threads_per_model = 1
+    worker_count, threads = _resolve_sweep_layout(
+        len(models), max_workers, threads_per_model
+    )
+    model_cores = max(1, _physical_cpu_count() // worker_count)
+
+    results: List[Optional[SweepResult]] = [None] * len(models)
+    tasks = []
+    for index, model in enumerate(models):
+        try:
+            model_run_kwargs = {
+                **run_kwargs,
+                "num_threads": threads,
+                "mpi": _resolve_sweep_mpi(
+                    mpi, run_kwargs.get("gpu"), run_kwargs["n"], model, model_cores, threads
+                ),
+            }
+            model_json = json.loads(model.to_json())
+        except Exception as e:
+            # e.g. n="auto" on a model whose traces can not be counted, record it and keep the sweep
+            logger.error(f"Model {index} in {model.output_folder} could not be prepared: {e}")
+            results[index] = _failed_result(index, model.output_folder, e)
+            continue
+        tasks.append(
+            SweepTask(
+                index=index,
+                output_folder=model.output_folder,
+                model_json=model_json,
+                run_kwargs=model_run_kwargs,
+            )
+        )
+
+    logger.info(
+        f"Running {len(tasks)} models with {worker_count} workers and {threads} threads per model"
+    )
+    if worker_count == 1:
+        for task in tqdm(tasks):
+            results[task.index] = _run_sweep_model(task)
+        return results
+
+    with ProcessPoolExecutor(max_workers=worker_count) as executor:
+        futures = {executor.submit(_run_sweep_model, task): task for task in tasks}
+        for future in tqdm(as_completed(futures), total=len(futures)):
+            task = futures[future]
+            try:
+                results[task.index] = future.result()
+            except Exception as e:
+                # e.g. a crashed worker, record the model as failed and keep the rest of the sweep
+                results[task.index] = _failed_result(task.index, task.output_folder, e)
+    return results
@@ -1,10 +1,15 @@
 
 import decimal as d
+import logging
 import math
 import os
 import re
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from itertools import islice
+from multiprocessing import get_context
 from pathlib import Path
-from typing import List, Union
+from typing import Dict, Iterator, List, Union
 from typing import Optional, Tuple
 
 import h5py
@@ -12,6 +17,19 @@ import matplotlib.pyplot as plt
 import numpy as np
 from PIL import Image
 from matplotlib.backends.backend_agg import FigureCanvasAgg as FigureCanvas
+from tqdm import tqdm
+
+from gprmaxui.output import read_receivers
+
+logger = logging.getLogger(__name__)
+
+
+# traces copied at once when a virtual merged file is materialized
+MATERIALIZE_BLOCK = 256
+
+# smallest number of trace files read in parallel when merging with the default workers
+PARALLEL_MERGE_MIN_TRACES = 64
+MAX_MERGE_WORKERS = 8
 
 
 def rmdir(folder: Path) -> None:
@@ -29,37 +47,83 @@ def rmdir(folder: Path) -> None:
     folder.rmdir()
 
 
-def get_output_data(filename: str, rxnumber: int, rxcomponent: str) -> Tuple[np.ndarray, float]:
+def _time_slice(time_range: Optional[Tuple], dt: float) -> slice:
+    if time_range is None:
+        return slice(None)
+    start, stop = time_range
+    # integers are samples, floats are seconds
+    if isinstance(start, float):
+        start = int(round(start / dt))
+    if isinstance(stop, float):
+        stop = int(round(stop / dt))
+    return slice(start, stop)
+
+
+def get_output_data(
+    filename: str,
+    rxnumber: int,
+    rxcomponent: str,
+    time_range: Optional[Tuple[Union[int, float, None], Union[int, float, None]]] = None,
+    trace_range: Optional[Tuple[Optional[int], Optional[int]]] = None,
+    trace_step: int = 1,
+    out: Optional[np.ndarray] = None,
+) -> Tuple[np.ndarray, float]:
     """
     Gets B-scan output data from a model.
 
+    Only the requested window is read from the file, e.g. time_range=(0, 300e-9) for the first
+    300 ns, or trace_step=4 for every fourth trace. Merged files are chunked by trace, so a trace
+    window only touches the chunks of its traces, while a time window still reads one whole chunk
+    per trace (see merge_model_files).
+
     Args:
         filename (str): Filename (including path) of output file.
         rxnumber (int): Receiver output number.
         rxcomponent (str): Receiver output field/current component.
+        time_range (Optional[Tuple]): (start, stop) of the time window, in seconds when given as floats
+            or in samples when given as integers. The stop is excluded and None leaves a bound open.
+        trace_range (Optional[Tuple[int, int]]): (start, stop) of the traces, as 0-based trace indices.
+            The stop is excluded and None leaves a bound open.
+        trace_step (int): Step between the traces read.
+        out (Optional[np.ndarray]): C-contiguous array the window is read into, of the window's shape.
 
     Returns:
         Tuple[np.ndarray, float]: Array of A-scans (B-scan data) and temporal resolution of the model.
     """
-    f = h5py.File(filename, "r")
-    nrx = f.attrs["nrx"]
-    dt = f.attrs["dt"]
+    with h5py.File(filename, "r") as f:
+        nrx = f.attrs["nrx"]
+        dt = f.attrs["dt"]
 
-    if nrx == 0:
-        raise Exception(f"No receivers found in {filename}")
+        if nrx == 0:
+            raise Exception(f"No receivers found in {filename}")
 
-    path = f"/rxs/rx{rxnumber}/"
-    availableoutputs = list(f[path].keys())
+        path = f"/rxs/rx{rxnumber}/"
+        availableoutputs = list(f[path].keys())
 
-    if rxcomponent not in availableoutputs:
-        raise Exception(
-            f"{rxcomponent} output requested to plot, but the available output for receiver 1 is {', '.join(availableoutputs)}"
-        )
+        if rxcomponent not in availableoutputs:
+            raise Exception(
+                f"{rxcomponent} output requested to plot, but the available output for receiver 1 is {', '.join(availableoutputs)}"
+            )
 
-    outputdata = np.array(f[path + "/" + rxcomponent])
-    f.close()
+        dataset = f[path + "/" + rxcomponent]
+        if time_range is None and trace_range is None and trace_step == 1 and out is None:
+            return np.array(dataset), dt
 
-    return outputdata, dt
+        trace_start, trace_stop = trace_range or (None, None)
+        selection = np.s_[_time_slice(time_range, dt), trace_start:trace_stop:trace_step]
+        if out is None:
+            return dataset[selection], dt
+
+        iterations, n_traces = dataset.shape
+        shape = (
+            len(range(*selection[0].indices(iterations))),
+            len(range(*selection[1].indices(n_traces))),
+        )
+        if out.shape != shape:
+            raise ValueError(f"out must have the shape of the selection {shape}, got {out.shape}")
+        if 0 not in shape:
+            dataset.read_direct(out, source_sel=selection)
+        return out, dt
 
 
 def is_integer_num(n: Union[int, float]) -> bool:
@@ -79,57 +143,376 @@ def is_integer_num(n: Union[int, float]) -> bool:
     return False
 
 
-def merge_model_files(output_folder: Path, output_file: Path, gprMax_version: str = None) -> None:
+def _output_file_number(filename: Path) -> Optional[int]:
+    match = re.search(r"(\d+)$", filename.stem)
+    return int(match.group(1)) if match else None
+
+
+def _trace_output_files(output_folder: Path, output_file: Path) -> List[Path]:
+    out_files = [
+        out_file
+        for out_file in output_folder.glob("*.out")
+        if out_file.resolve() != Path(output_file).resolve()
+    ]
+    numbered = [out_file for out_file in out_files if _output_file_number(out_file) is not None]
+    if not numbered:
+        # gprMax drops the model number when a single model is run
+        return sorted(out_files)
+    # an unnumbered file next to numbered traces is left over from an earlier single model run
+    return sorted(numbered, key=_output_file_number)
+
+
+def is_complete_output_file(filename: Path, iterations: Optional[int] = None) -> bool:
     """
-    Merge the output files from a simulation run into a single file.
+    Check that a per-trace output file was completely written.
 
     Args:
-        output_folder (Path): The folder containing the output files.
-        output_file (Path): The path to the merged output file.
+        filename (Path): The output file of a single trace.
+        iterations (Optional[int]): Expected number of iterations. If None, only the receiver datasets are checked
+            against the Iterations attribute of the file.
+
+    Returns:
+        bool: True if the file can be read and every receiver dataset holds all the iterations, False otherwise.
     """
+    try:
+        with h5py.File(filename, "r") as f:
+            file_iterations = int(f.attrs["Iterations"])
+            if iterations is not None and file_iterations != iterations:
+                return False
+            nrx = int(f.attrs["nrx"])
+            for rx in range(1, nrx + 1):
+                outputs = f[f"/rxs/rx{rx}"]
+                if len(outputs) == 0:
+                    return False
+                for output in outputs.values():
+                    if output.shape[0] != file_iterations:
+                        return False
+    except (OSError, KeyError):
+        return False
+    return True
+
+
+def _resolve_gprmax_version(gprMax_version: Optional[str]) -> str:
     if gprMax_version is None:
         try:
             from gprMax._version import __version__
             gprMax_version = __version__
         except ImportError:
             raise ImportError("gprMax version could not be determined. Ensure gprMax is installed correctly.")
+    return gprMax_version
+
+
+def _copy_merged_attrs(fout: h5py.File, fin: h5py.File, gprMax_version: str) -> None:
+    fout.attrs["Title"] = fin.attrs["Title"]
+    fout.attrs["gprMax"] = gprMax_version
+    fout.attrs["Iterations"] = fin.attrs["Iterations"]
+    fout.attrs["dt"] = fin.attrs["dt"]
+    fout.attrs["nrx"] = fin.attrs["nrx"]
+
+
+def _init_merged_file(fout: h5py.File, fin: h5py.File, model_runs: int, gprMax_version: str,
+                      fillvalue: Optional[float] = None, dtype: Optional[str] = None,
+                      compression: Optional[str] = None, compression_opts: Optional[int] = None,
+                      shuffle: bool = False) -> None:
+    if dtype is not None and np.dtype(dtype).kind != "f":
+        raise ValueError(f"Merged outputs must be stored as floating point, got {dtype}")
+    _copy_merged_attrs(fout, fin, gprMax_version)
+    iterations = int(fout.attrs["Iterations"])
+    for rx in range(1, fin.attrs["nrx"] + 1):
+        path = f"/rxs/rx{rx}"
+        grp = fout.create_group(path)
+        availableoutputs = list(fin[path].keys())
+        for output in availableoutputs:
+            output_dtype = np.dtype(dtype or fin[path + "/" + output].dtype)
+            # one chunk per trace, so writing a trace or reading an A-scan touches a single chunk
+            grp.create_dataset(
+                output,
+                (iterations, model_runs),
+                dtype=output_dtype,
+                chunks=(iterations, 1),
+                compression=compression,
+                compression_opts=compression_opts,
+                shuffle=shuffle,
+                fillvalue=fillvalue if output_dtype.kind == "f" else None,
+            )
+
+
+def _overflows(values: np.ndarray, dtype: np.dtype) -> bool:
+    # values beyond the range of a narrower float type are stored as inf
+    if dtype.kind != "f" or values.dtype.kind != "f" or dtype.itemsize >= values.dtype.itemsize:
+        return False
+    finite = values[np.isfinite(values)]
+    return finite.size > 0 and float(np.abs(finite).max()) > float(np.finfo(dtype).max)
+
+
+def _warn_overflow(output_file: Path, overflowed: set) -> None:
+    if overflowed:
+        logger.warning(
+            f"{output_file}: {', '.join(sorted(overflowed))} exceed the range of their storage type "
+            f"and were stored as inf, use a wider dtype"
+        )
+
+
+def _virtual_merge(fout: h5py.File, out_files: List[Path], output_file: Path, gprMax_version: str) -> None:
+    # the layout is taken from the first trace file; gprMax writes the same layout for every trace
+    with h5py.File(out_files[0], "r") as fin:
+        _copy_merged_attrs(fout, fin, gprMax_version)
+        iterations = int(fin.attrs["Iterations"])
+        datasets = [
+            (f"/rxs/rx{rx}", output, fin[f"/rxs/rx{rx}/{output}"].dtype)
+            for rx in range(1, fin.attrs["nrx"] + 1)
+            for output in fin[f"/rxs/rx{rx}"].keys()
+        ]
+
+    # sources next to the merged file are stored relative to it, so the folder can be moved
+    output_folder = Path(output_file).parent.resolve()
+    source_names = [os.path.relpath(out_file.resolve(), output_folder) for out_file in out_files]
+    for path, output, dtype in datasets:
+        layout = h5py.VirtualLayout(shape=(iterations, len(out_files)), dtype=dtype)
+        for column, source_name in enumerate(source_names):
+            layout[:, column] = h5py.VirtualSource(
+                source_name, f"{path}/{output}", shape=(iterations,), dtype=dtype
+            )
+        grp = fout.require_group(path)
+        grp.create_virtual_dataset(output, layout, fillvalue=np.nan if dtype.kind == "f" else None)
+    fout.attrs["virtual"] = True
+
+
+def _read_trace_file(out_file: Path) -> Dict[str, np.ndarray]:
+    with h5py.File(out_file, "r") as fin:
+        return {
+            f"/rxs/rx{rx}/{output}": dataset[()]
+            for rx in range(1, fin.attrs["nrx"] + 1)
+            for output, dataset in fin[f"/rxs/rx{rx}"].items()
+        }
+
+
+def _resolve_merge_workers(workers: Optional[int], n_files: int) -> int:
+    if workers is None:
+        if n_files < PARALLEL_MERGE_MIN_TRACES:
+            return 1
+        workers = min(MAX_MERGE_WORKERS, os.cpu_count() or 1)
+    if workers < 1:
+        raise ValueError("workers must be a positive integer")
+    return max(1, min(workers, n_files))
 
 
-    out_files = list(output_folder.glob("*.out"))
+def _resolve_merge_executor(executor: str) -> str:
+    if executor not in ("thread", "process"):
+        raise ValueError(f"Unknown merge executor {executor}, use thread or process")
+    return executor
+
+
+def _read_trace_files(out_files: List[Path], workers: int, executor: str) -> Iterator[Dict[str, np.ndarray]]:
+    """
+    Read trace files, in order, with at most 2 * workers files held in memory.
+    """
+    if workers == 1:
+        yield from map(_read_trace_file, out_files)
+        return
+
+    if executor == "thread":
+        pool = ThreadPoolExecutor(max_workers=workers)
+    else:
+        # the merged file is already open for writing, and forked children must not inherit
+        # an HDF5 writer handle, so the readers are spawned (and re-import __main__)
+        pool = ProcessPoolExecutor(max_workers=workers, mp_context=get_context("spawn"))
+    with pool:
+        remaining = iter(out_files)
+        window = deque(pool.submit(_read_trace_file, out_file) for out_file in islice(remaining, 2 * workers))
+        while window:
+            data = window.popleft().result()
+            next_file = next(remaining, None)
+            if next_file is not None:
+                window.append(pool.submit(_read_trace_file, next_file))
+            yield data
+
+
+def merge_model_files(output_folder: Path, output_file: Path, gprMax_version: str = None,
+                      dtype: Optional[str] = None, compression: Optional[str] = None,
+                      compression_opts: Optional[int] = None, shuffle: bool = False,
+                      virtual: bool = False, workers: Optional[int] = None, executor: str = "thread") -> None:
+    """
+    Merge the output files from a simulation run into a single file.
+
+    The merged datasets are chunked by trace and can be compressed and stored with a smaller float type.
+    One trace per chunk keeps writing a trace (including streamed and sharded merges, which write
+    traces as they complete) and reading an A-scan to a single chunk, at the cost of time-window
+    reads, which touch one chunk per trace and decompress whole traces.
+    With virtual=True no data is copied: the merged file holds HDF5 virtual datasets whose columns map to
+    the trace files, which must then be kept next to it (see materialize_merged_file).
+
+    Args:
+        output_folder (Path): The folder containing the output files.
+        output_file (Path): The path to the merged output file.
+        dtype (Optional[str]): Storage type of the merged datasets, e.g. "float32" or "float16". Defaults to the
+            type of the trace files. Values beyond the range of the type (65504 for float16, which near-source
+            fields often exceed) are stored as inf, and a warning names the affected datasets.
+        compression (Optional[str]): HDF5 compression filter, "gzip" or "lzf".
+        compression_opts (Optional[int]): Compression level of the gzip filter.
+        shuffle (bool): Whether to apply the HDF5 shuffle filter before compression.
+        virtual (bool): Whether to reference the trace files with virtual datasets instead of copying them.
+        workers (Optional[int]): Number of trace files read in parallel. By default large merges use up to
+            8 workers and small merges are read serially. The merged file is always written by this process,
+            in trace order.
+        executor (str): "thread" to read in threads of this process, or "process" to read in spawned
+            processes. h5py serializes its calls, so only processes read in parallel, but they re-import
+            the __main__ module: a script merging with executor="process" must guard its entry point with
+            if __name__ == "__main__".
+    """
+    gprMax_version = _resolve_gprmax_version(gprMax_version)
+    if virtual and (dtype is not None or compression is not None or shuffle):
+        raise ValueError("Storage options do not apply to virtual merges; set them when materializing")
+
+    out_files = _trace_output_files(output_folder, output_file)
     if len(out_files) == 0:
         raise ValueError(f"No output files found in {output_folder}")
-    out_files.sort(key=lambda x: int(re.search(r"\d+", x.stem).group()))
     model_runs = len(out_files)
 
     with h5py.File(output_file, "w") as fout:
-        for model in range(model_runs):
-            fin = h5py.File(out_files[model], "r")
-            nrx = fin.attrs["nrx"]
-
-            if model == 0:
-                fout.attrs["Title"] = fin.attrs["Title"]
-                fout.attrs["gprMax"] = gprMax_version
-                fout.attrs["Iterations"] = fin.attrs["Iterations"]
-                fout.attrs["dt"] = fin.attrs["dt"]
-                fout.attrs["nrx"] = fin.attrs["nrx"]
-                for rx in range(1, nrx + 1):
-                    path = f"/rxs/rx{rx}"
-                    grp = fout.create_group(path)
-                    availableoutputs = list(fin[path].keys())
-                    for output in availableoutputs:
-                        grp.create_dataset(
-                            output,
-                            (fout.attrs["Iterations"], model_runs),
-                            dtype=fin[path + "/" + output].dtype,
-                        )
+        if virtual:
+            _virtual_merge(fout, out_files, output_file, gprMax_version)
+            return
+        with h5py.File(out_files[0], "r") as fin:
+            _init_merged_file(fout, fin, model_runs, gprMax_version, dtype=dtype,
+                              compression=compression, compression_opts=compression_opts,
+                              shuffle=shuffle)
+        workers = _resolve_merge_workers(workers, model_runs)
+        traces = _read_trace_files(out_files, workers, _resolve_merge_executor(executor))
+        overflowed = set()
+        for model, trace in enumerate(tqdm(traces, total=model_runs, desc="Merging traces", disable=model_runs == 1)):
+            for path, values in trace.items():
+                if _overflows(values, fout[path].dtype):
+                    overflowed.add(path)
+                fout[path][:, model] = values
+    _warn_overflow(output_file, overflowed)
+
+
+def virtual_merged_sources(output_file: Path) -> List[Path]:
+    """
+    List the trace files referenced by a virtual merged output file.
 
-            for rx in range(1, nrx + 1):
-                path = f"/rxs/rx{rx}/"
-                availableoutputs = list(fin[path].keys())
-                for output in availableoutputs:
-                    fout[path + "/" + output][:, model] = fin[path + "/" + output][:]
+    Args:
+        output_file (Path): The merged output file.
+
+    Returns:
+        List[Path]: The referenced trace files, empty if the merged file holds its own data.
+    """
+    output_folder = Path(output_file).parent
+    sources = {}
+    with h5py.File(output_file, "r") as f:
+        if not f.attrs.get("virtual", False):
+            return []
+        for rx in range(1, f.attrs["nrx"] + 1):
+            for dataset in f[f"/rxs/rx{rx}"].values():
+                for source in dataset.virtual_sources():
+                    sources[source.file_name] = output_folder.joinpath(source.file_name)
+    return list(sources.values())
+
+
+def materialize_merged_file(output_file: Path, materialized_file: Optional[Path] = None,
+                            dtype: Optional[str] = None, compression: Optional[str] = None,
+                            compression_opts: Optional[int] = None, shuffle: bool = False) -> Path:
+    """
+    Copy the data of a virtual merged output file into a standalone file.
+
+    Args:
+        output_file (Path): The virtual merged output file.
+        materialized_file (Optional[Path]): The standalone file to write. Defaults to replacing output_file.
+        dtype (Optional[str]): Storage type of the materialized datasets.
+        compression (Optional[str]): HDF5 compression filter, "gzip" or "lzf".
+        compression_opts (Optional[int]): Compression level of the gzip filter.
+        shuffle (bool): Whether to apply the HDF5 shuffle filter before compression.
+
+    Returns:
+        Path: The standalone merged output file.
+    """
+    if dtype is not None and np.dtype(dtype).kind != "f":
+        raise ValueError(f"Merged outputs must be stored as floating point, got {dtype}")
+    output_file = Path(output_file)
+    target = Path(materialized_file) if materialized_file is not None else output_file
+    staging = target.with_name(f".{target.name}.tmp")
+    overflowed = set()
+    with h5py.File(output_file, "r") as fin, h5py.File(staging, "w") as fout:
+        for name, value in fin.attrs.items():
+            if name != "virtual":
+                fout.attrs[name] = value
+        for rx in range(1, fin.attrs["nrx"] + 1):
+            path = f"/rxs/rx{rx}"
+            grp = fout.create_group(path)
+            for output, dataset in fin[path].items():
+                iterations, model_runs = dataset.shape
+                fillvalue = np.nan if dataset.dtype.kind == "f" else None
+                materialized = grp.create_dataset(
+                    output,
+                    dataset.shape,
+                    dtype=np.dtype(dtype or dataset.dtype),
+                    chunks=(iterations, 1),
+                    compression=compression,
+                    compression_opts=compression_opts,
+                    shuffle=shuffle,
+                    fillvalue=fillvalue,
+                )
+                # copy blocks of traces to bound the memory used for large surveys
+                for start in range(0, model_runs, MATERIALIZE_BLOCK):
+                    stop = min(model_runs, start + MATERIALIZE_BLOCK)
+                    values = dataset[:, start:stop]
+                    if _overflows(values, materialized.dtype):
+                        overflowed.add(materialized.name)
+                    materialized[:, start:stop] = values
+    os.replace(staging, target)
+    _warn_overflow(target, overflowed)
+    return target
+
+
+def append_merged_traces(output_file: Path, trace_files: Dict[int, Path], model_runs: int,
+                         gprMax_version: str = None, dtype: Optional[str] = None,
+                         compression: Optional[str] = None, compression_opts: Optional[int] = None,
+                         shuffle: bool = False, workers: Optional[int] = None,
+                         executor: str = "thread") -> None:
+    """
+    Write per-trace output files into their columns of a merged output file.
+
+    The merged file is created from the first trace file when it does not exist yet. Columns that
+    were not written yet hold NaN, so the merged file can be read while traces are still being added.
+    The written columns are flagged in /merged_traces, and their count is kept in the traces_merged attribute.
 
-            fin.close()
+    Args:
+        output_file (Path): The path to the merged output file.
+        trace_files (Dict[int, Path]): Output file of each trace, keyed by zero-based column index.
+        model_runs (int): Total number of traces of the merged file.
+        dtype (Optional[str]): Storage type of the merged datasets, used when the file is created.
+        compression (Optional[str]): HDF5 compression filter, used when the file is created.
+        compression_opts (Optional[int]): Compression level of the gzip filter.
+        shuffle (bool): Whether to apply the HDF5 shuffle filter before compression.
+        workers (Optional[int]): Number of trace files read in parallel, as in merge_model_files.
+        executor (str): "thread" or "process", as in merge_model_files.
+    """
+    if not trace_files:
+        return
+    gprMax_version = _resolve_gprmax_version(gprMax_version)
+    columns = sorted(trace_files)
+    out_files = [trace_files[column] for column in columns]
+
+    with h5py.File(output_file, "a") as fout:
+        if "Iterations" not in fout.attrs:
+            with h5py.File(out_files[0], "r") as fin:
+                _init_merged_file(fout, fin, model_runs, gprMax_version, fillvalue=np.nan,
+                                  dtype=dtype, compression=compression,
+                                  compression_opts=compression_opts, shuffle=shuffle)
+        workers = _resolve_merge_workers(workers, len(out_files))
+        traces = _read_trace_files(out_files, workers, _resolve_merge_executor(executor))
+        overflowed = set()
+        for column, trace in zip(columns, traces):
+            for path, values in trace.items():
+                if _overflows(values, fout[path].dtype):
+                    overflowed.add(path)
+                fout[path][:, column] = values
+        # traces written again (e.g. on resume) are only counted once
+        merged = fout.require_dataset("merged_traces", (model_runs,), dtype=bool, fillvalue=False)
+        merged[columns] = True
+        fout.attrs["traces_merged"] = int(np.count_nonzero(merged[()]))
+    _warn_overflow(output_file, overflowed)
 
 
 def mpl_plot(filename: str, outputdata: np.ndarray, dt: float, rxnumber: int, rxcomponent: str) -> plt.Figure:
@@ -217,19 +600,16 @@ def plot_model(output_folder: Path, n_cols: int = 3) -> None:
     output_file = output_folder / "output_merged.out"
     if not output_file.exists():
         merge_model_files(output_folder, output_file)
-    f = h5py.File(output_file, "r")
-    nrx = f.attrs["nrx"]
-    f.close()
-    if nrx == 0:
-        raise Exception(f"No receivers found in {output_file}")
-
     rx_components = ["Ex", "Ey", "Ez", "Hx", "Hy", "Hz"]
-    for rx in range(1, nrx + 1):
+    # read every receiver and component at once instead of reopening the file for each plot
+    receivers = read_receivers(output_file, rx_components)
+    dt = receivers.dt
+    for rx in range(1, receivers.data.shape[0] + 1):
         nrows = math.ceil(len(rx_components) / n_cols)
         ncols = n_cols
         fig = plt.figure(figsize=(10, 10), facecolor="w", edgecolor="w")
         for i, rx_component in enumerate(rx_components):
-            outputdata, dt = get_output_data(output_file, rx, rx_component)
+            outputdata = receivers[rx, rx_component]
             try:
                 outputdata = stretch_arr(outputdata)
             except:
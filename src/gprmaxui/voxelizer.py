@@ -0,0 +1,238 @@
+from __future__ import annotations
+
+import logging
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import h5py
+import numpy as np
+import pyvista as pv
+
+from gprmaxui.commands import (
+    CommandParser,
+    DomainBox,
+    DomainCylinder,
+    DomainSphere,
+    GeometryArray,
+    GeometryObjectsRead,
+)
+from gprmaxui.utils import round_value
+
+logger = logging.getLogger(__name__)
+
+# gprMax always defines these materials before the ones of the model
+BUILTIN_MATERIALS = ["pec", "free_space"]
+BACKGROUND_MATERIAL = 1
+
+
+@dataclass
+class VoxelModel:
+    solid: np.ndarray
+    materials: List[str]
+    spacing: Tuple[float, float, float]
+
+    def to_image_data(self) -> pv.ImageData:
+        """
+        Build a PyVista image with the material index of each cell.
+
+        Returns:
+            pv.ImageData: Image with a "Material" cell array, laid out like gprMax geometry views.
+        """
+        nx, ny, nz = self.solid.shape
+        grid = pv.ImageData(
+            dimensions=(nx + 1, ny + 1, nz + 1), spacing=self.spacing, origin=(0, 0, 0)
+        )
+        grid.cell_data["Material"] = self.solid.ravel(order="F")
+        return grid
+
+
+def _index_range(start: float, stop: float, size: int) -> Tuple[int, int]:
+    return max(0, start), min(size, stop)
+
+
+def _cell_centres(start: int, stop: int, spacing: float) -> np.ndarray:
+    return (np.arange(start, stop) + 0.5) * spacing
+
+
+def _build_box(solid: np.ndarray, box: DomainBox, spacing, material_id: int) -> None:
+    dx, dy, dz = spacing
+    xs, xf = _index_range(round_value(box.x_min / dx), round_value(box.x_max / dx), solid.shape[0])
+    ys, yf = _index_range(round_value(box.y_min / dy), round_value(box.y_max / dy), solid.shape[1])
+    zs, zf = _index_range(round_value(box.z_min / dz), round_value(box.z_max / dz), solid.shape[2])
+    solid[xs:xf, ys:yf, zs:zf] = material_id
+
+
+def _build_sphere(solid: np.ndarray, sphere: DomainSphere, spacing, material_id: int) -> None:
+    dx, dy, dz = spacing
+    r = sphere.radius
+    # the centre is snapped to the grid and cells are tested at their centres
+    xc = round_value(sphere.cx / dx)
+    yc = round_value(sphere.cy / dy)
+    zc = round_value(sphere.cz / dz)
+    xs, xf = _index_range(round_value((xc * dx - r) / dx) - 1, round_value((xc * dx + r) / dx) + 1, solid.shape[0])
+    ys, yf = _index_range(round_value((yc * dy - r) / dy) - 1, round_value((yc * dy + r) / dy) + 1, solid.shape[1])
+    zs, zf = _index_range(round_value((zc * dz - r) / dz) - 1, round_value((zc * dz + r) / dz) + 1, solid.shape[2])
+    if xs >= xf or ys >= yf or zs >= zf:
+        return
+
+    x = _cell_centres(xs, xf, dx) - xc * dx
+    y = _cell_centres(ys, yf, dy) - yc * dy
+    z = _cell_centres(zs, zf, dz) - zc * dz
+    inside = (
+        x[:, None, None] ** 2 + y[None, :, None] ** 2 + z[None, None, :] ** 2
+    ) <= r**2
+    solid[xs:xf, ys:yf, zs:zf][inside] = material_id
+
+
+def _build_cylinder(solid: np.ndarray, cylinder: DomainCylinder, spacing, material_id: int) -> None:
+    dx, dy, dz = spacing
+    r = cylinder.radius
+    # the centres of the faces are snapped to the grid
+    f1 = np.array(
+        [
+            round_value(cylinder.cx_min / dx) * dx,
+            round_value(cylinder.cy_min / dy) * dy,
+            round_value(cylinder.cz_min / dz) * dz,
+        ]
+    )
+    f2 = np.array(
+        [
+            round_value(cylinder.cx_max / dx) * dx,
+            round_value(cylinder.cy_max / dy) * dy,
+            round_value(cylinder.cz_max / dz) * dz,
+        ]
+    )
+    bounds = []
+    for axis, d in enumerate(spacing):
+        low, high = sorted((f1[axis], f2[axis]))
+        bounds.append(
+            _index_range(
+                round_value((low - r) / d) - 1,
+                round_value((high + r) / d) + 1,
+                solid.shape[axis],
+            )
+        )
+    (xs, xf), (ys, yf), (zs, zf) = bounds
+    axis_vector = f2 - f1
+    length = np.sqrt((axis_vector**2).sum())
+    if length == 0 or xs >= xf or ys >= yf or zs >= zf:
+        return
+
+    x = _cell_centres(xs, xf, dx)[:, None, None] - f1[0]
+    y = _cell_centres(ys, yf, dy)[None, :, None] - f1[1]
+    z = _cell_centres(zs, zf, dz)[None, None, :] - f1[2]
+    direction = axis_vector / length
+    # projection of the cell centres on the axis and their distance to it
+    t = x * direction[0] + y * direction[1] + z * direction[2]
+    distance2 = x**2 + y**2 + z**2 - t**2
+    inside = (t >= 0) & (t <= length) & (distance2 <= r**2)
+    solid[xs:xf, ys:yf, zs:zf][inside] = material_id
+
+
+def _resolve_path(filename: str, base_folder: Path) -> Path:
+    path = Path(filename)
+    if not path.is_absolute():
+        path = base_folder.joinpath(path)
+    return path
+
+
+def _build_objects_read(
+    solid: np.ndarray,
+    geometry: GeometryObjectsRead,
+    spacing,
+    materials: List[str],
+    material_ids: Dict[str, int],
+    base_folder: Path,
+) -> None:
+    materials_file = _resolve_path(geometry.materials_filename, base_folder)
+    # gprMax tags the materials of the file with the file name to keep their ids unique
+    tag = materials_file.stem
+    first_id = len(materials)
+    for line in materials_file.read_text().splitlines():
+        if line.startswith("#material:"):
+            material = CommandParser.parse(line)
+            name = f"{material.id}{{{tag}}}"
+            material_ids[name] = len(materials)
+            materials.append(name)
+
+    with h5py.File(_resolve_path(geometry.filename, base_folder), "r") as f:
+        if not np.allclose(f.attrs["dx_dy_dz"], spacing):
+            raise ValueError(
+                f"Spatial resolution of {geometry.filename} does not match the model resolution"
+            )
+        data = f["/data"][:].astype(np.int32)
+
+    dx, dy, dz = spacing
+    origin = (
+        round_value(geometry.x / dx),
+        round_value(geometry.y / dy),
+        round_value(geometry.z / dz),
+    )
+    target = []
+    source = []
+    for start, n_cells, size in zip(origin, data.shape, solid.shape):
+        stop = min(size, start + n_cells)
+        begin = max(0, start)
+        if begin >= stop:
+            return
+        target.append(slice(begin, stop))
+        source.append(slice(begin - start, stop - start))
+    data = data[tuple(source)]
+    # -1 marks background cells that keep the existing material
+    build = data >= 0
+    solid[tuple(target)][build] = data[build] + first_id
+
+
+def voxelize(model, base_folder: Path = None) -> VoxelModel:
+    """
+    Rasterize the geometry of a model onto its grid without running gprMax.
+
+    Objects are built in the order they were added, later objects overwriting earlier ones, and
+    material indices follow gprMax: pec is 0, free_space (the background) is 1, and the materials
+    of the model follow in registration order.
+
+    Args:
+        model (GprMaxModel): The model to rasterize.
+        base_folder (Path): Folder that relative geometry_objects_read paths are relative to.
+            Defaults to the output folder of the model, where gprMax reads the input file from.
+
+    Returns:
+        VoxelModel: The material index of every cell and the material names.
+    """
+    spacing = (
+        model.domain_resolution.dx,
+        model.domain_resolution.dy,
+        model.domain_resolution.dz,
+    )
+    base_folder = Path(base_folder or model.output_folder)
+    solid = np.full(
+        model._compute_num_cells(), BACKGROUND_MATERIAL, dtype=np.uint32
+    )
+
+    materials = list(BUILTIN_MATERIALS)
+    for material in model.materials:
+        materials.append(material.id)
+    material_ids = {name: index for index, name in enumerate(materials)}
+
+    builders = {
+        DomainBox: _build_box,
+        DomainSphere: _build_sphere,
+        DomainCylinder: _build_cylinder,
+    }
+    for geometry in model.geometry:
+        if isinstance(geometry, GeometryObjectsRead):
+            _build_objects_read(
+                solid, geometry, spacing, materials, material_ids, base_folder
+            )
+            continue
+        objects = geometry if isinstance(geometry, GeometryArray) else [geometry]
+        for item in objects:
+            if item.material not in material_ids:
+                raise ValueError(f"Material {item.material} is not defined in the model")
+            builder = builders.get(type(item))
+            if builder is None:
+                raise NotImplementedError(f"{type(item).__name__} can not be voxelized")
+            builder(solid, item, spacing, material_ids[item.material])
+
+    return VoxelModel(solid=solid, materials=materials, spacing=spacing)
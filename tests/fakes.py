@@ -0,0 +1,80 @@
+import re
+import sys
+import types
+from pathlib import Path
+from unittest.mock import patch
+
+import h5py
+import numpy as np
+
+RX_COMPONENTS = ["Ex", "Ey", "Ez", "Hx", "Hy", "Hz"]
+
+
+def write_trace_file(
+    filename: Path, trace: int, iterations: int = 5, nrx: int = 1, dt: float = 1e-9
+) -> None:
+    with h5py.File(filename, "w") as f:
+        f.attrs["Title"] = "test"
+        f.attrs["Iterations"] = iterations
+        f.attrs["dt"] = dt
+        f.attrs["nrx"] = nrx
+        for rx in range(1, nrx + 1):
+            grp = f.create_group(f"/rxs/rx{rx}")
+            for i, component in enumerate(RX_COMPONENTS):
+                grp.create_dataset(
+                    component,
+                    data=trace_values(trace, iterations, rx=rx, component_idx=i),
+                )
+
+
+def trace_values(
+    trace: int, iterations: int, rx: int = 1, component_idx: int = 0
+) -> np.ndarray:
+    offset = trace * 100 + rx * 10 + component_idx
+    return (offset + np.arange(iterations)).astype(np.float32)
+
+
+def fake_gprmax(calls, write_outputs: bool = True):
+    """
+    Patch sys.modules with a fake gprMax whose api writes per-trace output files
+    named the way gprMax names them.
+    """
+    package = types.ModuleType("gprMax")
+    module = types.ModuleType("gprMax.gprMax")
+    version = types.ModuleType("gprMax._version")
+    version.__version__ = "fake"
+
+    def api(inputfile, *args, n=1, restart=None, geometry_only=False, **kwargs):
+        calls.append(
+            (
+                inputfile,
+                args,
+                {"n": n, "restart": restart, "geometry_only": geometry_only, **kwargs},
+            )
+        )
+        if not write_outputs:
+            return
+        input_path = Path(inputfile)
+        input_text = input_path.read_text()
+        iterations = int(float(re.search(r"#time_window: (\S+)", input_text).group(1)))
+        geometry_view = re.search(r"#geometry_view: .* (\S+) [nf]$", input_text, re.M)
+        start = restart or 1
+        for modelrun in range(start, start + n):
+            suffix = "" if n == 1 else str(modelrun)
+            if geometry_view:
+                input_path.parent.joinpath(
+                    f"{geometry_view.group(1)}{suffix}.vti"
+                ).write_text(f"geometry {modelrun}")
+            if geometry_only:
+                continue
+            write_trace_file(
+                input_path.parent.joinpath(f"{input_path.stem}{suffix}.out"),
+                modelrun,
+                iterations=iterations,
+            )
+
+    module.api = api
+    return patch.dict(
+        sys.modules,
+        {"gprMax": package, "gprMax.gprMax": module, "gprMax._version": version},
+    )
@@ -0,0 +1,70 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+from gprmaxui.catalog import RunCatalog, flatten_params
+from gprmaxui.commands import DomainSphere
+from tests.fakes import fake_gprmax
+from tests.test_parallel_execution import build_model
+
+
+def run_models(root: Path, permittivities, calls) -> None:
+    for index, permittivity in enumerate(permittivities):
+        model = build_model(root.joinpath(f"run_{index:03d}"))
+        model.materials[0].permittivity = permittivity
+        model.add_geometry(DomainSphere(cx=0.05, cy=0.02 + 0.02 * index, cz=0.0, radius=0.01, material="pec"))
+        model.run(n=2)
+
+
+class CatalogTests(unittest.TestCase):
+    def test_flattened_keys_keep_list_positions_in_the_item(self):
+        rows = list(flatten_params({"title": "a", "materials": [{"id": "sand", "permittivity": 3.0}]}))
+
+        self.assertEqual(
+            rows, [("title", "", "a"), ("materials.id", "0", "sand"), ("materials.permittivity", "0", 3.0)]
+        )
+
+    def test_runs_are_queried_by_parameters_and_open_lazily(self):
+        calls = []
+        with tempfile.TemporaryDirectory() as tmpdir, fake_gprmax(calls):
+            root = Path(tmpdir).joinpath("runs")
+            run_models(root, [2.0, 4.0, 6.0], calls)
+
+            with RunCatalog(Path(tmpdir).joinpath("catalog.sqlite")) as catalog:
+                self.assertEqual(catalog.scan(root), 3)
+                runs = catalog.query(
+                    {"materials.id": "sand", "materials.permittivity": (3, 5)},
+                    {"geometry.name": "sphere", "geometry.cy": (0.03, None)},
+                )
+                none = catalog.query({"materials.id": "sand", "geometry.cy": (0.03, None)})
+                by_run_field = catalog.query(n_traces=2, materials__permittivity=(None, 2.5))
+
+                self.assertEqual([run.folder.name for run in runs], ["run_001"])
+                self.assertEqual(none, [])
+                self.assertEqual([run.folder.name for run in by_run_field], ["run_000"])
+                self.assertEqual(runs[0].shapes["rx1/Ez"], [runs[0].iterations, 2])
+                self.assertFalse(runs[0].cached)
+                self.assertGreaterEqual(runs[0].elapsed, 0)
+                self.assertEqual(runs[0].model().materials[0].permittivity, 4.0)
+                with runs[0].result() as result:
+                    self.assertEqual(result.n_traces, 2)
+
+    def test_rescans_only_index_new_or_rerun_folders(self):
+        calls = []
+        with tempfile.TemporaryDirectory() as tmpdir, fake_gprmax(calls):
+            root = Path(tmpdir).joinpath("runs")
+            run_models(root, [2.0, 4.0], calls)
+            root.joinpath("unfinished").mkdir()
+            catalog = RunCatalog(Path(tmpdir).joinpath("catalog.sqlite"))
+
+            self.assertEqual(catalog.scan(root), 2)
+            self.assertEqual(catalog.scan(root), 0)
+            run_models(root, [2.0, 4.0, 8.0], calls)
+            self.assertEqual(catalog.scan(root), 3)
+            self.assertEqual(len(catalog), 3)
+            self.assertEqual(len(catalog.query({"materials.permittivity": 4.0})), 1)
+            catalog.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
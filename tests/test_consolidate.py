@@ -0,0 +1,114 @@
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+import h5py
+import numpy as np
+
+from gprmaxui import GprMaxModel, consolidate_runs
+from gprmaxui.commands import GeometryObjectsRead
+from gprmaxui.utils import merge_model_files
+from tests.fakes import trace_values
+from tests.test_merge import write_traces
+from tests.test_parallel_execution import build_model
+
+
+def write_versioned_traces(output_folder: Path, n_traces: int) -> None:
+    write_traces(output_folder, n_traces)
+    for trace_file in output_folder.glob("*.out"):
+        with h5py.File(trace_file, "a") as f:
+            f.attrs["gprMax"] = "fake"
+
+
+def write_runs(root: Path, n_runs: int, n_traces: int = 3) -> None:
+    for run in range(n_runs):
+        output_folder = root.joinpath(f"run_{run:03d}")
+        output_folder.mkdir(parents=True)
+        write_versioned_traces(output_folder, n_traces)
+        output_folder.joinpath("model.json").write_text(json.dumps({"title": f"run {run}"}))
+
+
+class ConsolidateTests(unittest.TestCase):
+    def test_runs_are_stacked_into_shards_with_their_models(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            root = Path(tmpdir).joinpath("runs")
+            write_runs(root, 5)
+
+            shards = consolidate_runs(
+                root, Path(tmpdir).joinpath("store"), runs_per_shard=2, components=["Ez"], workers=1
+            )
+
+            self.assertEqual([shard.name for shard in shards], ["shard_00000.h5", "shard_00001.h5", "shard_00002.h5"])
+            with h5py.File(shards[1], "r") as f:
+                self.assertEqual(list(f["rxs/rx1"]), ["Ez"])
+                self.assertEqual(f["rxs/rx1/Ez"].shape, (2, 5, 3))
+                self.assertEqual(f["rxs/rx1/Ez"].chunks, (1, 5, 3))
+                np.testing.assert_array_equal(f["runs/index"][()], [2, 3])
+                self.assertEqual(json.loads(f["runs/model"][1])["title"], "run 3")
+                np.testing.assert_array_equal(
+                    f["rxs/rx1/Ez"][0, :, 2], trace_values(3, 5, component_idx=2)
+                )
+            with h5py.File(shards[2], "r") as f:
+                self.assertEqual(f["rxs/rx1/Ez"].shape, (1, 5, 3))
+
+    def test_consolidation_resumes_missing_shards_only(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            root = Path(tmpdir).joinpath("runs")
+            write_runs(root, 4)
+            store = Path(tmpdir).joinpath("store")
+            shards = consolidate_runs(root, store, runs_per_shard=2, workers=1)
+            kept_mtime = shards[0].stat().st_mtime_ns
+            shards[1].unlink()
+
+            resumed = consolidate_runs(root, store, runs_per_shard=2, workers=1)
+
+            self.assertEqual(resumed, shards)
+            self.assertEqual(shards[0].stat().st_mtime_ns, kept_mtime)
+            self.assertTrue(shards[1].exists())
+            self.assertEqual(sorted(path.name for path in store.iterdir()), ["shard_00000.h5", "shard_00001.h5"])
+
+    def test_shards_of_re_merged_runs_are_rebuilt(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            root = Path(tmpdir).joinpath("runs")
+            write_runs(root, 4)
+            store = Path(tmpdir).joinpath("store")
+            shards = consolidate_runs(root, store, runs_per_shard=2, workers=1)
+            kept_mtime = shards[0].stat().st_mtime_ns
+
+            run_folder = root.joinpath("run_003")
+            for trace_file in run_folder.glob("sim*.out"):
+                with h5py.File(trace_file, "a") as f:
+                    f["rxs/rx1/Ez"][...] = -1.0
+            merge_model_files(run_folder, run_folder.joinpath("output_merged.out"), "fake")
+            consolidate_runs(root, store, runs_per_shard=2, workers=1)
+
+            self.assertEqual(shards[0].stat().st_mtime_ns, kept_mtime)
+            with h5py.File(shards[1], "r") as f:
+                self.assertTrue((f["rxs/rx1/Ez"][1] == -1.0).all())
+
+    def test_models_reading_geometry_objects_round_trip_through_json(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            model = build_model(Path(tmpdir))
+            model.add_geometry(
+                GeometryObjectsRead(x=0.01, y=0.02, z=0.0, filename="objects.h5", materials_filename="materials.txt")
+            )
+
+            restored = GprMaxModel.from_json(model.to_json())
+
+            self.assertIsInstance(restored.geometry[-1], GeometryObjectsRead)
+            self.assertEqual(restored.geometry[-1], model.geometry[-1])
+            self.assertIn("#geometry_objects_read: 0.01 0.02 0.0 objects.h5 materials.txt\n", str(restored))
+
+    def test_runs_with_another_layout_are_rejected(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            root = Path(tmpdir).joinpath("runs")
+            write_runs(root, 2)
+            write_versioned_traces(root.joinpath("run_001"), 4)
+
+            with self.assertRaises(ValueError):
+                consolidate_runs(root, Path(tmpdir).joinpath("store"), workers=1)
+
+
+if __name__ == "__main__":
+    unittest.main()
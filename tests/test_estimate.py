@@ -0,0 +1,60 @@
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from gprmaxui.estimate import BudgetExceededError, save_benchmark
+from tests.fakes import fake_gprmax
+from tests.test_parallel_execution import build_model
+
+
+class EstimateTests(unittest.TestCase):
+    def test_estimate_counts_outputs_written_by_run(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            model = build_model(Path(tmpdir))
+            estimate = model.estimate(
+                n=3, geometry=True, snapshots=True, snapshot_stride=2
+            )
+            no_geometry = model.estimate(n=3, snapshots=True)
+
+        self.assertEqual(estimate.num_cells, (10, 10, 1))
+        self.assertEqual(estimate.iterations, 5)
+        self.assertEqual(estimate.geometry_count, 3)
+        self.assertEqual(estimate.snapshot_count, 6)
+        self.assertEqual(no_geometry.snapshot_count, 0)
+        self.assertGreater(estimate.snapshot_bytes, 6 * 10 * 10 * 24)
+        self.assertGreater(estimate.disk_bytes, 2 * estimate.output_bytes)
+        self.assertGreater(estimate.memory_bytes, 0)
+
+    def test_runtime_is_calibrated_from_the_local_benchmark(self):
+        with tempfile.TemporaryDirectory() as tmpdir, patch.dict(
+            os.environ, {"GPRMAXUI_CACHE_DIR": tmpdir}
+        ):
+            model = build_model(Path(tmpdir).joinpath("output"))
+            self.assertFalse(model.estimate(n=2).calibrated)
+
+            save_benchmark(1000.0)
+            estimate = model.estimate(n=2)
+
+        self.assertTrue(estimate.calibrated)
+        self.assertAlmostEqual(estimate.runtime_seconds, 10 * 10 * 1 * 5 * 2 / 1000.0)
+
+    def test_run_refuses_jobs_over_budget(self):
+        calls = []
+        with tempfile.TemporaryDirectory() as tmpdir, fake_gprmax(calls):
+            output_folder = Path(tmpdir).joinpath("output")
+            model = build_model(output_folder)
+            with self.assertRaisesRegex(BudgetExceededError, "memory"):
+                model.run(n=2, max_memory=1024)
+            with self.assertRaisesRegex(BudgetExceededError, "disk"):
+                model.run(n=2, geometry=True, max_disk=1024)
+            self.assertFalse(output_folder.exists())
+
+            model.run(n=2, max_memory="auto", max_disk="auto")
+
+        self.assertEqual(len(calls), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
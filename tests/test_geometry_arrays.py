@@ -0,0 +1,65 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+
+from gprmaxui import GprMaxModel
+from gprmaxui.commands import BoxArray, DomainBox, DomainSphere, SphereArray
+from gprmaxui.voxelizer import voxelize
+from tests.test_parallel_execution import build_model
+
+
+class GeometryArrayTests(unittest.TestCase):
+    def test_arrays_render_like_single_object_commands(self):
+        rng = np.random.default_rng(0)
+        spheres = [
+            DomainSphere(cx=x, cy=y, cz=0, radius=r, material=m)
+            for x, y, r, m in zip(
+                rng.random(50), rng.random(50), rng.random(50) * 1e-3, ["sand", "pec"] * 25
+            )
+        ]
+        boxes = [
+            DomainBox(
+                x_min=0.01 * i, y_min=0.0, z_min=0.0,
+                x_max=0.01 * i + 0.005, y_max=0.02, z_max=0.01,
+                material="sand",
+            )
+            for i in range(5)
+        ]
+        sphere_array = SphereArray.from_commands(spheres)
+        box_array = BoxArray.from_commands(boxes)
+
+        self.assertEqual(len(sphere_array), 50)
+        self.assertEqual(sphere_array.materials, ["sand", "pec"])
+        self.assertEqual(str(sphere_array), "\n".join(map(str, spheres)))
+        self.assertEqual(str(box_array), "\n".join(map(str, boxes)))
+        self.assertEqual(list(box_array), boxes)
+
+    def test_scalar_columns_and_material_are_broadcast(self):
+        spheres = SphereArray(cx=[0.01, 0.02, 0.03], cy=0.05, cz=0.0, radius=0.004, material="pec")
+
+        np.testing.assert_array_equal(spheres.cy, [0.05, 0.05, 0.05])
+        np.testing.assert_array_equal(spheres.material_index, [0, 0, 0])
+        with self.assertRaises(ValueError):
+            SphereArray(cx=[0.01, 0.02], cy=[0.05], cz=0.0, radius=0.004, material="pec")
+
+    def test_model_round_trips_arrays_through_json(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            model = build_model(Path(tmpdir))
+            model.add_geometry(
+                SphereArray(cx=[0.02, 0.06], cy=0.04, cz=0.0, radius=0.01, material="pec")
+            )
+            restored = GprMaxModel.from_json(model.to_json())
+
+            self.assertIsInstance(restored.geometry[1], SphereArray)
+            self.assertEqual(str(restored.geometry[1]), str(model.geometry[1]))
+            self.assertIn("#sphere: 0.06 0.04 0.0 0.01 pec n\n", str(restored))
+            np.testing.assert_array_equal(
+                voxelize(restored).solid, voxelize(model).solid
+            )
+            self.assertEqual(voxelize(model).solid[2, 4, 0], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,48 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+from gprmaxui.commands import DomainSphere
+from tests.fakes import fake_gprmax
+from tests.test_parallel_execution import build_model
+
+
+class GeometryPreviewTests(unittest.TestCase):
+    def test_unchanged_geometry_reuses_the_cached_view(self):
+        calls = []
+        with tempfile.TemporaryDirectory() as tmpdir, fake_gprmax(calls):
+            model = build_model(Path(tmpdir))
+            first = model._geometry_preview_file()
+            second = model._geometry_preview_file()
+
+            self.assertEqual(first, second)
+            self.assertTrue(first.exists())
+            self.assertEqual(len(calls), 1)
+            self.assertTrue(calls[0][2]["geometry_only"])
+
+            # moving the source does not change the geometry
+            model.source.rx.x = 0.04
+            model._geometry_preview_file()
+            self.assertEqual(len(calls), 1)
+
+    def test_editing_an_object_invalidates_the_cached_view(self):
+        calls = []
+        with tempfile.TemporaryDirectory() as tmpdir, fake_gprmax(calls):
+            model = build_model(Path(tmpdir))
+            first = model._geometry_preview_file()
+
+            model.geometry[0].y_max = 0.07
+            second = model._geometry_preview_file()
+            model.add_geometry(
+                DomainSphere(cx=0.05, cy=0.04, cz=0.0, radius=0.01, material="sand")
+            )
+            third = model._geometry_preview_file()
+
+            self.assertEqual(len(calls), 3)
+            self.assertEqual(len({first, second, third}), 3)
+            self.assertFalse(first.exists())
+            self.assertEqual(list(third.parent.iterdir()), [third])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,51 @@
+import io
+import sys
+import tempfile
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import redirect_stdout
+from pathlib import Path
+
+from gprmaxui.commands import DomainSphere
+from tests.test_parallel_execution import build_model
+
+
+class InputRenderingTests(unittest.TestCase):
+    def test_commands_write_the_lines_they_print(self):
+        sphere = DomainSphere(cx=0.05, cy=0.04, cz=0.0, radius=0.01, material="sand")
+        printed = io.StringIO()
+        with redirect_stdout(printed):
+            sphere()
+        written = io.StringIO()
+        sphere(written)
+
+        self.assertEqual(written.getvalue(), printed.getvalue())
+        self.assertEqual(written.getvalue(), "#sphere: 0.05 0.04 0.0 0.01 sand n\n")
+
+    def test_models_render_concurrently_without_touching_stdout(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            models = []
+            for i in range(8):
+                model = build_model(Path(tmpdir).joinpath(str(i)))
+                model.add_geometry(
+                    *[
+                        DomainSphere(cx=0.01 * j, cy=0.04, cz=0.0, radius=0.001 * i, material="sand")
+                        for j in range(1, 200)
+                    ]
+                )
+                models.append(model)
+            expected = [str(model) for model in models]
+
+            stdout = sys.stdout
+            printed = io.StringIO()
+            with redirect_stdout(printed), ThreadPoolExecutor(max_workers=4) as executor:
+                rendered = list(executor.map(str, models * 4))
+
+            self.assertIs(sys.stdout, stdout)
+            self.assertEqual(printed.getvalue(), "")
+            self.assertEqual(rendered, expected * 4)
+            self.assertTrue(expected[0].startswith("#title: test\n"))
+
+
+if __name__ == "__main__":
+    unittest.main()
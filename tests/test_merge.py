@@ -0,0 +1,251 @@
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import textwrap
+import unittest
+from pathlib import Path
+
+import h5py
+import numpy as np
+
+from gprmaxui import ResultCache
+from gprmaxui.utils import (
+    get_output_data,
+    materialize_merged_file,
+    merge_model_files,
+    virtual_merged_sources,
+)
+from tests.fakes import fake_gprmax, trace_values, write_trace_file
+from tests.test_parallel_execution import build_model
+
+
+def write_traces(output_folder: Path, n_traces: int, iterations: int = 5) -> None:
+    for trace in range(1, n_traces + 1):
+        write_trace_file(output_folder.joinpath(f"sim{trace}.out"), trace, iterations)
+
+
+class MergeTests(unittest.TestCase):
+    def test_merged_datasets_are_chunked_by_trace(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            output_folder = Path(tmpdir)
+            write_traces(output_folder, 3)
+            output_file = output_folder.joinpath("output_merged.out")
+
+            merge_model_files(output_folder, output_file, "fake")
+            outputdata, _ = get_output_data(str(output_file), 1, "Hx")
+
+            with h5py.File(output_file, "r") as f:
+                dataset = f["/rxs/rx1/Ez"]
+                self.assertEqual(dataset.chunks, (5, 1))
+                self.assertIsNone(dataset.compression)
+                self.assertEqual(dataset.dtype, np.float32)
+            np.testing.assert_array_equal(outputdata[:, 2], trace_values(3, 5, component_idx=3))
+
+    def test_unnumbered_outputs_next_to_traces_are_ignored(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            output_folder = Path(tmpdir)
+            write_traces(output_folder, 2)
+            write_trace_file(output_folder.joinpath("sim.out"), 9, 5)
+            output_file = output_folder.joinpath("output_merged.out")
+
+            merge_model_files(output_folder, output_file, "fake")
+            outputdata, _ = get_output_data(str(output_file), 1, "Ez")
+
+            self.assertEqual(outputdata.shape, (5, 2))
+            np.testing.assert_array_equal(outputdata[:, 0], trace_values(1, 5, component_idx=2))
+
+    def test_merged_datasets_can_be_compressed_and_downcast(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            output_folder = Path(tmpdir)
+            write_traces(output_folder, 3)
+            output_file = output_folder.joinpath("output_merged.out")
+
+            merge_model_files(
+                output_folder, output_file, "fake",
+                dtype="float16", compression="gzip", compression_opts=4, shuffle=True,
+            )
+            outputdata, _ = get_output_data(str(output_file), 1, "Ey")
+
+            with h5py.File(output_file, "r") as f:
+                dataset = f["/rxs/rx1/Ey"]
+                self.assertEqual(dataset.compression, "gzip")
+                self.assertTrue(dataset.shuffle)
+                self.assertEqual(dataset.dtype, np.float16)
+            np.testing.assert_allclose(outputdata[:, 0], trace_values(1, 5, component_idx=1))
+            with self.assertRaises(ValueError):
+                merge_model_files(output_folder, output_file, "fake", dtype="int16")
+
+    def test_run_forwards_merge_options_to_streamed_merges(self):
+        calls = []
+        with tempfile.TemporaryDirectory() as tmpdir, fake_gprmax(calls):
+            output_folder = Path(tmpdir)
+            build_model(output_folder).run(
+                n=4, shards=2, shard_workers=1, merge_options={"compression": "lzf"}
+            )
+
+            with h5py.File(output_folder.joinpath("output_merged.out"), "r") as f:
+                self.assertEqual(f["/rxs/rx1/Ez"].compression, "lzf")
+                self.assertEqual(f["/rxs/rx1/Ez"].chunks, (5, 1))
+
+    def test_float16_overflow_is_reported(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            output_folder = Path(tmpdir)
+            write_traces(output_folder, 2)
+            with h5py.File(output_folder.joinpath("sim2.out"), "a") as f:
+                f["/rxs/rx1/Ez"][1] = 1e5
+            output_file = output_folder.joinpath("output_merged.out")
+
+            with self.assertLogs("gprmaxui.utils", level="WARNING") as logs:
+                merge_model_files(output_folder, output_file, "fake", dtype="float16")
+
+            self.assertIn("/rxs/rx1/Ez", logs.output[0])
+            self.assertNotIn("/rxs/rx1/Hz", logs.output[0])
+            outputdata, _ = get_output_data(str(output_file), 1, "Ez")
+            self.assertTrue(np.isinf(outputdata[1, 1]))
+
+    def test_invalid_merge_options_are_rejected_before_running(self):
+        calls = []
+        with tempfile.TemporaryDirectory() as tmpdir, fake_gprmax(calls):
+            model = build_model(Path(tmpdir))
+            for merge_options in (
+                {"compresion": "gzip"},
+                {"dtype": "int16"},
+                {"compression": "zstd"},
+                {"compression": "szip"},
+                {"virtual": True, "compression": "gzip"},
+            ):
+                with self.subTest(merge_options=merge_options):
+                    with self.assertRaises(ValueError):
+                        model.run(n=2, merge_options=merge_options)
+            self.assertEqual(calls, [])
+
+    def test_parallel_merges_keep_trace_order(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            output_folder = Path(tmpdir)
+            write_traces(output_folder, 12)
+            serial_file = output_folder.joinpath("serial.h5")
+            merge_model_files(output_folder, serial_file, "fake", workers=1)
+            expected, _ = get_output_data(str(serial_file), 1, "Hz")
+            serial_file.unlink()
+
+            for executor in ("thread", "process"):
+                output_file = output_folder.joinpath(f"merged_{executor}.h5")
+                merge_model_files(output_folder, output_file, "fake", workers=3, executor=executor)
+                outputdata, _ = get_output_data(str(output_file), 1, "Hz")
+                output_file.unlink()
+
+                np.testing.assert_array_equal(outputdata, expected)
+            np.testing.assert_array_equal(expected[:, 10], trace_values(11, 5, component_idx=5))
+            with self.assertRaises(ValueError):
+                merge_model_files(output_folder, output_file, "fake", workers=2, executor="mpi")
+
+    def test_default_merge_runs_from_scripts_without_a_main_guard(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            script = Path(tmpdir).joinpath("merge.py")
+            script.write_text(textwrap.dedent(f"""
+                from pathlib import Path
+                from gprmaxui.utils import merge_model_files
+                from tests.test_merge import write_traces
+
+                print("script body")
+                output_folder = Path({tmpdir!r})
+                write_traces(output_folder, 70)
+                merge_model_files(output_folder, output_folder.joinpath("output_merged.out"), "fake", workers=2)
+            """))
+            root = Path(__file__).resolve().parents[1]
+            env = dict(os.environ, PYTHONPATH=os.pathsep.join([str(root), str(root.joinpath("src"))]))
+
+            completed = subprocess.run(
+                [sys.executable, str(script)], cwd=tmpdir, env=env, capture_output=True, text=True, timeout=120
+            )
+
+            self.assertEqual(completed.returncode, 0, completed.stderr)
+            self.assertEqual(completed.stdout.count("script body"), 1)
+            outputdata, _ = get_output_data(str(Path(tmpdir).joinpath("output_merged.out")), 1, "Ez")
+            self.assertEqual(outputdata.shape, (5, 70))
+
+    def test_virtual_merge_maps_trace_files_without_copying(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            output_folder = Path(tmpdir).joinpath("survey")
+            output_folder.mkdir()
+            write_traces(output_folder, 3)
+            merge_model_files(
+                output_folder, output_folder.joinpath("output_merged.out"), "fake", virtual=True
+            )
+
+            # the trace files are referenced relative to the merged file
+            moved_folder = Path(tmpdir).joinpath("moved")
+            shutil.move(output_folder, moved_folder)
+            output_file = moved_folder.joinpath("output_merged.out")
+            outputdata, _ = get_output_data(str(output_file), 1, "Ez")
+
+            with h5py.File(output_file, "r") as f:
+                self.assertTrue(f["/rxs/rx1/Ez"].is_virtual)
+            self.assertEqual(
+                sorted(path.name for path in virtual_merged_sources(output_file)),
+                ["sim1.out", "sim2.out", "sim3.out"],
+            )
+            for trace in range(1, 4):
+                np.testing.assert_array_equal(
+                    outputdata[:, trace - 1], trace_values(trace, 5, component_idx=2)
+                )
+
+            materialize_merged_file(output_file, compression="gzip")
+            for trace_file in moved_folder.glob("sim*.out"):
+                trace_file.unlink()
+            materialized, _ = get_output_data(str(output_file), 1, "Ez")
+
+            with h5py.File(output_file, "r") as f:
+                self.assertFalse(f["/rxs/rx1/Ez"].is_virtual)
+                self.assertEqual(f["/rxs/rx1/Ez"].compression, "gzip")
+                self.assertNotIn("virtual", f.attrs)
+            np.testing.assert_array_equal(materialized, outputdata)
+
+    def test_cached_virtual_runs_keep_their_trace_files(self):
+        calls = []
+        with tempfile.TemporaryDirectory() as tmpdir, fake_gprmax(calls):
+            cache = ResultCache(Path(tmpdir).joinpath("cache"))
+            output_folder = Path(tmpdir).joinpath("run")
+            build_model(output_folder).run(
+                n=3, shards=2, shard_workers=1, cache=cache, merge_options={"virtual": True}
+            )
+            build_model(output_folder).run(
+                n=3, shards=2, shard_workers=1, cache=cache, merge_options={"virtual": True}
+            )
+            outputdata, _ = get_output_data(
+                str(output_folder.joinpath("output_merged.out")), 1, "Ez"
+            )
+
+            self.assertEqual(len(calls), 2)
+            self.assertFalse(np.isnan(outputdata).any())
+            np.testing.assert_array_equal(outputdata[:, 1], trace_values(2, 5, component_idx=2))
+
+    def test_windowed_reads_select_times_and_traces(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            output_folder = Path(tmpdir)
+            write_traces(output_folder, 9, iterations=8)
+            output_file = str(output_folder.joinpath("output_merged.out"))
+            merge_model_files(output_folder, output_file, "fake")
+            full, dt = get_output_data(output_file, 1, "Ez")
+
+            by_samples, _ = get_output_data(
+                output_file, 1, "Ez", time_range=(2, 6), trace_range=(1, None), trace_step=4
+            )
+            by_seconds, _ = get_output_data(output_file, 1, "Ez", time_range=(None, 3 * dt))
+            out = np.empty((4, 2), dtype=np.float64)
+            result, _ = get_output_data(
+                output_file, 1, "Ez", time_range=(2, 6), trace_range=(1, None), trace_step=4, out=out
+            )
+
+            np.testing.assert_array_equal(by_samples, full[2:6, 1::4])
+            np.testing.assert_array_equal(by_seconds, full[:3])
+            self.assertIs(result, out)
+            np.testing.assert_array_equal(out, full[2:6, 1::4])
+            with self.assertRaises(ValueError):
+                get_output_data(output_file, 1, "Ez", trace_step=2, out=np.empty((8, 9)))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,120 @@
+import os
+import tempfile
+import unittest
+from pathlib import Path
+
+import h5py
+import numpy as np
+
+from gprmaxui import ModelResult
+from gprmaxui.utils import merge_model_files
+from tests.fakes import trace_values, write_trace_file
+from tests.test_parallel_execution import build_model
+
+
+class ModelResultTests(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.output_folder = Path(self.tmpdir.name)
+        for trace in range(1, 5):
+            write_trace_file(self.output_folder.joinpath(f"sim{trace}.out"), trace, iterations=6, nrx=2)
+        merge_model_files(
+            self.output_folder, self.output_folder.joinpath("output_merged.out"), "fake"
+        )
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_slicing_reads_the_requested_hyperslab(self):
+        with build_model(self.output_folder).result() as result:
+            component = result.rx(2)["Ez"]
+            window = component[1:4, 2:4]
+
+            self.assertIsInstance(result, ModelResult)
+            self.assertEqual((result.nrx, result.iterations, result.n_traces), (2, 6, 4))
+            self.assertEqual(component.shape, (6, 4))
+            self.assertEqual(list(result.rx(1)), ["Ex", "Ey", "Ez", "Hx", "Hy", "Hz"])
+            np.testing.assert_array_equal(
+                window[:, 0], trace_values(3, 6, rx=2, component_idx=2)[1:4]
+            )
+            np.testing.assert_array_equal(
+                np.asarray(component)[:, 3], trace_values(4, 6, rx=2, component_idx=2)
+            )
+            with self.assertRaises(KeyError):
+                result.rx(3)
+
+    def test_data_returns_arrays_and_closes_the_file(self):
+        data = build_model(self.output_folder).data(rx=1)
+
+        self.assertEqual(list(data), ["Ex", "Ey", "Ez", "Hx", "Hy", "Hz"])
+        outputdata, dt = data["Hy"]
+        self.assertIsInstance(outputdata, np.ndarray)
+        self.assertEqual(dt, 1e-9)
+        np.testing.assert_array_equal(outputdata[:, 0], trace_values(1, 6, component_idx=4))
+        # no handle is left open, so the merged file can be rewritten
+        with h5py.File(self.output_folder.joinpath("output_merged.out"), "r+"):
+            pass
+
+    def test_sidecar_copies_are_memory_mapped_and_refreshed(self):
+        model = build_model(self.output_folder)
+        outputdata, _ = model.data(rx=1, sidecar=True)["Ez"]
+        sidecar_file = self.output_folder.joinpath("output_merged_npy", "rx1_Ez.npy")
+        written = sidecar_file.stat().st_mtime_ns
+
+        self.assertIsInstance(outputdata, np.memmap)
+        self.assertFalse(outputdata.flags.writeable)
+        np.testing.assert_array_equal(outputdata[:, 1], trace_values(2, 6, component_idx=2))
+
+        model.data(rx=1, sidecar=True)["Ez"]
+        self.assertEqual(sidecar_file.stat().st_mtime_ns, written)
+
+        # a new merged file invalidates the copies
+        write_trace_file(self.output_folder.joinpath("sim5.out"), 5, iterations=6, nrx=2)
+        merge_model_files(
+            self.output_folder, self.output_folder.joinpath("output_merged.out"), "fake"
+        )
+        os.utime(self.output_folder.joinpath("output_merged.out"), ns=(written + 10**9,) * 2)
+        outputdata, _ = model.data(rx=1, sidecar=True)["Ez"]
+
+        self.assertEqual(outputdata.shape, (6, 5))
+        np.testing.assert_array_equal(outputdata[:, 4], trace_values(5, 6, component_idx=2))
+
+    def test_refreshed_sidecar_copies_keep_open_maps_readable(self):
+        model = build_model(self.output_folder)
+        old_ez, _ = model.data(rx=1, sidecar=True)["Ez"]
+        sidecar_folder = self.output_folder.joinpath("output_merged_npy")
+        written = sidecar_folder.joinpath("rx1_Ez.npy").stat().st_mtime_ns
+
+        write_trace_file(self.output_folder.joinpath("sim5.out"), 5, iterations=6, nrx=2)
+        merge_model_files(
+            self.output_folder, self.output_folder.joinpath("output_merged.out"), "fake"
+        )
+        os.utime(self.output_folder.joinpath("output_merged.out"), ns=(written + 10**9,) * 2)
+        new_ez, _ = model.data(rx=1, sidecar=True)["Ez"]
+
+        # the stale copies of the other components are left for their next read to replace
+        self.assertTrue(sidecar_folder.joinpath("rx1_Hx.npy").exists())
+        self.assertEqual(old_ez.shape, (6, 4))
+        np.testing.assert_array_equal(old_ez[:, 1], trace_values(2, 6, component_idx=2))
+        self.assertEqual(new_ez.shape, (6, 5))
+        self.assertEqual(list(sidecar_folder.glob("tmp*")), [])
+
+    def test_all_receivers_are_read_into_one_array(self):
+        stacked = build_model(self.output_folder).data_array(["Ez", "Hx"], dtype="float64")
+        out = np.zeros((2, 6, 6, 4), dtype=np.float32)
+        with ModelResult(self.output_folder.joinpath("output_merged.out")) as result:
+            everything = result.read_all(out=out)
+
+        self.assertEqual(stacked.data.shape, (2, 2, 6, 4))
+        self.assertEqual(stacked.data.dtype, np.float64)
+        self.assertEqual((stacked.dt, stacked.attrs["nrx"]), (1e-9, 2))
+        np.testing.assert_array_equal(
+            stacked[2, "Hx"][:, 1], trace_values(2, 6, rx=2, component_idx=3)
+        )
+        self.assertIs(everything.data, out)
+        self.assertEqual(everything.components, ["Ex", "Ey", "Ez", "Hx", "Hy", "Hz"])
+        np.testing.assert_array_equal(everything.data[:, [2, 3]], stacked.data)
+
+
+if __name__ == "__main__":
+    unittest.main()
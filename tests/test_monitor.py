@@ -0,0 +1,45 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+import h5py
+import numpy as np
+
+from tests.fakes import trace_values, write_trace_file
+from tests.test_parallel_execution import build_model
+
+
+class MonitorTests(unittest.TestCase):
+    def test_bscan_grows_as_traces_complete(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            output_folder = Path(tmpdir)
+            monitor = build_model(output_folder).monitor(n=4, component="Hx")
+
+            self.assertEqual(monitor.poll(), [])
+            self.assertTrue(np.isnan(monitor.bscan).all())
+            write_trace_file(output_folder.joinpath("sim2.out"), 2)
+            write_trace_file(output_folder.joinpath("sim3.out"), 3)
+            # a trace still being written has fewer iterations than the model
+            with h5py.File(output_folder.joinpath("sim1.out"), "w") as f:
+                f.attrs.update({"Iterations": 5, "dt": 1e-9, "nrx": 1})
+                f.create_dataset("/rxs/rx1/Hx", data=np.zeros(2))
+
+            self.assertEqual(monitor.poll(), [2, 3])
+            self.assertEqual(monitor.poll(), [])
+            self.assertEqual(monitor.bscan.shape, (5, 4))
+            self.assertTrue(np.isnan(monitor.bscan[:, [0, 3]]).all())
+            np.testing.assert_array_equal(monitor.bscan[:, 1], trace_values(2, 5, component_idx=3))
+            self.assertEqual(monitor.progress, 0.5)
+
+            write_trace_file(output_folder.joinpath("sim1.out"), 1)
+            write_trace_file(output_folder.joinpath("sim4.out"), 4)
+            polls = list(monitor.follow(interval=0, timeout=1))
+
+            self.assertEqual(polls, [[1, 4]])
+            self.assertTrue(monitor.done)
+            self.assertEqual(monitor.dt, 1e-9)
+            self.assertFalse(np.isnan(monitor.bscan).any())
+
+
+if __name__ == "__main__":
+    unittest.main()
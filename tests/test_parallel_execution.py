@@ -1,7 +1,10 @@
 import sys
 import tempfile
+import time
 import types
 import unittest
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
 from pathlib import Path
 from unittest.mock import patch
 
@@ -113,6 +116,18 @@ def fake_render_video_frame(task):
     return task.frame_index, task.frame_path
 
 
+def raw_render_video_frame(task):
+    return task.frame_index, np.full((2, 3, 3), task.frame_index, dtype=np.uint8)
+
+
+def fill_frame_slot(task):
+    frame_index, (name, offset, size) = task
+    memory = shared_memory.SharedMemory(name=name)
+    np.ndarray((size,), dtype=np.uint8, buffer=memory.buf, offset=offset)[:] = frame_index
+    memory.close()
+    return frame_index, (size,)
+
+
 class ParallelExecutionTests(unittest.TestCase):
     def test_snapshot_stride_emits_only_requested_snapshots(self):
         calls = []
@@ -233,6 +248,56 @@ class ParallelExecutionTests(unittest.TestCase):
 
             self.assertEqual(list(temp_parent.iterdir()), [])
 
+    def test_save_video_streams_raw_frames_without_temp_files(self):
+        FakeVideoWriter.instances = []
+        with tempfile.TemporaryDirectory() as tmpdir:
+            output_folder = Path(tmpdir).joinpath("output")
+            output_folder.mkdir()
+            prepare_video_inputs(output_folder, n_traces=2, n_iterations=2)
+            model = build_model(output_folder)
+            model.data = lambda rx=1: {
+                "Ez": (np.arange(4, dtype=np.float32).reshape(2, 2), 1e-9)
+            }
+            written = []
+
+            def raw_renderer(task):
+                written.append(sorted(path.name for path in Path(task.frame_path).parent.iterdir()))
+                self.assertFalse(task.save_frame)
+                return raw_render_video_frame(task)
+
+            with (
+                patch.object(gprmax_model, "_render_video_frame", side_effect=raw_renderer),
+                patch.object(gprmax_model.cv2, "VideoWriter", FakeVideoWriter),
+                patch.object(gprmax_model.cv2, "VideoWriter_fourcc", return_value=0),
+            ):
+                model.save_video(
+                    output_folder.joinpath("test.mp4"), frame_step=1, workers=1
+                )
+
+            self.assertEqual(FakeVideoWriter.instances[0].frames, [0, 1, 2, 3])
+            self.assertEqual(FakeVideoWriter.instances[0].cap_size, (3, 2))
+            self.assertEqual(written, [["outputdata.npy"]] * 4)
+
+    def test_frame_ring_slots_are_reused_only_after_being_read(self):
+        ring = gprmax_model._FrameRing(2, (2, 2, 1))
+        try:
+            with ProcessPoolExecutor(max_workers=2) as executor:
+                frames = []
+                for frame_index, shape in gprmax_model._submit_in_order(
+                    executor,
+                    fill_frame_slot,
+                    list(range(7)),
+                    2,
+                    lambda frame_index: (frame_index, ring.slot(frame_index)),
+                ):
+                    frames.append(ring.frame(frame_index, shape).copy())
+                    time.sleep(0.01)
+        finally:
+            ring.close()
+
+        self.assertEqual([int(frame[0]) for frame in frames], list(range(7)))
+        self.assertTrue(all((frame == frame[0]).all() for frame in frames))
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,60 @@
+import re
+import unittest
+
+import numpy as np
+
+from gprmaxui import place_targets
+from gprmaxui.commands import DomainBox, SphereArray
+
+
+def cluster_box(material="sand") -> DomainBox:
+    return DomainBox(
+        x_min=0.0, y_min=0.0, z_min=0.0, x_max=0.1, y_max=0.1, z_max=0.002, material=material
+    )
+
+
+class PlacementTests(unittest.TestCase):
+    def test_targets_respect_spacing_and_bounds(self):
+        targets = place_targets(200, cluster_box(), min_spacing=0.004, radius=(0.001, 0.002), seed=3)
+        centres = np.stack([targets.cx, targets.cy, targets.cz], axis=1)
+        distances = np.linalg.norm(centres[:, None] - centres[None], axis=-1)
+        np.fill_diagonal(distances, np.inf)
+
+        self.assertIsInstance(targets, SphereArray)
+        self.assertEqual(len(targets), 200)
+        self.assertEqual(targets.materials, ["sand"])
+        self.assertGreaterEqual(distances.min(), 0.004)
+        self.assertTrue(((centres >= 0) & (centres <= [0.1, 0.1, 0.002])).all())
+        self.assertTrue(((targets.radius >= 0.001) & (targets.radius <= 0.002)).all())
+
+    def test_large_targets_do_not_overlap(self):
+        targets = place_targets(20, cluster_box(), min_spacing=0.001, radius=(0.004, 0.008), seed=5)
+        centres = np.stack([targets.cx, targets.cy, targets.cz], axis=1)
+        distances = np.linalg.norm(centres[:, None] - centres[None], axis=-1)
+        np.fill_diagonal(distances, np.inf)
+
+        self.assertTrue((distances >= targets.radius[:, None] + targets.radius[None]).all())
+
+    def test_same_seed_gives_the_same_scene(self):
+        first = place_targets(50, cluster_box(), 0.005, 0.001, material="pec", seed=7)
+        second = place_targets(50, cluster_box(), 0.005, 0.001, material="pec", seed=7)
+
+        self.assertEqual(str(first), str(second))
+
+    def test_infeasible_requests_fail_fast(self):
+        with self.assertRaises(ValueError):
+            place_targets(1000, cluster_box(), min_spacing=0.02, radius=0.001)
+        with self.assertRaises(RuntimeError):
+            place_targets(30, cluster_box(), min_spacing=0.02, radius=0.001, max_attempts=2000)
+        with self.assertRaises(RuntimeError) as raised:
+            place_targets(
+                30, cluster_box(), min_spacing=0.02, radius=0.001, max_attempts=10**7, max_rejections=500
+            )
+        attempts = int(re.search(r"after (\d+) attempts", str(raised.exception)).group(1))
+        self.assertLess(attempts, 2000)
+        with self.assertRaises(ValueError):
+            place_targets(200, cluster_box(), min_spacing=0.001, radius=0.01)
+
+
+if __name__ == "__main__":
+    unittest.main()
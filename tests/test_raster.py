@@ -0,0 +1,94 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+import pyvista as pv
+
+from gprmaxui.raster import RX_COLOR, TX_COLOR, SnapshotRasterizer, read_vti
+
+
+def write_gprmax_snapshot(filename, field, spacing=0.01):
+    # same layout as the snapshots gprMax writes: raw appended data with a UInt32 size header
+    nz, ny, nx = field.shape[:3]
+    e_field = np.zeros_like(field, dtype=np.float32)
+    h_field = np.ascontiguousarray(field, dtype=np.float32)
+    header = (
+        f'<?xml version="1.0"?>\n'
+        f'<VTKFile type="ImageData" version="1.0" byte_order="LittleEndian">\n'
+        f'<ImageData WholeExtent="0 {nx} 0 {ny} 0 {nz}" Origin="0 0 0" Spacing="{spacing} {spacing} {spacing}">\n'
+        f'<Piece Extent="0 {nx} 0 {ny} 0 {nz}">\n'
+        f'<CellData Vectors="E-field H-field">\n'
+        f'<DataArray type="Float32" Name="E-field" NumberOfComponents="3" format="appended" offset="0" />\n'
+        f'<DataArray type="Float32" Name="H-field" NumberOfComponents="3" format="appended" offset="{4 + e_field.nbytes}" />\n'
+        f'</CellData>\n</Piece>\n</ImageData>\n<AppendedData encoding="raw">\n_'
+    )
+    with open(filename, "wb") as f:
+        f.write(header.encode())
+        for array in (e_field, h_field):
+            f.write(np.uint32(array.nbytes).tobytes())
+            f.write(array.tobytes())
+        f.write(b"\n</AppendedData>\n</VTKFile>")
+
+
+class ReadVtiTests(unittest.TestCase):
+    def test_reads_raw_appended_snapshots(self):
+        field = np.random.default_rng(0).normal(size=(1, 4, 6, 3)).astype(np.float32)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            snapshot_file = Path(tmp_dir).joinpath("snapshot1.vti")
+            write_gprmax_snapshot(snapshot_file, field)
+
+            image = read_vti(snapshot_file)
+
+        self.assertEqual(image.cells, (6, 4, 1))
+        self.assertEqual(image.spacing, (0.01, 0.01, 0.01))
+        np.testing.assert_array_equal(image.cell_array("H-field"), field)
+        np.testing.assert_array_equal(image.cell_array("E-field"), np.zeros_like(field))
+
+    def test_matches_pyvista_on_compressed_files(self):
+        grid = pv.ImageData(dimensions=(6, 5, 3), spacing=(0.1, 0.2, 0.3), origin=(1, 2, 3))
+        grid.cell_data["Material"] = np.arange(grid.n_cells, dtype=np.int32)
+        grid.point_data["H-field"] = np.random.default_rng(1).normal(size=(grid.n_points, 3))
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            geometry_file = Path(tmp_dir).joinpath("geometry.vti")
+            grid.save(geometry_file)
+
+            image = read_vti(geometry_file)
+
+        self.assertEqual(image.origin, (1.0, 2.0, 3.0))
+        self.assertEqual(image.cells, (5, 4, 2))
+        np.testing.assert_array_equal(image.cell_data["Material"], grid.cell_data["Material"])
+        np.testing.assert_array_equal(image.point_data["H-field"], grid.point_data["H-field"])
+
+
+class SnapshotRasterizerTests(unittest.TestCase):
+    def test_draws_field_and_markers_with_y_up(self):
+        field = np.zeros((1, 10, 20, 3), dtype=np.float32)
+        field[0, :5, :, 0] = 1.0
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            snapshot_file = Path(tmp_dir).joinpath("snapshot1.vti")
+            write_gprmax_snapshot(snapshot_file, field)
+
+            image = SnapshotRasterizer("gray").render(
+                snapshot_file, None, tx=(0.03, 0.08), rx=(0.15, 0.08), size=0.02
+            )
+
+        self.assertEqual(image.shape, (10, 20, 3))
+        self.assertEqual(image.dtype, np.uint8)
+        # the lower half of the model is at the bottom of the image
+        self.assertTrue((image[6:, 5:12] == 255).all())
+        self.assertTrue((image[:5, 5:12] == 0).all())
+        np.testing.assert_array_equal(image[1:3, 2:4], np.full((2, 2, 3), TX_COLOR))
+        np.testing.assert_array_equal(image[1:3, 14:16], np.full((2, 2, 3), RX_COLOR))
+
+    def test_rejects_3d_models(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            snapshot_file = Path(tmp_dir).joinpath("snapshot1.vti")
+            write_gprmax_snapshot(snapshot_file, np.ones((2, 3, 3, 3)))
+
+            with self.assertRaises(ValueError):
+                SnapshotRasterizer().render(snapshot_file, None, (0, 0), (0, 0), 0.01)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,106 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+
+from gprmaxui import ResultCache
+from gprmaxui.commands import GeometryObjectsRead
+from gprmaxui.utils import get_output_data
+from tests.fakes import fake_gprmax
+from tests.test_parallel_execution import build_model
+
+
+class ResultCacheTests(unittest.TestCase):
+    def test_identical_run_is_restored_from_cache(self):
+        calls = []
+        with tempfile.TemporaryDirectory() as tmpdir, fake_gprmax(calls):
+            cache = ResultCache(Path(tmpdir).joinpath("cache"))
+            output_folder = Path(tmpdir).joinpath("output")
+            build_model(output_folder).run(n=3, geometry=True, cache=cache)
+            first, _ = get_output_data(
+                str(output_folder.joinpath("output_merged.out")), 1, "Ez"
+            )
+
+            build_model(output_folder).run(n=3, geometry=True, cache=cache)
+            second, _ = get_output_data(
+                str(output_folder.joinpath("output_merged.out")), 1, "Ez"
+            )
+
+            self.assertEqual(len(calls), 1)
+            np.testing.assert_array_equal(first, second)
+            self.assertTrue(output_folder.joinpath("geometry1.vti").exists())
+            self.assertTrue(output_folder.joinpath("sim.in").exists())
+
+    def test_changed_inputs_miss_the_cache(self):
+        calls = []
+        with tempfile.TemporaryDirectory() as tmpdir, fake_gprmax(calls):
+            cache = ResultCache(Path(tmpdir).joinpath("cache"))
+            output_folder = Path(tmpdir).joinpath("output")
+            build_model(output_folder).run(n=2, cache=cache)
+            build_model(output_folder).run(n=3, cache=cache)
+
+            model = build_model(output_folder)
+            model.materials[0].permittivity = 4.0
+            model.run(n=3, cache=cache)
+
+            self.assertEqual(len(calls), 3)
+            self.assertEqual(len(cache.entries()), 3)
+
+    def test_changed_geometry_files_miss_the_cache(self):
+        calls = []
+        with tempfile.TemporaryDirectory() as tmpdir, fake_gprmax(calls):
+            cache = ResultCache(Path(tmpdir).joinpath("cache"))
+            output_folder = Path(tmpdir).joinpath("output")
+            objects_file = Path(tmpdir).joinpath("objects.h5")
+            materials_file = Path(tmpdir).joinpath("materials.txt")
+
+            def run_reading_objects():
+                model = build_model(output_folder)
+                model.add_geometry(
+                    GeometryObjectsRead(
+                        x=0.0, y=0.0, z=0.0, filename=str(objects_file), materials_filename=str(materials_file)
+                    )
+                )
+                model.run(n=2, cache=cache)
+
+            objects_file.write_bytes(b"first")
+            materials_file.write_text("#material: 4 0 1 0 rock")
+            run_reading_objects()
+            run_reading_objects()
+            objects_file.write_bytes(b"other")
+            run_reading_objects()
+
+            self.assertEqual(len(calls), 2)
+            self.assertEqual(len(cache.entries()), 2)
+
+    def test_least_recently_used_entries_are_evicted(self):
+        def titled_model(output_folder, title):
+            model = build_model(output_folder)
+            model.title.title = title
+            return model
+
+        calls = []
+        with tempfile.TemporaryDirectory() as tmpdir, fake_gprmax(calls):
+            output_folder = Path(tmpdir).joinpath("output")
+            cache = ResultCache(Path(tmpdir).joinpath("cache"))
+            titled_model(output_folder, "first").run(n=2, cache=cache)
+            first_entry = cache.entries()[0][0]
+            cache.max_size = cache.size() * 2
+
+            titled_model(output_folder, "second").run(n=2, cache=cache)
+            second_entry = cache.entries()[-1][0]
+
+            # a cache hit marks the first entry as recently used
+            titled_model(output_folder, "first").run(n=2, cache=cache)
+            titled_model(output_folder, "third").run(n=2, cache=cache)
+
+            entries = [entry for entry, _, _ in cache.entries()]
+            self.assertEqual(len(calls), 3)
+            self.assertLessEqual(cache.size(), cache.max_size)
+            self.assertIn(first_entry, entries)
+            self.assertNotIn(second_entry, entries)
+
+
+if __name__ == "__main__":
+    unittest.main()
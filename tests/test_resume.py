@@ -0,0 +1,71 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+import h5py
+import numpy as np
+
+from gprmaxui.utils import get_output_data, is_complete_output_file
+from tests.fakes import fake_gprmax, trace_values
+from tests.test_parallel_execution import build_model
+
+
+class ResumeTests(unittest.TestCase):
+    def test_resume_only_simulates_missing_and_incomplete_traces(self):
+        calls = []
+        with tempfile.TemporaryDirectory() as tmpdir, fake_gprmax(calls):
+            output_folder = Path(tmpdir)
+            build_model(output_folder).run(n=4)
+            output_folder.joinpath("sim2.out").unlink()
+            with h5py.File(output_folder.joinpath("sim4.out"), "r+") as f:
+                del f["/rxs/rx1/Ez"]
+                f["/rxs/rx1"].create_dataset("Ez", data=np.zeros(2, np.float32))
+            self.assertFalse(is_complete_output_file(output_folder.joinpath("sim4.out")))
+
+            calls.clear()
+            build_model(output_folder).run(n=4, resume=True)
+            outputdata, _ = get_output_data(
+                str(output_folder.joinpath("output_merged.out")), 1, "Ez"
+            )
+
+            self.assertEqual(
+                [(kwargs["restart"], kwargs["n"]) for _, _, kwargs in calls],
+                [(2, 1), (4, 1)],
+            )
+            self.assertFalse(output_folder.joinpath("sim.out").exists())
+            for trace in range(1, 5):
+                np.testing.assert_array_equal(
+                    outputdata[:, trace - 1], trace_values(trace, 5, component_idx=2)
+                )
+
+    def test_resume_of_a_finished_run_does_not_call_gprmax(self):
+        calls = []
+        with tempfile.TemporaryDirectory() as tmpdir, fake_gprmax(calls):
+            output_folder = Path(tmpdir)
+            build_model(output_folder).run(n=3)
+            output_folder.joinpath("output_merged.out").unlink()
+
+            calls.clear()
+            build_model(output_folder).run(n=3, resume=True)
+
+            self.assertEqual(calls, [])
+            self.assertTrue(output_folder.joinpath("output_merged.out").exists())
+
+    def test_resume_drops_traces_of_a_larger_run(self):
+        calls = []
+        with tempfile.TemporaryDirectory() as tmpdir, fake_gprmax(calls):
+            output_folder = Path(tmpdir)
+            build_model(output_folder).run(n=4)
+
+            build_model(output_folder).run(n=2, resume=True)
+            outputdata, _ = get_output_data(
+                str(output_folder.joinpath("output_merged.out")), 1, "Ez"
+            )
+
+            self.assertEqual(outputdata.shape[1], 2)
+            self.assertFalse(output_folder.joinpath("sim3.out").exists())
+            self.assertFalse(output_folder.joinpath("sim4.out").exists())
+
+
+if __name__ == "__main__":
+    unittest.main()
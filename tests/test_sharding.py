@@ -0,0 +1,100 @@
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+import h5py
+import numpy as np
+
+import gprmaxui.gprmax_model as gprmax_model
+from gprmaxui.gprmax_model import _resolve_worker_layout
+from gprmaxui.utils import append_merged_traces, get_output_data
+from tests.fakes import fake_gprmax, trace_values, write_trace_file
+from tests.test_parallel_execution import build_model
+
+
+class ShardingTests(unittest.TestCase):
+    def test_sharded_run_merges_every_trace_in_order(self):
+        calls = []
+        with tempfile.TemporaryDirectory() as tmpdir, fake_gprmax(calls):
+            output_folder = Path(tmpdir)
+            build_model(output_folder).run(
+                n=5, shards=3, shard_workers=1, geometry=True
+            )
+            outputdata, _ = get_output_data(
+                str(output_folder.joinpath("output_merged.out")), 1, "Ez"
+            )
+
+            self.assertEqual(
+                sorted((kwargs["restart"], kwargs["n"]) for _, _, kwargs in calls),
+                [(1, 2), (3, 2), (5, 1)],
+            )
+            for trace in range(1, 6):
+                np.testing.assert_array_equal(
+                    outputdata[:, trace - 1], trace_values(trace, 5, component_idx=2)
+                )
+                self.assertTrue(output_folder.joinpath(f"sim{trace}.out").exists())
+                self.assertTrue(output_folder.joinpath(f"geometry{trace}.vti").exists())
+            self.assertEqual(list(output_folder.glob("shard*")), [])
+
+    def test_shards_share_the_physical_cores(self):
+        self.assertEqual(_resolve_worker_layout(3, None, None, 16), (3, 5))
+        self.assertEqual(_resolve_worker_layout(8, None, 4, 16), (4, 4))
+        self.assertEqual(_resolve_worker_layout(8, 2, None, 16), (2, 8))
+
+        calls = []
+        inputs = []
+        run_trace_shard = gprmax_model._run_trace_shard
+
+        def record_input(task):
+            inputs.append(Path(task.input_file).read_text())
+            return run_trace_shard(task)
+
+        with tempfile.TemporaryDirectory() as tmpdir, fake_gprmax(calls), patch.object(
+            gprmax_model, "_physical_cpu_count", return_value=4
+        ), patch.object(gprmax_model, "_run_trace_shard", record_input):
+            build_model(Path(tmpdir)).run(n=4, shards=2, shard_workers=1)
+
+        self.assertEqual(len(inputs), 2)
+        for input_text in inputs:
+            self.assertIn("#num_threads: 4", input_text)
+
+    def test_sharded_resume_merges_existing_traces(self):
+        calls = []
+        with tempfile.TemporaryDirectory() as tmpdir, fake_gprmax(calls):
+            output_folder = Path(tmpdir)
+            build_model(output_folder).run(n=4)
+            output_folder.joinpath("sim3.out").unlink()
+
+            calls.clear()
+            build_model(output_folder).run(n=4, resume=True, shards=2, shard_workers=1)
+            outputdata, _ = get_output_data(
+                str(output_folder.joinpath("output_merged.out")), 1, "Ez"
+            )
+
+            self.assertEqual(
+                [(kwargs["restart"], kwargs["n"]) for _, _, kwargs in calls], [(3, 1)]
+            )
+            self.assertFalse(np.isnan(outputdata).any())
+
+    def test_unmerged_columns_read_as_nan(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            output_folder = Path(tmpdir)
+            write_trace_file(output_folder.joinpath("sim2.out"), 2)
+            output_file = output_folder.joinpath("output_merged.out")
+
+            for _ in range(2):
+                append_merged_traces(
+                    output_file, {1: output_folder.joinpath("sim2.out")}, 3, "fake"
+                )
+            outputdata, _ = get_output_data(str(output_file), 1, "Ex")
+
+            with h5py.File(output_file, "r") as f:
+                self.assertEqual(f.attrs["traces_merged"], 1)
+                self.assertEqual(list(f["merged_traces"][()]), [False, True, False])
+            self.assertTrue(np.isnan(outputdata[:, [0, 2]]).all())
+            np.testing.assert_array_equal(outputdata[:, 1], trace_values(2, 5))
+
+
+if __name__ == "__main__":
+    unittest.main()
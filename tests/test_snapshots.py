@@ -0,0 +1,125 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+import h5py
+import numpy as np
+
+from gprmaxui.raster import SnapshotRasterizer, read_vti
+from gprmaxui.snapshots import SnapshotReader, consolidate_snapshots
+from tests.test_raster import write_gprmax_snapshot
+
+
+def write_snapshot_folders(output_folder, n_traces=2, iterations=(1, 3, 5), shape=(1, 4, 6, 3)):
+    rng = np.random.default_rng(0)
+    for trace in range(1, n_traces + 1):
+        snapshot_folder = output_folder.joinpath(f"sim_snaps{trace}")
+        snapshot_folder.mkdir()
+        for iteration in iterations:
+            write_gprmax_snapshot(
+                snapshot_folder.joinpath(f"snapshot{iteration}.vti"), rng.normal(size=shape)
+            )
+
+
+class ConsolidateSnapshotsTests(unittest.TestCase):
+    def test_stacks_the_snapshots_of_each_trace(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            output_folder = Path(tmp_dir)
+            write_snapshot_folders(output_folder)
+            snapshot_file = output_folder.joinpath("sim_snaps2", "snapshot3.vti")
+            expected = read_vti(snapshot_file)
+
+            stores = consolidate_snapshots(output_folder, workers=1)
+
+            self.assertEqual(stores, [output_folder.joinpath("sim_snaps1.h5"), output_folder.joinpath("sim_snaps2.h5")])
+            with h5py.File(stores[1], "r") as f:
+                self.assertEqual(list(f["iterations"][()]), [1, 3, 5])
+                self.assertEqual(f["H-field"].shape, (3, 6, 4, 1, 3))
+                self.assertEqual(f["H-field"].chunks, (1, 6, 4, 1, 3))
+                np.testing.assert_array_equal(
+                    f["H-field"][1], expected.cell_array("H-field").transpose(2, 1, 0, 3)
+                )
+
+            reader = SnapshotReader()
+            stored = reader.read(snapshot_file)
+            reader.close()
+            self.assertEqual(stored.cells, expected.cells)
+            np.testing.assert_array_equal(stored.cell_data["H-field"], expected.cell_data["H-field"])
+
+    def test_deleted_snapshots_are_read_from_the_store(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            output_folder = Path(tmp_dir)
+            write_snapshot_folders(output_folder, n_traces=1)
+            snapshot_file = output_folder.joinpath("sim_snaps1", "snapshot5.vti")
+            rasterizer = SnapshotRasterizer()
+            expected = rasterizer.render(snapshot_file, None, (0.01, 0.01), (0.03, 0.01), 0.01)
+
+            consolidate_snapshots(output_folder, delete=True, workers=1)
+
+            self.assertFalse(output_folder.joinpath("sim_snaps1").exists())
+            reader = SnapshotReader()
+            self.assertTrue(reader.exists(snapshot_file))
+            self.assertFalse(reader.exists(output_folder.joinpath("sim_snaps1", "snapshot2.vti")))
+            image = reader.read(snapshot_file)
+            reader.close()
+            self.assertEqual(sorted(image.cell_data), ["E-field", "H-field"])
+            np.testing.assert_array_equal(
+                rasterizer.render(image, None, (0.01, 0.01), (0.03, 0.01), 0.01), expected
+            )
+
+    def test_complete_stores_are_kept(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            output_folder = Path(tmp_dir)
+            write_snapshot_folders(output_folder, n_traces=1)
+            store = consolidate_snapshots(output_folder, workers=1)[0]
+            modified = store.stat().st_mtime_ns
+
+            consolidate_snapshots(output_folder, workers=1)
+            self.assertEqual(store.stat().st_mtime_ns, modified)
+
+            write_gprmax_snapshot(output_folder.joinpath("sim_snaps1", "snapshot7.vti"), np.ones((1, 4, 6, 3)))
+            consolidate_snapshots(output_folder, workers=1)
+            with h5py.File(store, "r") as f:
+                self.assertEqual(list(f["iterations"][()]), [1, 3, 5, 7])
+
+    def test_subset_store_is_rebuilt_before_deleting(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            output_folder = Path(tmp_dir)
+            write_snapshot_folders(output_folder, n_traces=1)
+            store = consolidate_snapshots(output_folder, fields=["H-field"], workers=1)[0]
+
+            consolidate_snapshots(output_folder, delete=True, workers=1)
+
+            self.assertFalse(output_folder.joinpath("sim_snaps1").exists())
+            with h5py.File(store, "r") as f:
+                self.assertEqual(sorted(f.keys()), ["E-field", "H-field", "iterations"])
+
+    def test_subset_store_keeps_the_snapshot_files(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            output_folder = Path(tmp_dir)
+            write_snapshot_folders(output_folder, n_traces=1)
+
+            with self.assertLogs("gprmaxui.snapshots", level="WARNING"):
+                consolidate_snapshots(output_folder, fields=["H-field"], delete=True, workers=1)
+
+            self.assertTrue(output_folder.joinpath("sim_snaps1", "snapshot1.vti").exists())
+
+    def test_regenerated_snapshots_replace_the_store(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            output_folder = Path(tmp_dir)
+            write_snapshot_folders(output_folder, n_traces=1)
+            store = consolidate_snapshots(output_folder, workers=1)[0]
+            snapshot_file = output_folder.joinpath("sim_snaps1", "snapshot3.vti")
+            write_gprmax_snapshot(snapshot_file, np.full((1, 4, 6, 3), 2.0))
+
+            reader = SnapshotReader()
+            self.assertTrue((reader.read(snapshot_file).cell_data["H-field"] == 2.0).all())
+            reader.close()
+
+            consolidate_snapshots(output_folder, workers=1)
+            with h5py.File(store, "r") as f:
+                self.assertTrue((f["H-field"][1] == 2.0).all())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,100 @@
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+import gprmaxui.sweep as sweep
+from gprmaxui.sweep import run_many
+from tests.fakes import fake_gprmax
+from tests.test_parallel_execution import build_model
+
+
+class SweepTests(unittest.TestCase):
+    def test_cores_are_split_between_models_and_threads(self):
+        with patch.object(sweep, "_physical_cpu_count", return_value=16):
+            self.assertEqual(sweep._resolve_sweep_layout(100, None, None), (16, 1))
+            self.assertEqual(sweep._resolve_sweep_layout(100, 4, None), (4, 4))
+            self.assertEqual(sweep._resolve_sweep_layout(100, None, 8), (2, 8))
+            self.assertEqual(sweep._resolve_sweep_layout(3, None, None), (3, 5))
+            with self.assertRaisesRegex(ValueError, "oversubscribe"):
+                sweep._resolve_sweep_layout(100, 4, 8)
+
+    def test_run_many_isolates_output_folders_and_reports_status(self):
+        calls = []
+        with tempfile.TemporaryDirectory() as tmpdir, fake_gprmax(calls):
+            models = [build_model(Path(tmpdir)) for _ in range(3)]
+            models[1].domain_size.x = 0.001
+
+            with patch.object(sweep, "_physical_cpu_count", return_value=2):
+                results = run_many(
+                    models,
+                    max_workers=1,
+                    output_root=Path(tmpdir).joinpath("sweep"),
+                    n=2,
+                )
+
+            self.assertEqual([result.index for result in results], [0, 1, 2])
+            self.assertEqual(
+                [result.status for result in results],
+                ["completed", "failed", "completed"],
+            )
+            self.assertEqual(
+                len({result.output_folder for result in results}), len(models)
+            )
+            for model, result in zip(models, results):
+                self.assertEqual(model.output_folder, result.output_folder)
+                self.assertGreaterEqual(result.elapsed, 0)
+            self.assertIn(
+                "#num_threads: 2",
+                results[0].output_folder.joinpath("sim.in").read_text(),
+            )
+            self.assertTrue(
+                results[2].output_folder.joinpath("output_merged.out").exists()
+            )
+
+    def test_models_that_fail_to_load_are_reported(self):
+        calls = []
+        with tempfile.TemporaryDirectory() as tmpdir, fake_gprmax(calls):
+            models = [build_model(Path(tmpdir)) for _ in range(2)]
+            models[0].to_json = lambda: '{"title": "broken"}'
+
+            with patch.object(sweep, "_physical_cpu_count", return_value=2):
+                results = run_many(
+                    models,
+                    max_workers=1,
+                    output_root=Path(tmpdir).joinpath("sweep"),
+                    n=2,
+                )
+
+            self.assertEqual([result.status for result in results], ["failed", "completed"])
+            self.assertEqual(results[0].output_folder, models[0].output_folder)
+            self.assertIn("ValidationError", results[0].error)
+
+    def test_models_whose_traces_can_not_be_counted_are_reported(self):
+        calls = []
+        with tempfile.TemporaryDirectory() as tmpdir, fake_gprmax(calls):
+            models = [build_model(Path(tmpdir)) for _ in range(2)]
+            models[0].source = None
+
+            with patch.object(sweep, "_physical_cpu_count", return_value=2):
+                results = run_many(
+                    models,
+                    max_workers=1,
+                    output_root=Path(tmpdir).joinpath("sweep"),
+                    n="auto",
+                    mpi=True,
+                )
+
+            self.assertEqual([result.status for result in results], ["failed", "completed"])
+            self.assertIn("NotImplementedError", results[0].error)
+            self.assertEqual(len(calls), 1)
+
+    def test_run_many_rejects_shared_output_folders(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            models = [build_model(Path(tmpdir)) for _ in range(2)]
+            with self.assertRaisesRegex(ValueError, "own output folder"):
+                run_many(models, n=2)
+
+
+if __name__ == "__main__":
+    unittest.main()
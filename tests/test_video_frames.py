@@ -0,0 +1,43 @@
+import unittest
+
+import matplotlib.pyplot as plt
+import numpy as np
+from matplotlib.colors import Normalize
+
+from gprmaxui.gprmax_model import _BScanReveal
+
+
+def reference_frame(outputdata, cmap, trace_idx, iteration_idx):
+    revealed = np.full_like(outputdata, np.nan)
+    revealed[:, :trace_idx] = outputdata[:, :trace_idx]
+    revealed[:iteration_idx, trace_idx] = outputdata[:iteration_idx, trace_idx]
+    norm = Normalize(np.nanmin(outputdata), np.nanmax(outputdata))
+    return cmap(norm(np.ma.masked_invalid(revealed)), bytes=True)
+
+
+class BScanRevealTests(unittest.TestCase):
+    def setUp(self):
+        self.outputdata = np.random.default_rng(1).normal(size=(12, 5)).astype(np.float32)
+        self.cmap = plt.get_cmap("jet").with_extremes(bad="white")
+
+    def test_incremental_frames_match_full_redraws(self):
+        reveal = _BScanReveal(self.outputdata, self.cmap)
+        for trace_idx in range(5):
+            for iteration_idx in range(0, 12, 5):
+                np.testing.assert_array_equal(
+                    reveal.reveal(trace_idx, iteration_idx),
+                    reference_frame(self.outputdata, self.cmap, trace_idx, iteration_idx),
+                )
+
+    def test_going_back_redraws_from_scratch(self):
+        reveal = _BScanReveal(self.outputdata, self.cmap)
+        reveal.reveal(4, 7)
+
+        np.testing.assert_array_equal(
+            reveal.reveal(1, 3), reference_frame(self.outputdata, self.cmap, 1, 3)
+        )
+        self.assertTrue((reveal.reveal(0, 0) == [255, 255, 255, 255]).all())
+
+
+if __name__ == "__main__":
+    unittest.main()
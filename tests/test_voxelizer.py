@@ -0,0 +1,86 @@
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+import h5py
+import numpy as np
+
+from gprmaxui.commands import DomainBox, DomainCylinder, DomainSphere, GeometryObjectsRead
+from gprmaxui.voxelizer import voxelize
+from tests.test_parallel_execution import build_model
+
+
+class VoxelizerTests(unittest.TestCase):
+    def test_later_objects_overwrite_earlier_ones(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            model = build_model(Path(tmpdir))
+            model.add_geometry(
+                DomainBox(
+                    x_min=0.02, y_min=0.02, z_min=0.0,
+                    x_max=0.05, y_max=0.04, z_max=0.01,
+                    material="pec",
+                ),
+                DomainSphere(cx=0.05, cy=0.05, cz=0.0, radius=0.015, material="free_space"),
+            )
+            voxels = voxelize(model)
+
+            self.assertNotIn("gprMax", sys.modules)
+            self.assertEqual(voxels.materials, ["pec", "free_space", "sand"])
+            self.assertEqual(voxels.solid.shape, (10, 10, 1))
+            # sand box below y=0.08, free space above
+            self.assertTrue((voxels.solid[:, 8:, 0] == 1).all())
+            self.assertTrue((voxels.solid[2:5, 2:4, 0] == 0).all())
+            # cells whose centre is within the sphere radius are carved out
+            self.assertEqual(voxels.solid[4, 4, 0], 1)
+            self.assertEqual(voxels.solid[5, 5, 0], 1)
+            self.assertEqual(voxels.solid[3, 3, 0], 0)
+            self.assertEqual(voxels.solid[6, 6, 0], 2)
+
+            grid = voxels.to_image_data()
+            self.assertEqual(grid.n_cells, 100)
+            np.testing.assert_array_equal(
+                grid.cell_data["Material"], voxels.solid.ravel(order="F")
+            )
+
+    def test_cylinder_covers_the_cells_along_its_axis(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            model = build_model(Path(tmpdir))
+            model.add_geometry(
+                DomainCylinder(
+                    cx_min=0.02, cy_min=0.05, cz_min=0.0,
+                    cx_max=0.07, cy_max=0.05, cz_max=0.0,
+                    radius=0.01, material="pec",
+                )
+            )
+            solid = voxelize(model).solid[:, :, 0]
+
+            np.testing.assert_array_equal(np.nonzero((solid == 0).any(axis=1))[0], range(2, 7))
+            np.testing.assert_array_equal(np.nonzero((solid == 0).any(axis=0))[0], [4, 5])
+
+    def test_objects_read_from_file_skip_background_cells(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            output_folder = Path(tmpdir)
+            with h5py.File(output_folder.joinpath("rock.h5"), "w") as f:
+                f.attrs["dx_dy_dz"] = (0.01, 0.01, 0.01)
+                f.create_dataset("data", data=np.array([[[0], [-1]], [[1], [0]]], dtype=np.int16))
+            output_folder.joinpath("rock_materials.txt").write_text(
+                "#material: 5 0 1 0 granite\n#material: 7 0 1 0 basalt\n"
+            )
+            model = build_model(output_folder)
+            model.add_geometry(
+                GeometryObjectsRead(
+                    x=0.0, y=0.0, z=0.0,
+                    filename="rock.h5", materials_filename="rock_materials.txt",
+                )
+            )
+            voxels = voxelize(model)
+
+            self.assertEqual(
+                voxels.materials[3:], ["granite{rock_materials}", "basalt{rock_materials}"]
+            )
+            np.testing.assert_array_equal(voxels.solid[:2, :2, 0], [[3, 2], [4, 3]])
+
+
+if __name__ == "__main__":
+    unittest.main()